@@ -1,14 +1,15 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import users
+from .views import users, async_characters
 from .views.characters import (
     CharacterViewSet, CharacterDisplayView,
     update_character_status, get_character_status,
     WillConfigViewSet, SurvivorsListView, CharacterMessageView,
-    CharacterMessageDetailView
+    CharacterMessageDetailView, CharacterMessageBulkDeleteView, MessageInboxView, get_leaderboard, get_stats
 )
 
 
@@ -33,6 +34,7 @@ def api_root(request):
             'users': '/api/v1/users/',
             'characters': '/api/v1/characters/',
             'auth': '/api/v1/auth/token/',
+            'stats': '/api/v1/stats/',
         }
     })
 
@@ -43,9 +45,17 @@ urlpatterns = [
     # 不需要认证的路由放在最前面
     path('status/update/', update_character_status, name='status-update'),
     path('survivors/', SurvivorsListView.as_view(), name='survivors-list'),
+    path('leaderboard/', get_leaderboard, name='leaderboard'),
+    path('stats/', get_stats, name='stats'),
     path('d/<str:code>/status/', get_character_status, name='status-get'),
     path('characters/<str:code>/messages/', CharacterMessageView.as_view(), name='character-messages'),
     path('characters/<str:code>/messages/<int:pk>/', CharacterMessageDetailView.as_view(), name='character-message-detail'),
+    path(
+        'characters/<str:code>/messages/bulk-delete/',
+        CharacterMessageBulkDeleteView.as_view(),
+        name='character-messages-bulk-delete'
+    ),
+    path('messages/inbox/', MessageInboxView.as_view(), name='message-inbox'),
     path('d/<str:code>/', CharacterDisplayView.as_view(), name='character-display'),
     
     # JWT 认证
@@ -56,4 +66,14 @@ urlpatterns = [
     path('', include(router.urls)),
     # 遗嘱配置路由
     path('characters/<str:character_pk>/', include(character_router.urls)),
-] 
\ No newline at end of file
+]
+
+# ASGI 部署时由异步视图处理状态读写与留言接口，路径与名称不变
+async_urlpatterns = [
+    path('status/update/', async_characters.update_character_status, name='status-update'),
+    path('d/<str:code>/status/', async_characters.get_character_status, name='status-get'),
+    path('characters/<str:code>/messages/', async_characters.character_messages, name='character-messages'),
+]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = async_urlpatterns + urlpatterns
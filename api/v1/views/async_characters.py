@@ -0,0 +1,223 @@
+"""
+I/O 密集接口的异步视图
+
+开启 ASYNC_VIEWS 并以 ASGI 方式部署时替代同名的 DRF 视图，路径、请求与响应格式保持一致。
+数据库访问使用 Django 异步 ORM，缓存与在线状态使用 redis.asyncio 客户端，
+安排 IP 归属地补全任务等阻塞调用放到线程池执行。
+"""
+import asyncio
+import json
+import logging
+from datetime import date, timedelta
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
+from django.shortcuts import aget_object_or_404
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import MethodNotAllowed, Throttled
+from rest_framework.utils.encoders import JSONEncoder
+
+from apps.characters import geolocation, message_window, presence, throttles
+from apps.characters.models import Character, CharacterStatus, Message
+from apps.characters.throttles import MessagePostThrottle
+from apps.characters.serializers import (
+    CharacterStatusUpdateSerializer, CharacterStatusResponseSerializer, MessageSerializer
+)
+from utils import metrics
+from .characters import (
+    STATUS_UPLOAD_RATE_LIMIT, STATUS_UPLOAD_RATE_WINDOW, status_upload_rate_key,
+    apply_sync_experience, apply_danmaku_experience, get_client_ip, get_location_from_ip,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def api_response(data, status=status.HTTP_200_OK):
+    """与 DRF JSONRenderer 输出一致的 JSON 响应"""
+    return JsonResponse(
+        data, status=status, safe=False, encoder=JSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def allow_methods(*methods):
+    """限制请求方法，不允许时与 DRF 一样返回 405 和 detail"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = api_response(
+                    {'detail': MethodNotAllowed(request.method).detail},
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED
+                )
+                response['Allow'] = ', '.join(methods)
+                return response
+            return await view(request, *args, **kwargs)
+        return csrf_exempt(wrapper)
+    return decorator
+
+
+def throttled_response(exc):
+    """与 DRF 处理 Throttled 异常时相同的 429 响应"""
+    response = api_response({'detail': exc.detail}, status=exc.status_code)
+    if exc.wait is not None:
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+def parse_body(request):
+    """解析 JSON 或表单请求体"""
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST
+
+
+@allow_methods('POST')
+async def update_character_status(request):
+    """通过快捷指令更新角色状态"""
+    try:
+        # 从请求头获取秘钥
+        secret_key = request.headers.get('X-Character-Key')
+        if not secret_key:
+            return api_response(
+                {'error': '缺少认证秘钥'},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        serializer = CharacterStatusUpdateSerializer(data=parse_body(request))
+        if not serializer.is_valid():
+            return api_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        character = await aget_object_or_404(Character, secret_key=secret_key)
+
+        rate_limit_key = status_upload_rate_key(character)
+        current_count = await cache.aget(rate_limit_key, 0)
+        if current_count >= STATUS_UPLOAD_RATE_LIMIT:
+            metrics.RATE_LIMIT_REJECTIONS.labels(scope='status_upload').inc()
+            return api_response(
+                {'error': f'已超过每小时 {STATUS_UPLOAD_RATE_LIMIT} 次的上传限制'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+
+        created = await CharacterStatus.arecord(
+            character,
+            serializer.validated_data['type'],
+            serializer.validated_data['data']
+        )
+        metrics.STATUS_UPLOADS.labels(result='created' if created else 'deduplicated').inc()
+        reported_at = timezone.now()
+        # 非定时更新不计入在线判断
+        if CharacterStatus.counts_as_activity(serializer.validated_data['type']):
+            await character.amark_active(reported_at)
+            await presence.atouch(character.uid, reported_at)
+
+        update_fields = apply_sync_experience(character, date.today())
+        if update_fields:
+            await character.asave(update_fields=update_fields)
+
+        if current_count == 0:
+            await cache.aset(rate_limit_key, 1, STATUS_UPLOAD_RATE_WINDOW)
+        else:
+            await cache.aincr(rate_limit_key)
+
+        return api_response({'status': 'success'})
+    except Exception as e:
+        logger.error(f"更新状态失败: {str(e)}")
+        return api_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@allow_methods('GET')
+async def get_character_status(request, code):
+    """获取角色的最新状态"""
+    try:
+        character = await aget_object_or_404(Character, display_code=code)
+
+        status_data = {}
+        last_updated = None
+        for latest in await CharacterStatus.aget_latest_status(character):
+            status_data[latest.status_type] = {
+                'data': latest.data,
+                'updated_at': latest.reported_at
+            }
+            if latest.status_type == 'vital_signs':
+                last_updated = latest.reported_at
+
+        is_online = await presence.ais_online(character.uid)
+        if is_online is None:
+            is_online = (
+                last_updated and
+                timezone.now() - last_updated < timedelta(minutes=15)
+            )
+
+        serializer = CharacterStatusResponseSerializer({
+            'status': 'online' if is_online else 'offline',
+            'last_updated': last_updated,
+            'status_data': status_data
+        })
+        return api_response(serializer.data)
+    except Exception as e:
+        logger.error(f"获取状态失败: {str(e)}")
+        return api_response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@allow_methods('GET', 'POST')
+async def character_messages(request, code):
+    """
+    角色留言板
+    GET: 获取最近50条留言，before_id 参数获取该留言之前的50条
+    POST: 发送新留言
+    """
+    if request.method == 'GET':
+        try:
+            before_id = message_window.parse_before_id(request.GET.get('before_id'))
+        except ValueError as e:
+            return api_response({'before_id': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            character = await aget_object_or_404(Character, display_code=code, is_active=True)
+        except Http404 as e:
+            return api_response({'detail': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+        async def build():
+            messages = [
+                message async for message in message_window.recent_messages(character, before_id)
+            ]
+            return MessageSerializer(messages, many=True).data
+
+        if before_id is None:
+            # 最近一页由缓存提供
+            return api_response(await message_window.aget_window(character, build))
+        return api_response(await build())
+
+    try:
+        payload = parse_body(request)
+    except ValueError as e:
+        return api_response({'detail': f'JSON parse error - {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        await throttles.acheck_message_post(MessagePostThrottle().get_ident(request), code, payload)
+    except Throttled as e:
+        return throttled_response(e)
+    serializer = MessageSerializer(data=payload)
+    if not serializer.is_valid():
+        return api_response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        character = await aget_object_or_404(Character, display_code=code, is_active=True)
+    except Http404 as e:
+        return api_response({'detail': str(e)}, status=status.HTTP_404_NOT_FOUND)
+
+    ip = get_client_ip(request)
+    location = get_location_from_ip(ip) if ip else None
+    message = await Message.objects.acreate(
+        character=character, ip_address=ip, location=location, **serializer.validated_data
+    )
+    if ip and location is None:
+        await asyncio.to_thread(geolocation.schedule_enrichment)
+
+    update_fields = apply_danmaku_experience(character, ip, date.today())
+    if update_fields:
+        await character.asave(update_fields=update_fields)
+
+    return api_response(MessageSerializer(message).data, status=status.HTTP_201_CREATED)
@@ -1,47 +1,101 @@
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django.shortcuts import get_object_or_404
+from django.db.models import F
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.http import Http404
-from datetime import timedelta
+from datetime import date, timedelta
 from django.core.mail import EmailMessage
 from django.conf import settings
 from django.template.loader import render_to_string
 import logging
-import json
-import urllib.request
-import urllib.error
-import os
 
 logger = logging.getLogger(__name__)
 
-# ip2region 本地库支持
-XDB_SEARCHER = None
-XDB_PATH = os.path.join(settings.BASE_DIR, 'data', 'ip2region.xdb')
-
-try:
-    from ip2region import searcher as ip2region_searcher
-    from ip2region.util import IPv4 as IP2REGION_IPV4
-    # 检查文件是否存在且大小合理 (>100KB 才是有效的 xdb 文件)
-    if os.path.exists(XDB_PATH) and os.path.getsize(XDB_PATH) > 100000:
-        XDB_SEARCHER = ip2region_searcher.new_with_file_only(IP2REGION_IPV4, XDB_PATH)
-        logger.info(f"ip2region initialized with {XDB_PATH}")
-    else:
-        logger.warning(f"ip2region.xdb not found or invalid at {XDB_PATH}")
-except ImportError as e:
-    logger.warning(f"ip2region not installed: {e}")
-except Exception as e:
-    logger.error(f"Failed to initialize ip2region: {e}")
-
 from apps.characters.models import Character, CharacterStatus, WillConfig, Message
+from apps.characters import counters, geolocation, message_window, moderation, presence, leaderboard
+from apps.characters.throttles import MessagePostThrottle
+from utils import ip_region, metrics
 from apps.characters.serializers import (
     CharacterSerializer, CharacterDetailSerializer, CharacterDisplaySerializer,
     CharacterStatusUpdateSerializer, CharacterStatusResponseSerializer,
-    WillConfigSerializer, MessageSerializer
+    WillConfigSerializer, MessageSerializer, MessageBulkDeleteSerializer,
+    MessageInboxSerializer, MessageInboxQuerySerializer
 )
 
+STATUS_UPLOAD_RATE_LIMIT = 250  # 每小时最大上传次数
+STATUS_UPLOAD_RATE_WINDOW = 3600  # 1小时（秒）
+
+
+def status_upload_rate_key(character):
+    return f"status_upload_rate:{character.uid}"
+
+
+def apply_sync_experience(character, today):
+    """
+    经验值系统 - 连续同步奖励
+
+    修改角色的连续天数与经验值，返回需要保存的字段，今天已获得过经验时返回空列表
+    """
+    if character.last_sync_date == today:
+        return []
+    if character.last_sync_date == today - timedelta(days=1):
+        # 连续同步，streak +1
+        character.sync_streak += 1
+    else:
+        # 断签，重置为1
+        character.sync_streak = 1
+
+    # 获得经验 = 当前连续天数
+    character.experience += character.sync_streak
+    character.last_sync_date = today
+    return ['experience', 'sync_streak', 'last_sync_date']
+
+
+def apply_danmaku_experience(character, ip, today):
+    """
+    经验值系统 - 弹幕贡献奖励
+
+    每个 IP 每天为角色贡献 1 点经验，返回需要保存的字段，未获得经验时返回空列表
+    """
+    if not ip:
+        return []
+    # 检查是否需要重置今日IP列表
+    if character.danmaku_ips_date != today:
+        character.danmaku_ips_today = []
+        character.danmaku_ips_date = today
+
+    # 检查该IP今天是否已贡献过经验
+    if ip in character.danmaku_ips_today:
+        return []
+    character.danmaku_ips_today.append(ip)
+    character.experience += 1
+    return ['experience', 'danmaku_ips_today', 'danmaku_ips_date']
+
+
+def get_client_ip(request):
+    """获取客户端IP"""
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
+
+
+def get_location_from_ip(ip):
+    """
+    通过本地ip2region库获取IP归属地
+
+    只显示省份；本地库查不到时返回 None，由 enrich_message_locations 任务在线补全
+    """
+    if not ip or ip in ['127.0.0.1', 'localhost', '::1']:
+        return '本地'
+    return ip_region.lookup_province(ip) or None
+
+
 class CharacterViewSet(viewsets.ModelViewSet):
     """
     角色管理 API v1
@@ -118,6 +172,26 @@ class CharacterViewSet(viewsets.ModelViewSet):
             'is_active': character.is_active
         })
 
+    @action(detail=True, methods=['get'])
+    def rank(self, request, pk=None):
+        """获取角色在经验值排行榜中的排名"""
+        character = self.get_object()
+        result = leaderboard.rank(character.uid)
+        if result is not None:
+            position, total = result
+        else:
+            # Redis 不可用时回退到数据库计数
+            ranked = Character.objects.filter(is_active=True, is_public=True)
+            total = ranked.count()
+            position = None
+            if leaderboard.is_ranked(character):
+                position = ranked.filter(experience__gt=character.experience).count() + 1
+        return Response({
+            'rank': position,
+            'total': total,
+            'experience': character.experience
+        })
+
     def update(self, request, *args, **kwargs):
         """更新角色信息"""
         try:
@@ -133,34 +207,30 @@ class SurvivorsListView(generics.ListAPIView):
     permission_classes = [AllowAny]
     
     def get_queryset(self):
-        """返回所有激活且公开的角色"""
-        return Character.objects.filter(is_active=True, is_public=True).order_by('-updated_at')
+        """返回所有激活且公开的角色，按最近活跃排序"""
+        return Character.objects.filter(is_active=True, is_public=True).order_by(
+            F('last_active_at').desc(nulls_last=True)
+        )
     
     def list(self, request, *args, **kwargs):
         """获取所有存活者及其状态"""
         queryset = self.get_queryset()
         survivors = []
+        # 在线角色集合，Redis 不可用时为 None，回退到按状态时间判断
+        online_uids = presence.online_uids()
         
         for character in queryset:
-            # 获取角色最新状态
-            latest_statuses = CharacterStatus.get_latest_status(character)
-            
-            # 获取最新更新时间,非定时更新
-            last_updated = None
-            for status_item in latest_statuses:
-                if status_item.status_type != 'other':
-                    last_updated = status_item.timestamp
-                    break
-            
-            # 如果没有 vital_signs，使用任意最新状态的时间
-            if not last_updated and latest_statuses:
-                last_updated = latest_statuses[0].timestamp
+            # 最后上报时间由状态上报接口维护在角色表上
+            last_updated = character.last_active_at
             
             # 判断在线状态（15分钟内更新为在线）
-            is_online = (
-                last_updated and 
-                timezone.now() - last_updated < timedelta(minutes=15)
-            )
+            if online_uids is not None:
+                is_online = str(character.uid) in online_uids
+            else:
+                is_online = (
+                    last_updated and 
+                    timezone.now() - last_updated < timedelta(minutes=15)
+                )
             
             # 获取状态消息
             status_message = ""
@@ -226,9 +296,6 @@ def update_character_status(request):
     """通过快捷指令更新角色状态"""
     from django.core.cache import cache
     
-    RATE_LIMIT_UPLOADS = 250  # 每小时最大上传次数
-    RATE_LIMIT_WINDOW = 3600  # 1小时（秒）
-    
     try:
         # 从请求头获取秘钥
         secret_key = request.headers.get('X-Character-Key')
@@ -250,43 +317,37 @@ def update_character_status(request):
         character = get_object_or_404(Character, secret_key=secret_key)
         
         # 速率限制检查
-        rate_limit_key = f"status_upload_rate:{character.uid}"
+        rate_limit_key = status_upload_rate_key(character)
         current_count = cache.get(rate_limit_key, 0)
         
-        if current_count >= RATE_LIMIT_UPLOADS:
+        if current_count >= STATUS_UPLOAD_RATE_LIMIT:
+            metrics.RATE_LIMIT_REJECTIONS.labels(scope='status_upload').inc()
             return Response(
-                {'error': f'已超过每小时 {RATE_LIMIT_UPLOADS} 次的上传限制'},
+                {'error': f'已超过每小时 {STATUS_UPLOAD_RATE_LIMIT} 次的上传限制'},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
             )
         
-        # 创建新状态记录
-        CharacterStatus.objects.create(
-            character=character,
-            status_type=serializer.validated_data['type'],
-            data=serializer.validated_data['data']
+        # 写入状态记录（内容与上次相同时只刷新最后上报时间）
+        created = CharacterStatus.record(
+            character,
+            serializer.validated_data['type'],
+            serializer.validated_data['data']
         )
+        metrics.STATUS_UPLOADS.labels(result='created' if created else 'deduplicated').inc()
+        reported_at = timezone.now()
+        # 非定时更新不计入在线判断
+        if CharacterStatus.counts_as_activity(serializer.validated_data['type']):
+            character.mark_active(reported_at)
+            presence.touch(character.uid, reported_at)
         
         # 经验值系统 - 连续同步奖励
-        from datetime import date, timedelta
-        today = date.today()
-        
-        if character.last_sync_date != today:
-            # 今天还没有获得同步经验
-            if character.last_sync_date == today - timedelta(days=1):
-                # 连续同步，streak +1
-                character.sync_streak += 1
-            else:
-                # 断签，重置为1
-                character.sync_streak = 1
-            
-            # 获得经验 = 当前连续天数
-            character.experience += character.sync_streak
-            character.last_sync_date = today
-            character.save(update_fields=['experience', 'sync_streak', 'last_sync_date'])
+        update_fields = apply_sync_experience(character, date.today())
+        if update_fields:
+            character.save(update_fields=update_fields)
         
         # 更新计数器
         if current_count == 0:
-            cache.set(rate_limit_key, 1, RATE_LIMIT_WINDOW)
+            cache.set(rate_limit_key, 1, STATUS_UPLOAD_RATE_WINDOW)
         else:
             cache.incr(rate_limit_key)
 
@@ -312,20 +373,22 @@ def get_character_status(request, code):
         status_data = {}
         last_updated = None
         
-        for status in latest_statuses:
-            status_data[status.status_type] = {
-                'data': status.data,
-                'updated_at': status.timestamp
+        for latest in latest_statuses:
+            status_data[latest.status_type] = {
+                'data': latest.data,
+                'updated_at': latest.reported_at
             }
             # 使用最新的高频数据时间作为在线状态判断
-            if status.status_type == 'vital_signs':
-                last_updated = status.timestamp
+            if latest.status_type == 'vital_signs':
+                last_updated = latest.reported_at
 
-        # 如果最后更新时间在15分钟内，认为是在线状态
-        is_online = (
-            last_updated and 
-            timezone.now() - last_updated < timedelta(minutes=15)
-        )
+        # 优先使用 Redis 在线状态，不可用时按最后更新时间是否在15分钟内判断
+        is_online = presence.is_online(character.uid)
+        if is_online is None:
+            is_online = (
+                last_updated and 
+                timezone.now() - last_updated < timedelta(minutes=15)
+            )
 
         response_data = {
             'status': 'online' if is_online else 'offline',
@@ -342,6 +405,52 @@ def get_character_status(request, code):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_leaderboard(request):
+    """获取经验值排行榜前 N 名"""
+    max_limit = getattr(settings, 'LEADERBOARD_MAX_LIMIT', 100)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), max_limit)
+    except ValueError:
+        return Response(
+            {'error': 'limit 参数必须是整数'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    entries = leaderboard.top(limit)
+    if entries is not None:
+        characters = {
+            str(uid): character
+            for uid, character in Character.objects.in_bulk([uid for uid, _ in entries]).items()
+        }
+        ranked = [characters[uid] for uid, _ in entries if uid in characters]
+    else:
+        # Redis 不可用时回退到数据库排序
+        ranked = Character.objects.filter(
+            is_active=True, is_public=True
+        ).order_by('-experience', 'created_at')[:limit]
+
+    results = [
+        {
+            'rank': index,
+            'display_code': character.display_code,
+            'name': character.name,
+            'avatar': character.avatar,
+            'experience': character.experience,
+        }
+        for index, character in enumerate(ranked, start=1)
+    ]
+    return Response({'results': results})
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_stats(request):
+    """全站统计：用户数、角色数、在线存活者数"""
+    response = Response(counters.get_stats())
+    patch_cache_control(response, public=True, max_age=settings.STATS_CACHE_TIMEOUT)
+    return response
+
 class WillConfigViewSet(viewsets.ModelViewSet):
     """
     遗嘱配置管理 API
@@ -423,88 +532,56 @@ class WillConfigViewSet(viewsets.ModelViewSet):
 class CharacterMessageView(generics.ListCreateAPIView):
     """
     角色留言板 API
-    GET: 获取最近50条留言
+    GET: 获取最近50条留言，before_id 参数获取该留言之前的50条
     POST: 发送新留言
     """
     serializer_class = MessageSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [MessagePostThrottle]
     pagination_class = None
 
     def get_queryset(self):
         code = self.kwargs.get('code')
         character = get_object_or_404(Character, display_code=code, is_active=True)
-        # 限制只返回最近50条
-        return Message.objects.filter(character=character)[:50]
+        # 限制只返回最近50条，before_id 用于向前翻页
+        return message_window.recent_messages(character, self.get_before_id())
 
-    def get_location_from_ip(self, ip):
-        """通过本地ip2region库获取IP归属地"""
-        if not ip or ip in ['127.0.0.1', 'localhost', '::1']:
-            return '本地'
-        
-        # 优先使用本地 ip2region 库
-        if XDB_SEARCHER is not None:
-            try:
-                result = XDB_SEARCHER.search(ip)
-                
-                if result:
-                    # ip2region 返回格式: "国家|省份|城市|ISP" (4个字段)
-                    parts = result.split('|')
-                    province = parts[1] if len(parts) > 1 and parts[1] != '0' else ''
-                    
-                    # 只显示省份，去掉"省"后缀
-                    if province:
-                        province = province.replace('省', '').replace('市', '')
-                        return province
-                    return None
-            except Exception as e:
-                logger.error(f"ip2region lookup failed for {ip}: {e}")
-        
-        # 回退到在线 API
+    def get_before_id(self):
         try:
-            url = f"http://ip-api.com/json/{ip}?lang=zh-CN"
-            with urllib.request.urlopen(url, timeout=2) as response:
-                data = json.loads(response.read().decode())
-                if data.get('status') == 'success':
-                    region = data.get('regionName', '')
-                    city = data.get('city', '')
-                    if region == city:
-                        return region
-                    return f"{region} {city}".strip()
-        except Exception as e:
-            logger.error(f"Online IP lookup failed for {ip}: {e}")
-            
-        return None
+            return message_window.parse_before_id(self.request.query_params.get('before_id'))
+        except ValueError as e:
+            raise ValidationError({'before_id': [str(e)]})
+
+    def list(self, request, *args, **kwargs):
+        if self.get_before_id() is not None:
+            return super().list(request, *args, **kwargs)
+        # 最近一页由缓存提供
+        code = self.kwargs.get('code')
+        character = get_object_or_404(Character, display_code=code, is_active=True)
+        data = message_window.get_window(
+            character,
+            lambda: self.get_serializer(message_window.recent_messages(character), many=True).data
+        )
+        return Response(data)
+
+    def get_location_from_ip(self, ip):
+        return get_location_from_ip(ip)
 
     def perform_create(self, serializer):
         code = self.kwargs.get('code')
         character = get_object_or_404(Character, display_code=code, is_active=True)
         
-        # 获取客户端IP
-        x_forwarded_for = self.request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = self.request.META.get('REMOTE_ADDR')
-            
+        ip = get_client_ip(self.request)
         location = self.get_location_from_ip(ip) if ip else None
             
         serializer.save(character=character, ip_address=ip, location=location)
+        if ip and location is None:
+            geolocation.schedule_enrichment()
         
         # 经验值系统 - 弹幕贡献奖励
-        from datetime import date
-        today = date.today()
-        
-        if ip:
-            # 检查是否需要重置今日IP列表
-            if character.danmaku_ips_date != today:
-                character.danmaku_ips_today = []
-                character.danmaku_ips_date = today
-            
-            # 检查该IP今天是否已贡献过经验
-            if ip not in character.danmaku_ips_today:
-                character.danmaku_ips_today.append(ip)
-                character.experience += 1
-                character.save(update_fields=['experience', 'danmaku_ips_today', 'danmaku_ips_date'])
+        update_fields = apply_danmaku_experience(character, ip, date.today())
+        if update_fields:
+            character.save(update_fields=update_fields)
 
 class CharacterMessageDetailView(generics.DestroyAPIView):
     """
@@ -516,4 +593,40 @@ class CharacterMessageDetailView(generics.DestroyAPIView):
 
     def get_queryset(self):
         # 仅允许删除属于自己角色的留言
-        return Message.objects.filter(character__user=self.request.user)
+        return Message.objects.filter(owner=self.request.user)
+
+
+class CharacterMessageBulkDeleteView(generics.GenericAPIView):
+    """
+    批量删除自己角色的留言
+    POST: 按 ids、ip_address、created_after/created_before 删除，返回删除数
+    """
+    serializer_class = MessageBulkDeleteSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, code):
+        character = get_object_or_404(Character, display_code=code, user=request.user)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deleted = moderation.bulk_delete(character, **serializer.validated_data)
+        return Response({'deleted': deleted})
+
+
+class MessageInboxView(generics.GenericAPIView):
+    """
+    自己所有角色的留言
+    GET: 按 id 倒序每页50条，可按 character、ip_address、created_after/created_before 过滤，
+    before_id 取该留言之前的一页（即上一页返回的 next_before_id）
+    """
+    serializer_class = MessageInboxSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = MessageInboxQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        limit = moderation.INBOX_PAGE_SIZE
+        # 多取一条判断是否还有更早的留言
+        messages = list(moderation.inbox(request.user, limit=limit + 1, **query.validated_data))
+        next_before_id = messages[limit - 1].id if len(messages) > limit else None
+        serializer = self.get_serializer(messages[:limit], many=True)
+        return Response({'results': serializer.data, 'next_before_id': next_before_id})
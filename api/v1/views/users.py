@@ -16,7 +16,9 @@ import logging
 import time
 import os
 
+from utils import metrics
 from apps.users.models import User, BlacklistedUser, InvitationCode
+from apps.characters import counters
 from apps.users.serializers import (
     EmailRegisterSerializer,
     UserProfileSerializer,
@@ -29,12 +31,15 @@ from apps.users.serializers import (
     CreateInvitationCodeSerializer,
 )
 from apps.users.permissions import IsSuperUser
-from apps.users.pagination import StandardResultsSetPagination
+from apps.users.pagination import ApproximateCountPagination, StandardResultsSetPagination
+from apps.users.search import search_users
+from apps.users.throttles import LoginThrottle
 from django.views.generic import TemplateView
 from rest_framework.permissions import AllowAny
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [LoginThrottle]
 
 class UserViewSet(viewsets.GenericViewSet):
     """
@@ -44,7 +49,13 @@ class UserViewSet(viewsets.GenericViewSet):
     """
     queryset = User.objects.all()
     permission_classes = [permissions.AllowAny]
-    pagination_class = StandardResultsSetPagination
+
+    @property
+    def pagination_class(self):
+        # 用户列表可能很大，总数较大时使用估算值
+        if self.action == 'list':
+            return ApproximateCountPagination
+        return StandardResultsSetPagination
 
     def get_serializer_class(self):
         if self.action == 'register_email':
@@ -185,6 +196,7 @@ class UserViewSet(viewsets.GenericViewSet):
         limit_key = self._get_verify_code_limit_cache_key(email)
         try:
             if cache.get(limit_key):
+                metrics.RATE_LIMIT_REJECTIONS.labels(scope='verify_code').inc()
                 return Response(
                     {'error': '发送太频繁，请稍后再试'}, 
                     status=status.HTTP_429_TOO_MANY_REQUESTS
@@ -403,12 +415,12 @@ class UserViewSet(viewsets.GenericViewSet):
 
     @swagger_auto_schema(
         operation_summary="获取用户列表",
-        operation_description="获取用户列表，支持搜索功能",
+        operation_description="获取用户列表，支持搜索功能；总数较大时 count 为估算值（count_approximate 为 true）",
         manual_parameters=[
             openapi.Parameter(
                 'search',
                 openapi.IN_QUERY,
-                description="搜索关键词(UID、用户名或邮箱)",
+                description="搜索关键词，按 UID、用户名或邮箱包含该关键词匹配",
                 type=openapi.TYPE_STRING,
                 required=False
             )
@@ -427,12 +439,8 @@ class UserViewSet(viewsets.GenericViewSet):
         
         # 如果有搜索关键词，添加搜索条件
         if search:
-            queryset = queryset.filter(
-                Q(uid__icontains=search) |
-                Q(username__icontains=search) |
-                Q(email__icontains=search)
-            )
-            
+            queryset = search_users(queryset, search)
+
         # 使用分页
         page = self.paginate_queryset(queryset)
         serializer = UserProfileSerializer(page, many=True, context={'request': request})
@@ -459,8 +467,7 @@ class UserViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=['get'])
     def count(self, request):
         """获取用户总数"""
-        total = self.get_queryset().filter(is_superuser=False).count()
-        return Response({'total': total}) 
+        return Response({'total': counters.total('users')})
 
     @swagger_auto_schema(
         operation_summary="拉黑用户",
@@ -575,7 +582,7 @@ class UserViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
     def blacklist_list(self, request):
         """获取黑名单列表"""
-        blacklisted_users = BlacklistedUser.objects.filter(user=request.user)
+        blacklisted_users = BlacklistedUser.objects.filter(user=request.user).select_related('blocked_user')
         page = self.paginate_queryset(blacklisted_users)
         serializer = BlacklistedUserSerializer(page, many=True)
         return self.get_paginated_response(serializer.data)
@@ -663,6 +670,7 @@ class UserViewSet(viewsets.GenericViewSet):
         # 检查发送频率限制
         limit_key = self._get_verify_code_limit_cache_key(email)
         if cache.get(limit_key):
+            metrics.RATE_LIMIT_REJECTIONS.labels(scope='reset_password_code').inc()
             return Response(
                 {'error': '验证码发送过于频繁，请稍后再试'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -776,7 +784,7 @@ class UserViewSet(viewsets.GenericViewSet):
     @action(detail=False, methods=['get'])
     def list_invitations(self, request):
         """获取邀请码列表"""
-        invitations = InvitationCode.objects.all()
+        invitations = InvitationCode.objects.select_related('created_by', 'used_by')
         page = self.paginate_queryset(invitations)
         serializer = InvitationCodeSerializer(page, many=True)
         return self.get_paginated_response(serializer.data)
@@ -5,3 +5,6 @@ class CharactersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.characters"
     verbose_name = "角色管理"
+
+    def ready(self):
+        from . import signals  # noqa: F401
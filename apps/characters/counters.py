@@ -0,0 +1,121 @@
+"""
+全站统计计数
+
+用户数（不含超级用户）与角色数保存在 Redis 计数器中，由模型信号在创建、删除时增减
+（用户见 apps/users/signals.py，保存时 is_superuser 变化也会增减，角色见 signals.py）：
+- counters:users        用户数
+- counters:characters   角色数
+在线存活者数取自在线状态有序集合（见 presence.py），由状态上报维护。
+
+计数器只在键已存在时增减，键缺失（Redis 被清空）时首次读取按数据库计数写入；
+reconcile 定时用数据库计数校正，修正增减与计数之间的竞争以及批量操作（QuerySet.update 修改
+is_superuser、bulk_create 等）绕过信号造成的偏差，这类偏差最长保留一个校正周期。
+汇总结果在缓存中保留 STATS_CACHE_TIMEOUT 秒，Redis 不可用时回退到数据库计数。
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from apps.users.models import User
+from utils.redis_client import get_redis_client
+
+from . import presence
+from .models import Character
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'counters:'
+STATS_CACHE_KEY = 'counters:stats'
+
+# 键存在时才增减，避免 Redis 被清空后从 0 开始计数
+INCR_IF_EXISTS = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('incrby', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+# 计数器名称 -> 计入的查询集
+COUNTERS = {
+    'users': lambda: User.objects.filter(is_superuser=False),
+    'characters': lambda: Character.objects.all(),
+}
+
+
+def _key(name):
+    return f"{KEY_PREFIX}{name}"
+
+
+def incr(name, amount=1):
+    """增减计数器，返回是否写入成功"""
+    client = get_redis_client()
+    if client is None:
+        return False
+    try:
+        client.eval(INCR_IF_EXISTS, 1, _key(name), amount)
+        return True
+    except RedisError as e:
+        logger.warning(f"Failed to update counter {name}: {e}")
+        return False
+
+
+def incr_on_commit(name, amount):
+    """事务提交后再增减计数器，回滚的创建或删除不计入"""
+    transaction.on_commit(lambda: incr(name, amount))
+
+
+def total(name):
+    """计数器的值，键缺失时按数据库计数写入；Redis 不可用时直接返回数据库计数"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            value = client.get(_key(name))
+            if value is not None:
+                return int(value)
+            count = COUNTERS[name]().count()
+            client.set(_key(name), count, nx=True)
+            return count
+        except RedisError as e:
+            logger.warning(f"Failed to read counter {name}: {e}")
+    return COUNTERS[name]().count()
+
+
+def online_total():
+    """在线存活者数，Redis 不可用时按最后活跃时间从数据库计数"""
+    count = presence.online_count()
+    if count is None:
+        cutoff = timezone.now() - timedelta(seconds=presence.get_ttl())
+        count = Character.objects.filter(last_active_at__gte=cutoff).count()
+    return count
+
+
+def get_stats():
+    """全站统计，结果缓存 STATS_CACHE_TIMEOUT 秒"""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        stats = {name: total(name) for name in COUNTERS}
+        stats['online'] = online_total()
+        cache.set(STATS_CACHE_KEY, stats, settings.STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def reconcile():
+    """
+    用数据库计数校正所有计数器
+
+    :return: {计数器名称: 数据库计数}，Redis 不可用时返回 None
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    counts = {name: queryset().count() for name, queryset in COUNTERS.items()}
+    pipe = client.pipeline(transaction=False)
+    for name, count in counts.items():
+        pipe.set(_key(name), count)
+    pipe.execute()
+    return counts
@@ -0,0 +1,212 @@
+"""
+留言 IP 归属地补全
+
+发送留言时只查本地 ip2region 库，查不到的留言 location 留空并安排
+enrich_message_locations 任务，由任务批量调用在线接口补全，外部接口故障不会拖慢发送留言。
+- 在线接口由 GEOLOCATION_PROVIDER 指定，实现 lookup(ip) 即可替换（如测试桩）
+- 结果按网段缓存（IPv4 /24，IPv6 /48），无结果的网段也缓存一段较短的时间
+- 接口连续失败达到阈值后熔断，冷却期内不再调用，未补全的留言留待下一批
+"""
+import ipaddress
+import json
+import logging
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from utils import ip_region, metrics
+from . import message_window
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'geo:net:'
+# 已处理到的留言 id
+CURSOR_KEY = 'geo:enrich:cursor'
+# 已安排补全任务的标记，延迟期内的留言合并到同一批
+SCHEDULED_KEY = 'geo:enrich:scheduled'
+
+
+class GeolocationUnavailable(Exception):
+    """在线接口不可用（调用失败或已熔断）"""
+
+
+class IpApiProvider:
+    """ip-api.com 在线查询，地址与超时由 IP_LOOKUP_URL、IP_LOOKUP_TIMEOUT 配置"""
+    name = 'ip-api'
+
+    def lookup(self, ip):
+        """返回 “省份 城市”，接口没有该 IP 的数据时返回 None，请求失败时抛出异常"""
+        url = settings.IP_LOOKUP_URL.format(ip=ip)
+        with urllib.request.urlopen(url, timeout=settings.IP_LOOKUP_TIMEOUT) as response:
+            data = json.loads(response.read().decode())
+        if data.get('status') != 'success':
+            return None
+        region = data.get('regionName', '')
+        city = data.get('city', '')
+        if region == city:
+            return region or None
+        return f"{region} {city}".strip() or None
+
+
+class CircuitBreaker:
+    """
+    基于缓存的熔断器，各 worker 共享状态
+
+    window 秒内连续失败 threshold 次后断开 cooldown 秒，期间 is_open 为真；
+    冷却结束后放行调用，成功一次即清零失败计数。
+    """
+
+    def __init__(self, name, threshold=5, window=60, cooldown=300):
+        self.failures_key = f'circuit:{name}:failures'
+        self.open_key = f'circuit:{name}:open'
+        self.name = name
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+
+    def is_open(self):
+        return cache.get(self.open_key) is not None
+
+    def record_success(self):
+        cache.delete(self.failures_key)
+
+    def record_failure(self):
+        cache.add(self.failures_key, 0, self.window)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            # 计数键恰好过期
+            failures = 1
+            cache.set(self.failures_key, failures, self.window)
+        if failures >= self.threshold:
+            cache.set(self.open_key, 1, self.cooldown)
+            cache.delete(self.failures_key)
+            logger.warning(f"Circuit {self.name} opened for {self.cooldown}s after {failures} failures")
+
+
+def get_provider():
+    return import_string(settings.GEOLOCATION_PROVIDER)()
+
+
+def get_breaker(provider):
+    return CircuitBreaker(
+        getattr(provider, 'name', type(provider).__name__),
+        threshold=settings.GEOLOCATION_BREAKER_THRESHOLD,
+        window=settings.GEOLOCATION_BREAKER_WINDOW,
+        cooldown=settings.GEOLOCATION_BREAKER_COOLDOWN,
+    )
+
+
+def network_key(ip):
+    """IP 所在网段的缓存键"""
+    prefix = 24 if ipaddress.ip_address(ip).version == 4 else 48
+    return f"{CACHE_PREFIX}{ipaddress.ip_network(f'{ip}/{prefix}', strict=False)}"
+
+
+def resolve(ip, provider, breaker):
+    """
+    查询 IP 归属地，没有数据时返回 None
+
+    依次查本地库、网段缓存、在线接口；在线接口失败或已熔断时抛出 GeolocationUnavailable。
+    """
+    province = ip_region.lookup_province(ip)
+    if province is not None:
+        metrics.GEOLOCATION_LOOKUPS.labels(result='local').inc()
+        return province or None
+
+    key = network_key(ip)
+    cached = cache.get(key)
+    if cached is not None:
+        metrics.GEOLOCATION_LOOKUPS.labels(result='cached').inc()
+        return cached or None
+
+    if breaker.is_open():
+        metrics.GEOLOCATION_LOOKUPS.labels(result='circuit_open').inc()
+        raise GeolocationUnavailable(f'circuit {breaker.name} is open')
+    try:
+        location = provider.lookup(ip)
+    except Exception as e:
+        metrics.GEOLOCATION_LOOKUPS.labels(result='failed').inc()
+        breaker.record_failure()
+        raise GeolocationUnavailable(f'{breaker.name} lookup failed for {ip}: {e}') from e
+    breaker.record_success()
+    metrics.GEOLOCATION_LOOKUPS.labels(result='resolved').inc()
+    cache.set(
+        key, location or '',
+        settings.GEOLOCATION_CACHE_TTL if location else settings.GEOLOCATION_NEGATIVE_CACHE_TTL
+    )
+    return location
+
+
+def enrich_pending(batch_size=None):
+    """
+    补全一批没有归属地的留言，返回补全的留言数
+
+    按 id 顺序处理，游标记录已处理到的位置；没有游标时从 GEOLOCATION_MAX_AGE 秒内的留言开始。
+    在线接口不可用时停在第一条未处理的留言，下一批从这里继续。
+    """
+    from .models import Message
+
+    batch_size = batch_size or settings.GEOLOCATION_BATCH_SIZE
+    pending = Message.objects.filter(location__isnull=True, ip_address__isnull=False)
+    cursor = cache.get(CURSOR_KEY)
+    if cursor is None:
+        pending = pending.filter(
+            created_at__gte=timezone.now() - timedelta(seconds=settings.GEOLOCATION_MAX_AGE)
+        )
+    else:
+        pending = pending.filter(id__gt=cursor)
+    rows = list(pending.order_by('id').values_list('id', 'ip_address', 'character_id')[:batch_size])
+
+    provider = get_provider()
+    breaker = get_breaker(provider)
+    locations = {}
+    updates = {}
+    characters = set()
+    processed = 0
+    for message_id, ip, character_id in rows:
+        if ip not in locations:
+            try:
+                locations[ip] = resolve(ip, provider, breaker)
+            except GeolocationUnavailable as e:
+                logger.warning(f"Geolocation enrichment paused: {e}")
+                break
+        if locations[ip]:
+            updates.setdefault(locations[ip], []).append(message_id)
+            characters.add(character_id)
+        cursor = message_id
+        processed += 1
+
+    for location, ids in updates.items():
+        Message.objects.filter(id__in=ids).update(location=location)
+    message_window.invalidate(*characters)
+    if cursor is not None:
+        cache.set(CURSOR_KEY, cursor, None)
+
+    # 本批满额且未中断时可能还有积压，继续处理下一批
+    if rows and processed == len(rows) == batch_size:
+        schedule_enrichment(countdown=0)
+    return sum(len(ids) for ids in updates.values())
+
+
+def schedule_enrichment(countdown=None):
+    """
+    安排一次补全任务
+
+    GEOLOCATION_BATCH_DELAY 秒内只安排一次，期间的留言由同一个任务批量处理；
+    消息队列不可用时只记录日志，由定时任务兜底。
+    """
+    delay = settings.GEOLOCATION_BATCH_DELAY if countdown is None else countdown
+    if countdown is None and not cache.add(SCHEDULED_KEY, 1, delay):
+        return False
+    from .tasks import enrich_message_locations
+    try:
+        enrich_message_locations.apply_async(countdown=delay)
+    except Exception as e:
+        logger.error(f"Failed to schedule geolocation enrichment: {e}")
+        return False
+    return True
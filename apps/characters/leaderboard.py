@@ -0,0 +1,127 @@
+"""
+经验值排行榜
+
+使用 Redis 有序集合 leaderboard:experience 维护激活且公开角色的经验值，
+member 为角色 uid，score 为经验值。前 N 名与单个角色排名均为 O(log n) 查询。
+Redis 不可用时查询函数返回 None，调用方应回退到数据库排序。
+"""
+import logging
+from redis.exceptions import RedisError
+
+from utils.db import iterate_in_chunks
+from utils.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_KEY = 'leaderboard:experience'
+REBUILD_BATCH_SIZE = 1000
+
+
+def _decode(member):
+    return member.decode() if isinstance(member, bytes) else member
+
+
+def is_ranked(character):
+    """只有激活且公开的角色参与排行"""
+    return character.is_active and character.is_public
+
+
+def update(character):
+    """同步单个角色的经验值，不参与排行的角色会被移除"""
+    client = get_redis_client()
+    if client is None:
+        return False
+    member = str(character.uid)
+    try:
+        if is_ranked(character):
+            client.zadd(LEADERBOARD_KEY, {member: character.experience})
+        else:
+            client.zrem(LEADERBOARD_KEY, member)
+        return True
+    except RedisError as e:
+        logger.warning(f"Failed to update leaderboard for {member}: {e}")
+        return False
+
+
+def remove(character_uid):
+    """从排行榜移除角色"""
+    client = get_redis_client()
+    if client is None:
+        return False
+    try:
+        client.zrem(LEADERBOARD_KEY, str(character_uid))
+        return True
+    except RedisError as e:
+        logger.warning(f"Failed to remove {character_uid} from leaderboard: {e}")
+        return False
+
+
+def top(limit):
+    """
+    经验值前 N 名
+
+    :return: [(角色uid, 经验值)]，Redis 不可用时返回 None
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        entries = client.zrevrange(LEADERBOARD_KEY, 0, limit - 1, withscores=True)
+    except RedisError as e:
+        logger.warning(f"Failed to read leaderboard: {e}")
+        return None
+    return [(_decode(member), int(score)) for member, score in entries]
+
+
+def rank(character_uid):
+    """
+    角色排名（从 1 开始）
+
+    :return: (排名, 排行总人数)，未上榜时排名为 None；Redis 不可用时返回 None
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.zrevrank(LEADERBOARD_KEY, str(character_uid))
+        pipe.zcard(LEADERBOARD_KEY)
+        position, total = pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Failed to read leaderboard rank for {character_uid}: {e}")
+        return None
+    return (position + 1 if position is not None else None), total
+
+
+def rebuild(queryset):
+    """
+    根据数据库重建排行榜
+
+    :param queryset: 参与排行的角色查询集
+    :return: 写入的角色数量，Redis 不可用时返回 None
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+
+    # 先写入临时键再原子替换，重建过程中读请求不受影响
+    tmp_key = f"{LEADERBOARD_KEY}:rebuild"
+    client.delete(tmp_key)
+    count = 0
+    batch = {}
+    rows = iterate_in_chunks(queryset.values('uid', 'experience'), REBUILD_BATCH_SIZE, key='uid')
+    for row in rows:
+        batch[str(row['uid'])] = row['experience']
+        if len(batch) >= REBUILD_BATCH_SIZE:
+            client.zadd(tmp_key, batch)
+            count += len(batch)
+            batch = {}
+    if batch:
+        client.zadd(tmp_key, batch)
+        count += len(batch)
+
+    if count:
+        client.rename(tmp_key, LEADERBOARD_KEY)
+    else:
+        client.delete(LEADERBOARD_KEY)
+    return count
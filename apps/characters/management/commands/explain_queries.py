@@ -0,0 +1,144 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from apps.characters import query_plans
+from apps.characters.models import Character
+
+
+class Command(BaseCommand):
+    help = '对热点查询执行 EXPLAIN，并与已提交的基线计划比较，发现计划退化时以非零状态退出'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            default=None,
+            help='逗号分隔的查询名，默认全部'
+        )
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='用本次结果覆盖基线'
+        )
+        parser.add_argument(
+            '--baseline-dir',
+            default=None,
+            help='基线目录，默认为 benchmarks/plans/<数据库类型>'
+        )
+        parser.add_argument(
+            '--cost-threshold',
+            type=float,
+            default=2.0,
+            help='总代价超过基线的倍数时视为回归（仅 PostgreSQL），默认 2.0'
+        )
+        parser.add_argument(
+            '--require-baseline',
+            action='store_true',
+            help='缺少基线时视为失败（CI 中使用），默认只提示'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='执行前先对相关表收集统计信息（仅 PostgreSQL），刚写入数据的库需要'
+        )
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='执行查询的数据库别名'
+        )
+        parser.add_argument(
+            '--output', '-o',
+            default=None,
+            help='把本次完整计划写入 JSON 文件'
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        vendor = connections[using].vendor
+        names = list(query_plans.REGISTRY)
+        if options['only']:
+            names = options['only'].split(',')
+            unknown = [name for name in names if name not in query_plans.REGISTRY]
+            if unknown:
+                raise CommandError(f'未知的查询: {", ".join(unknown)}')
+
+        if not Character.objects.using(using).exists():
+            raise CommandError('数据库中没有角色数据，请先运行 seed_data')
+
+        baseline_dir = options['baseline_dir'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', 'plans', vendor
+        )
+        if options['analyze'] and vendor == 'postgresql':
+            with connections[using].cursor() as cursor:
+                cursor.execute('ANALYZE')
+        ctx = query_plans.build_context()
+        results = {}
+        regressions = {}
+
+        for name in names:
+            try:
+                plans = [
+                    query_plans.explain(sql, using=using)
+                    for sql in query_plans.capture(name, ctx, using=using)
+                ]
+            except ValueError as e:
+                raise CommandError(str(e))
+            results[name] = plans
+            path = os.path.join(baseline_dir, f'{name}.json')
+
+            # 全表扫描检查不依赖基线，也不允许写入带有全表扫描的基线
+            problems = query_plans.check_scans(name, plans)
+            if problems:
+                regressions[name] = problems
+                self.report(name, problems, plans)
+                continue
+
+            if options['update']:
+                os.makedirs(baseline_dir, exist_ok=True)
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(
+                        [{key: plan[key] for key in ('sql', 'shape', 'total_cost')} for plan in plans],
+                        f, ensure_ascii=False, indent=2
+                    )
+                    f.write('\n')
+                self.stdout.write(f'{name}: 已更新基线')
+                continue
+
+            if not os.path.exists(path):
+                if options['require_baseline']:
+                    regressions[name] = ['没有基线']
+                    self.stdout.write(self.style.ERROR(f'{name}: 没有基线，使用 --update 生成并提交'))
+                else:
+                    self.stdout.write(self.style.WARNING(f'{name}: 没有基线，使用 --update 生成'))
+                continue
+            with open(path, encoding='utf-8') as f:
+                baseline = json.load(f)
+
+            problems = query_plans.compare(plans, baseline, options['cost_threshold'])
+            if problems:
+                regressions[name] = problems
+                self.report(name, problems, plans)
+            else:
+                timings = [plan['execution_ms'] for plan in plans if plan['execution_ms'] is not None]
+                suffix = f' ({sum(timings):.2f}ms)' if timings else ''
+                self.stdout.write(self.style.SUCCESS(f'{name}: OK{suffix}'))
+
+        if options['output']:
+            os.makedirs(os.path.dirname(os.path.abspath(options['output'])), exist_ok=True)
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2, default=str)
+                f.write('\n')
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} 个查询的执行计划发生退化: {", ".join(regressions)}')
+
+    def report(self, name, problems, plans):
+        """输出问题与本次的计划形状"""
+        self.stdout.write(self.style.ERROR(f'{name}: {"; ".join(problems)}'))
+        for index, plan in enumerate(plans):
+            self.stdout.write(f'  语句 {index}:')
+            for line in plan['shape']:
+                self.stdout.write(f'    {line}')
@@ -0,0 +1,73 @@
+import glob
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = '合并各 worker 写出的 folded 调用栈采样文件，输出可直接生成火焰图的结果'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            default=None,
+            help='采样文件目录，默认为 STACK_SAMPLER_DIR'
+        )
+        parser.add_argument(
+            '--role',
+            default=None,
+            help='只合并指定进程类型（web / celery）的文件'
+        )
+        parser.add_argument(
+            '--since',
+            type=float,
+            default=None,
+            help='只合并最近 N 小时内写出的文件'
+        )
+        parser.add_argument(
+            '--output', '-o',
+            default=None,
+            help='输出文件，默认输出到标准输出'
+        )
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='合并后删除原文件'
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or str(getattr(
+            settings, 'STACK_SAMPLER_DIR', os.path.join(settings.BASE_DIR, 'logs', 'stacks')
+        ))
+        if not os.path.isdir(directory):
+            raise CommandError(f'目录不存在: {directory}')
+
+        pattern = f"{options['role']}-*.folded" if options['role'] else '*.folded'
+        files = sorted(glob.glob(os.path.join(directory, pattern)))
+        if options['since'] is not None:
+            cutoff = time.time() - options['since'] * 3600
+            files = [path for path in files if os.path.getmtime(path) >= cutoff]
+
+        stacks = Counter()
+        for path in files:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if stack and count.isdigit():
+                        stacks[stack] += int(count)
+
+        lines = [f"{stack} {count}\n" for stack, count in stacks.most_common()]
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+        else:
+            self.stdout.write(''.join(lines), ending='')
+
+        if options['delete']:
+            for path in files:
+                os.remove(path)
+
+        self.stderr.write(f'合并 {len(files)} 个文件，共 {sum(stacks.values())} 个样本')
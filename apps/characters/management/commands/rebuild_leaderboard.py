@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.characters.models import Character
+from apps.characters import leaderboard
+
+
+class Command(BaseCommand):
+    help = '根据数据库重建经验值排行榜'
+
+    def handle(self, *args, **options):
+        queryset = Character.objects.filter(is_active=True, is_public=True)
+        count = leaderboard.rebuild(queryset)
+        if count is None:
+            raise CommandError('当前缓存后端不是 Redis，无法重建排行榜')
+        self.stdout.write(self.style.SUCCESS(f'排行榜重建完成，共 {count} 个角色'))
@@ -0,0 +1,75 @@
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.characters.seeding import SCALES, Seeder
+
+
+class Command(BaseCommand):
+    help = '按随机种子生成模拟数据（用户、角色、状态历史、留言、遗嘱），用于本地复现线上规模'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='数据规模预设')
+        parser.add_argument('--users', type=int, help='用户数')
+        parser.add_argument('--characters', type=int, help='角色数')
+        parser.add_argument('--days', type=float, help='状态历史天数')
+        parser.add_argument('--messages', type=int, help='每个角色的平均留言数')
+        parser.add_argument('--wills', type=int, help='配置遗嘱的角色数')
+        parser.add_argument('--seed', type=int, default=42, help='随机种子')
+        parser.add_argument(
+            '--now', default=None,
+            help='数据的参考时间（ISO 格式），默认为当前时间；种子、参数和参考时间都相同时生成的数据完全一致'
+        )
+        parser.add_argument(
+            '--method', choices=['copy', 'insert'], default=None,
+            help='写入方式，默认 PostgreSQL 使用 COPY，其他数据库使用批量 INSERT'
+        )
+        parser.add_argument('--batch-size', type=int, default=10000, help='每批写入行数')
+        parser.add_argument('--flush', action='store_true', help='生成前清空数据库')
+        parser.add_argument('--force', action='store_true', help='允许在 DEBUG=False 的环境中运行')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('当前为非 DEBUG 环境，确认不是生产数据库后使用 --force 运行')
+
+        params = dict(SCALES[options['scale']])
+        for key in params:
+            if options[key] is not None:
+                params[key] = options[key]
+        if params['users'] < 1 or params['characters'] < 1 or params['days'] <= 0:
+            raise CommandError('users、characters、days 必须大于 0')
+        params['wills'] = min(params['wills'], params['characters'])
+
+        now = None
+        if options['now']:
+            now = parse_datetime(options['now'])
+            if now is None:
+                raise CommandError(f"无法解析时间: {options['now']}")
+            if timezone.is_naive(now):
+                now = timezone.make_aware(now)
+
+        if options['flush']:
+            call_command('flush', interactive=False, verbosity=0)
+
+        try:
+            seeder = Seeder(
+                seed=options['seed'], now=now, method=options['method'],
+                batch_size=options['batch_size'], stdout=self.stdout
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'生成数据（{connection.vendor}，{seeder.method}）：{params}')
+        started = time.perf_counter()
+        counts = seeder.run(**params)
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'完成，共 {total} 行，用时 {elapsed:.1f} 秒（{total / elapsed:.0f} 行/秒）'
+        ))
+        self.stdout.write('排行榜与在线状态需另行重建：manage.py rebuild_leaderboard')
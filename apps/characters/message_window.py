@@ -0,0 +1,84 @@
+"""
+角色最近留言缓存
+
+留言板轮询的最近 WINDOW_SIZE 条留言按角色缓存序列化结果，命中时不再查询留言表。
+留言新增、删除或补全归属地后递增该角色的版本号，缓存键随之变化，
+避免与写入并发的重建把旧数据写回。更早的留言用 before_id 按 id 倒序做键集分页，不走缓存。
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from utils import db_router
+
+WINDOW_SIZE = 50
+
+
+def _version_key(character_id):
+    return f'messages:version:{character_id}'
+
+
+def _window_key(character_id, version):
+    return f'messages:recent:{character_id}:{version}'
+
+
+def get_timeout():
+    """缓存有效期（秒），同时限制版本号丢失时旧数据的存活时间"""
+    return getattr(settings, 'MESSAGE_WINDOW_TIMEOUT', 600)
+
+
+def parse_before_id(value):
+    """解析 before_id 查询参数，未提供时返回 None，无效时抛出 ValueError"""
+    if value is None:
+        return None
+    try:
+        before_id = int(value)
+    except (TypeError, ValueError):
+        before_id = 0
+    if before_id <= 0:
+        raise ValueError('必须为正整数')
+    return before_id
+
+
+def recent_messages(character, before_id=None, limit=WINDOW_SIZE):
+    """角色最近的留言，按 id 倒序；指定 before_id 时返回更早的一页"""
+    from .models import Message
+
+    queryset = Message.objects.filter(character=character)
+    if before_id is not None:
+        queryset = queryset.filter(id__lt=before_id)
+    return queryset.order_by('-id')[:limit]
+
+
+def get_window(character, build):
+    """最近留言的序列化结果，未命中时调用 build() 生成并写入缓存"""
+    key = _window_key(character.pk, cache.get(_version_key(character.pk), 0))
+    data = cache.get(key)
+    if data is None:
+        # 缓存对所有客户端可见，从主库重建，避免把副本上延迟的数据写进新版本
+        with db_router.routing_scope():
+            data = list(build())
+        cache.set(key, data, get_timeout())
+    return data
+
+
+async def aget_window(character, build):
+    """get_window 的异步版本，build 为协程函数"""
+    key = _window_key(character.pk, await cache.aget(_version_key(character.pk), 0))
+    data = await cache.aget(key)
+    if data is None:
+        with db_router.routing_scope():
+            data = list(await build())
+        await cache.aset(key, data, get_timeout())
+    return data
+
+
+def invalidate(*character_ids):
+    """角色留言变化后使缓存失效"""
+    for character_id in set(character_ids):
+        key = _version_key(character_id)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # 版本号恰好被淘汰
+            cache.set(key, 1, None)
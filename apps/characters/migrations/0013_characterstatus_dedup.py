@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0012_add_experience_system'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='characterstatus',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, help_text='相同内容最后一次上报时间', null=True),
+        ),
+        migrations.AddField(
+            model_name='characterstatus',
+            name='repeat_count',
+            field=models.PositiveIntegerField(default=1, help_text='相同内容累计上报次数'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0013_characterstatus_dedup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='last_active_at',
+            field=models.DateTimeField(blank=True, help_text='最后一次上报状态的时间', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['is_active', 'is_public', '-last_active_at'], name='characters__is_acti_2be00e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='character',
+            index=models.Index(fields=['last_active_at'], name='characters__last_ac_ada4c7_idx'),
+        ),
+    ]
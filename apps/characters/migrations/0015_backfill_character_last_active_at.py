@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:18
+
+from django.db import migrations
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_active_at(apps, schema_editor):
+    """根据状态历史回填角色最后活跃时间，非定时更新（other）不计入"""
+    Character = apps.get_model('characters', 'Character')
+    CharacterStatus = apps.get_model('characters', 'CharacterStatus')
+
+    last_reported = CharacterStatus.objects.filter(
+        character=OuterRef('pk')
+    ).exclude(status_type='other').values('character').annotate(
+        last_reported_at=Max(Coalesce('last_seen', 'timestamp'))
+    ).values('last_reported_at')
+
+    Character.objects.filter(last_active_at__isnull=True).update(
+        last_active_at=Subquery(last_reported)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0014_character_last_active_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_last_active_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0015_backfill_character_last_active_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['character', '-id'], name='characters__charact_a3127d_idx'),
+        ),
+    ]
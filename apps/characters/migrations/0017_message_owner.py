@@ -0,0 +1,49 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_owner(apps, schema_editor):
+    """根据角色回填留言的主人"""
+    Character = apps.get_model('characters', 'Character')
+    Message = apps.get_model('characters', 'Message')
+
+    owner = Character.objects.filter(pk=OuterRef('character_id')).values('user_id')[:1]
+    Message.objects.filter(owner__isnull=True).update(owner_id=Subquery(owner))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('characters', '0016_message_character_id_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='owner',
+            field=models.ForeignKey(
+                db_column='owner_uid', db_index=False, editable=False, null=True,
+                on_delete=django.db.models.deletion.CASCADE, related_name='+',
+                to=settings.AUTH_USER_MODEL, to_field='uid'
+            ),
+        ),
+        migrations.RunPython(backfill_owner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='message',
+            name='owner',
+            field=models.ForeignKey(
+                db_column='owner_uid', db_index=False, editable=False,
+                on_delete=django.db.models.deletion.CASCADE, related_name='+',
+                to=settings.AUTH_USER_MODEL, to_field='uid'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['owner', '-id'], name='characters__owner_u_79234c_idx'),
+        ),
+    ]
@@ -1,8 +1,13 @@
 import uuid
+import json
+import hashlib
 import secrets
 import string
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
 
@@ -87,6 +92,9 @@ class Character(models.Model):
     danmaku_ips_today = models.JSONField(default=list, blank=True, help_text='今日已贡献经验的IP列表')
     danmaku_ips_date = models.DateField(null=True, blank=True, help_text='IP列表对应的日期')
 
+    # 最后一次上报状态的时间，由状态上报接口维护，避免每次从状态历史表推导
+    last_active_at = models.DateTimeField(null=True, blank=True, help_text='最后一次上报状态的时间')
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -94,6 +102,10 @@ class Character(models.Model):
             models.Index(fields=['secret_key']),
             models.Index(fields=['display_code']),
             models.Index(fields=['is_public']),
+            # 存活者列表：激活且公开的角色按最近活跃排序
+            models.Index(fields=['is_active', 'is_public', '-last_active_at']),
+            # 遗嘱检查等：查找超过一定时间未活跃的角色
+            models.Index(fields=['last_active_at']),
         ]
 
     def __str__(self):
@@ -106,6 +118,26 @@ class Character(models.Model):
             if not Character.objects.filter(display_code=code).exists():
                 return code
 
+    def mark_active(self, when=None):
+        """更新最后活跃时间，条件更新保证时间只向前推进"""
+        when = when or timezone.now()
+        updated = Character.objects.filter(pk=self.pk).filter(
+            models.Q(last_active_at__isnull=True) | models.Q(last_active_at__lt=when)
+        ).update(last_active_at=when)
+        if updated:
+            self.last_active_at = when
+        return bool(updated)
+
+    async def amark_active(self, when=None):
+        """mark_active 的异步版本"""
+        when = when or timezone.now()
+        updated = await Character.objects.filter(pk=self.pk).filter(
+            models.Q(last_active_at__isnull=True) | models.Q(last_active_at__lt=when)
+        ).aupdate(last_active_at=when)
+        if updated:
+            self.last_active_at = when
+        return bool(updated)
+
     def save(self, *args, **kwargs):
         if not self.pk and not self.display_code:
             self.display_code = self.generate_display_code()
@@ -119,6 +151,8 @@ class CharacterStatus(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     status_type = models.CharField(max_length=50)
     data = models.JSONField()
+    last_seen = models.DateTimeField(null=True, blank=True, help_text='相同内容最后一次上报时间')
+    repeat_count = models.PositiveIntegerField(default=1, help_text='相同内容累计上报次数')
     
     class Meta:
         ordering = ['-timestamp']
@@ -127,6 +161,100 @@ class CharacterStatus(models.Model):
         ]
         verbose_name = '角色状态'
         verbose_name_plural = '角色状态'
+
+    # 非定时更新的状态类型，不计入在线判断
+    UNSCHEDULED_TYPE = 'other'
+
+    @property
+    def reported_at(self):
+        """最后一次上报时间（包含被去重合并的重复上报）"""
+        return self.last_seen or self.timestamp
+
+    @classmethod
+    def counts_as_activity(cls, status_type):
+        """该类型的上报是否计入在线判断"""
+        return status_type != cls.UNSCHEDULED_TYPE
+
+    @staticmethod
+    def hash_data(data):
+        """计算状态数据的内容哈希，键顺序不影响结果"""
+        payload = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _latest_cache_key(character, status_type):
+        return f"status_latest:{character.uid}:{status_type}"
+
+    @classmethod
+    def record(cls, character, status_type, data):
+        """
+        写入一条状态上报，返回是否插入了新记录
+
+        开启 STATUS_DEDUP_ENABLED 时，若内容与缓存中同类型最新记录的哈希一致，
+        只刷新该记录的 last_seen 和 repeat_count，不再插入新行
+        """
+        dedup_enabled = getattr(settings, 'STATUS_DEDUP_ENABLED', False)
+        if dedup_enabled:
+            data_hash = cls.hash_data(data)
+            cache_key = cls._latest_cache_key(character, status_type)
+            cached = cache.get(cache_key)
+            if cached and cached[1] == data_hash:
+                updated = cls.objects.filter(id=cached[0]).update(
+                    last_seen=timezone.now(),
+                    repeat_count=models.F('repeat_count') + 1
+                )
+                # 缓存指向的记录可能已被删除，此时回退为插入新记录
+                if updated:
+                    return False
+
+        status = cls.objects.create(
+            character=character,
+            status_type=status_type,
+            data=data
+        )
+        if dedup_enabled:
+            cache.set(
+                cache_key,
+                [status.id, data_hash],
+                getattr(settings, 'STATUS_DEDUP_CACHE_TIMEOUT', 60 * 60 * 24)
+            )
+        return True
+
+    @classmethod
+    async def arecord(cls, character, status_type, data):
+        """record 的异步版本"""
+        dedup_enabled = getattr(settings, 'STATUS_DEDUP_ENABLED', False)
+        if dedup_enabled:
+            data_hash = cls.hash_data(data)
+            cache_key = cls._latest_cache_key(character, status_type)
+            cached = await cache.aget(cache_key)
+            if cached and cached[1] == data_hash:
+                updated = await cls.objects.filter(id=cached[0]).aupdate(
+                    last_seen=timezone.now(),
+                    repeat_count=models.F('repeat_count') + 1
+                )
+                if updated:
+                    return False
+
+        status = await cls.objects.acreate(
+            character=character,
+            status_type=status_type,
+            data=data
+        )
+        if dedup_enabled:
+            await cache.aset(
+                cache_key,
+                [status.id, data_hash],
+                getattr(settings, 'STATUS_DEDUP_CACHE_TIMEOUT', 60 * 60 * 24)
+            )
+        return True
+
+    @classmethod
+    def get_last_reported_at(cls, character):
+        """获取角色最后一次上报任意状态的时间"""
+        return cls.objects.filter(character=character).aggregate(
+            last_reported_at=models.Max(Coalesce('last_seen', 'timestamp'))
+        )['last_reported_at']
         
     @classmethod
     def get_latest_status(cls, character):
@@ -141,6 +269,17 @@ class CharacterStatus(models.Model):
             id__in=[item['latest_id'] for item in latest_by_type]
         )
 
+    @classmethod
+    async def aget_latest_status(cls, character):
+        """get_latest_status 的异步版本，返回列表"""
+        latest_by_type = cls.objects.filter(
+            character=character
+        ).values('status_type').annotate(
+            latest_id=models.Max('id')
+        )
+        latest_ids = [item['latest_id'] async for item in latest_by_type]
+        return [status async for status in cls.objects.filter(id__in=latest_ids)]
+
 class WillConfig(models.Model):
     character = models.OneToOneField(Character, on_delete=models.CASCADE, related_name='will_config')
     is_enabled = models.BooleanField(default=False)
@@ -185,6 +324,16 @@ class WillConfig(models.Model):
 
 class Message(models.Model):
     character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name='messages')
+    # 冗余角色主人，主人跨角色查看、删除留言时不必连表
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        to_field='uid',
+        db_column='owner_uid',
+        db_index=False,
+        editable=False,
+    )
     content = models.TextField(max_length=500, help_text='留言内容')
     ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name="IP地址")
     location = models.CharField(max_length=100, blank=True, null=True, verbose_name="地理位置")
@@ -194,7 +343,16 @@ class Message(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['character', '-created_at']),
+            # 留言板按 id 倒序取最近一页及 before_id 翻页
+            models.Index(fields=['character', '-id']),
+            # 主人查看所有角色的最新留言
+            models.Index(fields=['owner', '-id']),
         ]
         verbose_name = '留言'
         verbose_name_plural = '留言'
 
+    def save(self, *args, **kwargs):
+        if self.owner_id is None:
+            self.owner_id = self.character.user_id
+        super().save(*args, **kwargs)
+
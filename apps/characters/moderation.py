@@ -0,0 +1,147 @@
+"""
+留言管理与过期归档
+
+主人收件箱按留言冗余的 owner 查询所有角色的最新留言，以 before_id 做键集分页。
+批量删除按条件生成一条 DELETE 语句，不逐条取回留言；删除后统一使最近留言缓存失效。
+超过 MESSAGE_RETENTION_DAYS 天的留言按 id 顺序分批处理：每批按角色写入 gzip 压缩的
+JSON Lines 文件，再在一个短事务中按 id 删除，避免一次删除大量行长时间持有锁。
+归档文件位于 MESSAGE_ARCHIVE_DIR/<角色 id>/<首条 id>-<末条 id>.jsonl.gz，
+同一批重复归档时覆盖同名文件。
+"""
+import gzip
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import message_window
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+INBOX_PAGE_SIZE = 50
+ARCHIVE_FIELDS = ('id', 'character_id', 'content', 'ip_address', 'location', 'created_at')
+
+
+def raw_delete(queryset):
+    """
+    以一条 DELETE ... WHERE pk IN (SELECT ...) 语句删除查询集，返回删除的行数
+
+    留言表没有被其他表引用；QuerySet.delete 在存在 post_delete 接收者时会先取回全部留言
+    再逐条发送信号，调用方需自行使缓存失效。
+    """
+    model = queryset.model
+    using = router.db_for_write(model)
+    connection = connections[using]
+    try:
+        select_sql, params = queryset.values('pk').query.get_compiler(using=using).as_sql()
+    except EmptyResultSet:
+        # 条件必然为空，例如 id__in=[]
+        return 0
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({select_sql})', params)
+        return cursor.rowcount
+
+
+def filter_messages(queryset, ip_address=None, created_after=None, created_before=None):
+    """按 IP 与时间范围 [created_after, created_before) 过滤留言，未提供的条件不过滤"""
+    if ip_address is not None:
+        queryset = queryset.filter(ip_address=ip_address)
+    if created_after is not None:
+        queryset = queryset.filter(created_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(created_at__lt=created_before)
+    return queryset
+
+
+def bulk_delete(character, ids=None, **filters):
+    """按 id 列表、IP、时间范围删除角色的留言，多个条件同时满足才删除，返回删除数"""
+    queryset = Message.objects.filter(character=character)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    deleted = raw_delete(filter_messages(queryset, **filters))
+    if deleted:
+        message_window.invalidate(character.pk)
+    return deleted
+
+
+def inbox(user, character=None, before_id=None, limit=INBOX_PAGE_SIZE, **filters):
+    """
+    用户所有角色的留言，按 id 倒序，before_id 用于向前翻页
+
+    按冗余的 owner 过滤，由 (owner, -id) 索引按顺序读取；只为返回的一页连表取角色名。
+    """
+    queryset = Message.objects.filter(owner=user)
+    if character is not None:
+        queryset = queryset.filter(character=character)
+    if before_id is not None:
+        queryset = queryset.filter(id__lt=before_id)
+    return filter_messages(queryset, **filters).select_related('character').only(
+        'id', 'content', 'created_at', 'ip_address', 'location', 'character__name'
+    ).order_by('-id')[:limit]
+
+
+def archive_path(character_id, first_id, last_id):
+    return os.path.join(settings.MESSAGE_ARCHIVE_DIR, str(character_id), f'{first_id}-{last_id}.jsonl.gz')
+
+
+def write_archive(character_id, rows):
+    """把一个角色的一批留言写入归档文件，写完并落盘后才替换为正式文件名"""
+    path = archive_path(character_id, rows[0]['id'], rows[-1]['id'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb') as archive:
+            for row in rows:
+                line = json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False)
+                archive.write(f'{line}\n'.encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_expired(days=None, batch_size=None, max_batches=None):
+    """
+    归档并删除过期留言，返回处理的留言数
+
+    days 为 0 时不处理；每次最多处理 max_batches 批，剩余的留给下一次执行。
+    """
+    days = settings.MESSAGE_RETENTION_DAYS if days is None else days
+    if not days:
+        return 0
+    batch_size = batch_size or settings.MESSAGE_ARCHIVE_BATCH_SIZE
+    max_batches = max_batches or settings.MESSAGE_ARCHIVE_MAX_BATCHES
+    cutoff = timezone.now() - timedelta(days=days)
+    expired = Message.objects.filter(created_at__lt=cutoff).order_by('id').values(*ARCHIVE_FIELDS)
+
+    total = 0
+    for _ in range(max_batches):
+        rows = list(expired[:batch_size])
+        if not rows:
+            break
+        by_character = defaultdict(list)
+        for row in rows:
+            by_character[row['character_id']].append(row)
+        for character_id, character_rows in by_character.items():
+            write_archive(character_id, character_rows)
+
+        with transaction.atomic(using=router.db_for_write(Message)):
+            raw_delete(Message.objects.filter(id__in=[row['id'] for row in rows]))
+        message_window.invalidate(*by_character)
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    if total:
+        logger.info(f"Archived {total} messages older than {days} days")
+    return total
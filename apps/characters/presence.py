@@ -0,0 +1,177 @@
+"""
+角色在线状态（Presence）
+
+每次状态上报刷新一个带 TTL 的角色键，并在有序集合中记录最后上报时间：
+- presence:character:<uid>   最后上报时间戳，TTL 为在线判定窗口
+- presence:last_seen         有序集合，member 为角色 uid，score 为最后上报时间戳
+
+"某角色是否在线"为 O(1)，"在线角色列表/数量"为 O(log n) 的有序集合范围查询。
+Redis 不可用时各查询函数返回 None，调用方应回退到数据库判断。
+"""
+import time
+import logging
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from utils.redis_client import get_async_redis_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'presence:character:'
+LAST_SEEN_KEY = 'presence:last_seen'
+# 重建完成标记，Redis 被清空后该键消失，用于触发修复任务
+READY_KEY = 'presence:ready'
+
+
+def get_ttl():
+    """在线判定窗口（秒）"""
+    return getattr(settings, 'PRESENCE_TTL', 15 * 60)
+
+
+def _character_key(character_uid):
+    return f"{KEY_PREFIX}{character_uid}"
+
+
+def touch(character_uid, reported_at=None):
+    """记录一次状态上报，返回是否写入成功"""
+    client = get_redis_client()
+    if client is None:
+        return False
+
+    timestamp = reported_at.timestamp() if reported_at else time.time()
+    remaining = int(timestamp + get_ttl() - time.time())
+    member = str(character_uid)
+    try:
+        pipe = client.pipeline(transaction=False)
+        if remaining > 0:
+            pipe.set(_character_key(member), int(timestamp), ex=remaining)
+        # 只允许时间向前推进，避免乱序写入覆盖更新的记录
+        pipe.zadd(LAST_SEEN_KEY, {member: timestamp}, gt=True)
+        pipe.execute()
+        return True
+    except RedisError as e:
+        logger.warning(f"Failed to update presence for {member}: {e}")
+        return False
+
+
+async def atouch(character_uid, reported_at=None):
+    """touch 的异步版本"""
+    client = get_async_redis_client()
+    if client is None:
+        return False
+
+    timestamp = reported_at.timestamp() if reported_at else time.time()
+    remaining = int(timestamp + get_ttl() - time.time())
+    member = str(character_uid)
+    try:
+        pipe = client.pipeline(transaction=False)
+        if remaining > 0:
+            pipe.set(_character_key(member), int(timestamp), ex=remaining)
+        pipe.zadd(LAST_SEEN_KEY, {member: timestamp}, gt=True)
+        await pipe.execute()
+        return True
+    except RedisError as e:
+        logger.warning(f"Failed to update presence for {member}: {e}")
+        return False
+
+
+def is_online(character_uid):
+    """角色是否在线，Redis 不可用时返回 None"""
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        return bool(client.exists(_character_key(character_uid)))
+    except RedisError as e:
+        logger.warning(f"Failed to read presence for {character_uid}: {e}")
+        return None
+
+
+async def ais_online(character_uid):
+    """is_online 的异步版本"""
+    client = get_async_redis_client()
+    if client is None:
+        return None
+    try:
+        return bool(await client.exists(_character_key(character_uid)))
+    except RedisError as e:
+        logger.warning(f"Failed to read presence for {character_uid}: {e}")
+        return None
+
+
+def online_uids():
+    """当前在线的角色 uid 集合，Redis 不可用时返回 None"""
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        members = client.zrangebyscore(LAST_SEEN_KEY, time.time() - get_ttl(), '+inf')
+    except RedisError as e:
+        logger.warning(f"Failed to read online characters: {e}")
+        return None
+    return {member.decode() if isinstance(member, bytes) else member for member in members}
+
+
+def online_count():
+    """当前在线的角色数量，Redis 不可用时返回 None"""
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        return client.zcount(LAST_SEEN_KEY, time.time() - get_ttl(), '+inf')
+    except RedisError as e:
+        logger.warning(f"Failed to count online characters: {e}")
+        return None
+
+
+def is_ready():
+    """在线状态是否已经从数据库构建过，Redis 不可用时返回 None"""
+    client = get_redis_client()
+    if client is None:
+        return None
+    try:
+        return bool(client.exists(READY_KEY))
+    except RedisError:
+        return None
+
+
+def prune():
+    """清理有序集合中早已离线的成员，返回清理数量"""
+    client = get_redis_client()
+    if client is None:
+        return 0
+    try:
+        return client.zremrangebyscore(LAST_SEEN_KEY, '-inf', time.time() - get_ttl())
+    except RedisError as e:
+        logger.warning(f"Failed to prune presence: {e}")
+        return 0
+
+
+def rebuild(last_seen_by_uid):
+    """
+    用数据库中的最后上报时间重建在线状态
+
+    :param last_seen_by_uid: {角色uid: 最后上报时间(datetime)}
+    :return: 写入的在线角色数量，Redis 不可用时返回 None
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+
+    now = time.time()
+    ttl = get_ttl()
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(LAST_SEEN_KEY)
+    count = 0
+    for uid, reported_at in last_seen_by_uid.items():
+        timestamp = reported_at.timestamp()
+        remaining = int(timestamp + ttl - now)
+        if remaining <= 0:
+            continue
+        member = str(uid)
+        pipe.set(_character_key(member), int(timestamp), ex=remaining)
+        pipe.zadd(LAST_SEEN_KEY, {member: timestamp})
+        count += 1
+    pipe.set(READY_KEY, int(now))
+    pipe.execute()
+    return count
@@ -0,0 +1,197 @@
+"""
+热点查询执行计划
+
+每个注册的查询按业务代码的真实方式执行 ORM 调用，捕获其产生的 SELECT 语句后再做 EXPLAIN，
+这样查询写法变化时计划会随之更新，不需要手工维护 SQL。
+
+计划的"形状"只包含节点类型、表名和索引名，不包含代价与行数，用于和基线比较：
+形状变化（例如索引扫描退化为顺序扫描）或总代价超过基线的一定倍数视为回归。
+注册时声明的 indexed 表不允许全表扫描，这一检查不依赖基线，没有提交基线的数据库同样生效。
+"""
+import json
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import message_window, moderation
+from .models import Character, CharacterStatus
+
+REGISTRY = {}
+
+
+def register(name, description, indexed=()):
+    """
+    注册热点查询，被装饰函数接收 context 并执行对应的 ORM 调用
+
+    :param indexed: 必须走索引、不允许全表扫描的表
+    """
+    def decorator(func):
+        REGISTRY[name] = {'name': name, 'description': description, 'func': func, 'indexed': tuple(indexed)}
+        return func
+    return decorator
+
+
+def build_context():
+    """选取确定的样本角色：按 uid 排序的第一个公开且激活的角色"""
+    character = (
+        Character.objects.filter(is_active=True, is_public=True).order_by('uid').first()
+        or Character.objects.order_by('uid').first()
+    )
+    return {'character': character, 'now': timezone.now()}
+
+
+@register('latest_status', '展示页：获取角色各类型最新状态', indexed=['characters_characterstatus'])
+def latest_status(ctx):
+    list(CharacterStatus.get_latest_status(ctx['character']))
+
+
+@register('last_reported_at', '状态接口：角色最后一次上报时间', indexed=['characters_characterstatus'])
+def last_reported_at(ctx):
+    CharacterStatus.get_last_reported_at(ctx['character'])
+
+
+@register(
+    'check_wills', '定时任务：统计启用的遗嘱并筛选可能超时的候选', indexed=['characters_characterstatus']
+)
+def check_wills(ctx):
+    from .tasks import get_will_candidates
+
+    _, candidates = get_will_candidates(ctx['now'])
+    if candidates is not None:
+        list(candidates)
+
+
+@register('survivors_list', '存活者列表：公开角色按最近活跃排序')
+def survivors_list(ctx):
+    # 与 SurvivorsListView.get_queryset 保持一致
+    list(Character.objects.filter(is_active=True, is_public=True).order_by(
+        F('last_active_at').desc(nulls_last=True)
+    ))
+
+
+@register('message_list', '留言列表：角色最近 50 条留言（缓存未命中时）', indexed=['characters_message'])
+def message_list(ctx):
+    list(message_window.recent_messages(ctx['character']))
+
+
+@register('message_history', '留言列表：before_id 向前翻页', indexed=['characters_message'])
+def message_history(ctx):
+    list(message_window.recent_messages(ctx['character'], before_id=2 ** 62))
+
+
+@register('message_inbox', '收件箱：主人所有角色的最新 50 条留言', indexed=['characters_message'])
+def message_inbox(ctx):
+    list(moderation.inbox(ctx['character'].user_id))
+
+
+@register('leaderboard_fallback', '排行榜：Redis 不可用时的数据库排序')
+def leaderboard_fallback(ctx):
+    list(Character.objects.filter(
+        is_active=True, is_public=True
+    ).order_by('-experience', 'created_at')[:20])
+
+
+def capture(name, ctx, using=DEFAULT_DB_ALIAS):
+    """执行注册的查询并返回其产生的 SELECT 语句，执行结束后回滚"""
+    with transaction.atomic(using=using):
+        with CaptureQueriesContext(connections[using]) as captured:
+            REGISTRY[name]['func'](ctx)
+        transaction.set_rollback(True, using=using)
+    return [
+        query['sql'] for query in captured.captured_queries
+        if query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+
+
+def explain(sql, using=DEFAULT_DB_ALIAS):
+    """对语句做 EXPLAIN，返回 {'sql', 'shape', 'total_cost', 'execution_ms', 'plan'}"""
+    conn = connections[using]
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}')
+            raw = cursor.fetchone()[0]
+            if isinstance(raw, str):
+                raw = json.loads(raw)
+            plan = raw[0]
+            return {
+                'sql': sql,
+                'shape': postgres_shape(plan['Plan']),
+                'total_cost': plan['Plan'].get('Total Cost'),
+                'execution_ms': plan.get('Execution Time'),
+                'plan': plan,
+            }
+        if conn.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            rows = cursor.fetchall()
+            return {
+                'sql': sql,
+                'shape': sqlite_shape(rows),
+                'total_cost': None,
+                'execution_ms': None,
+                'plan': [list(row) for row in rows],
+            }
+        raise ValueError(f'不支持的数据库: {conn.vendor}')
+
+
+def postgres_shape(node, depth=0):
+    """把 PostgreSQL 计划树展开为带缩进的节点描述列表"""
+    label = node['Node Type']
+    if node.get('Relation Name'):
+        label += f" on {node['Relation Name']}"
+    if node.get('Index Name'):
+        label += f" using {node['Index Name']}"
+    shape = ['  ' * depth + label]
+    for child in node.get('Plans', []):
+        shape.extend(postgres_shape(child, depth + 1))
+    return shape
+
+
+def sqlite_shape(rows):
+    """SQLite 的计划行 (id, parent, notused, detail)，按父子关系缩进"""
+    depths = {0: -1}
+    shape = []
+    for row_id, parent, _, detail in rows:
+        depths[row_id] = depths.get(parent, -1) + 1
+        # 子查询编号等随语句参数个数变化，不属于计划形状
+        detail = re.sub(r'\b(LIST|SCALAR) SUBQUERY \d+', r'\1 SUBQUERY', detail)
+        shape.append('  ' * depths[row_id] + detail)
+    return shape
+
+
+def full_scans(shape, tables):
+    """计划形状中对 tables 的全表扫描（PostgreSQL 的 Seq Scan，SQLite 不带索引的 SCAN）"""
+    scanned = []
+    for line in shape:
+        line = line.strip()
+        match = re.match(r'(?:Parallel )?Seq Scan on (\S+)', line) or re.match(r'SCAN (\S+)$', line)
+        if match and match.group(1) in tables:
+            scanned.append(match.group(1))
+    return scanned
+
+
+def check_scans(name, plans):
+    """检查查询的各条语句是否对声明为 indexed 的表做了全表扫描，返回问题描述列表"""
+    problems = []
+    for index, plan in enumerate(plans):
+        for table in full_scans(plan['shape'], REGISTRY[name]['indexed']):
+            problems.append(f'语句 {index} 全表扫描 {table}')
+    return problems
+
+
+def compare(current, baseline, cost_threshold=2.0):
+    """比较一个查询的各条语句计划与基线，返回问题描述列表"""
+    problems = []
+    if len(current) != len(baseline):
+        problems.append(f'语句数量变化: {len(baseline)} -> {len(current)}')
+    for index, (now, before) in enumerate(zip(current, baseline)):
+        if now['shape'] != before['shape']:
+            problems.append(f'语句 {index} 计划形状变化')
+        if now['total_cost'] and before['total_cost'] and \
+                now['total_cost'] > before['total_cost'] * cost_threshold:
+            problems.append(
+                f"语句 {index} 代价 {before['total_cost']:.1f} -> {now['total_cost']:.1f}"
+            )
+    return problems
@@ -0,0 +1,362 @@
+"""
+模拟数据生成
+
+按固定随机种子生成用户、角色、状态历史、留言和遗嘱配置，
+随机种子、参数和参考时间 now 相同时生成的数据完全一致。
+PostgreSQL 下使用 COPY 流式写入，其他数据库使用 executemany 分批插入；
+两种方式都不经过 ORM 的 save() 和信号，写入后如需排行榜等派生数据请另行重建。
+
+状态历史按设备的上报间隔逐条生成：每个角色有固定的上报周期（5~30 分钟，带抖动），
+夜间大部分时间不上报；内容与上一条相同的上报合并为一行并累加 repeat_count，
+与线上开启去重后的数据形态一致。
+"""
+import copy
+import io
+import json
+import random
+import uuid
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models, transaction
+from django.utils import timezone
+
+from apps.characters.models import (
+    Character, CharacterStatus, Message, WillConfig, get_default_status_config,
+)
+from apps.users.models import User
+
+DEFAULT_BATCH_SIZE = 10000
+DISPLAY_CODE_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+PASSWORD = 'seed-password'
+
+STATUS_TYPES = ['vital_signs', 'pc', 'phone']
+UPLOAD_INTERVALS = [5, 10, 15, 15, 30]  # 分钟
+APPS = ['微信', 'QQ', '哔哩哔哩', 'Chrome', 'VS Code', '网易云音乐', '抖音', '原神', '小红书']
+CITIES = ['北京', '上海', '广州', '深圳', '杭州', '成都', '武汉', '西安', '南京', '重庆']
+WEATHERS = ['晴', '多云', '阴', '小雨', '雷阵雨', '雪']
+MESSAGES = ['还活着吗', '冒个泡', '今天也要加油', '晚安', '早上好', '在干嘛呢', '路过留言', '记得吃饭', '好久不见']
+BACKGROUNDS = [
+    'https://infinitypro-img.infinitynewtab.com/wallpaper/anime/408.jpg',
+    'https://infinitypro-img.infinitynewtab.com/wallpaper/anime/512.jpg',
+    'https://infinitypro-img.infinitynewtab.com/wallpaper/nature/101.jpg',
+    '',
+]
+TIMEOUT_HOURS = [6, 12, 24, 24, 48, 72, 168]
+
+# 数据规模预设，可被单独的参数覆盖；每个角色每天约 70 条状态记录
+SCALES = {
+    'tiny': {'users': 20, 'characters': 40, 'days': 1, 'messages': 5, 'wills': 40},  # 约 3 千条状态
+    'small': {'users': 500, 'characters': 1000, 'days': 3, 'messages': 20, 'wills': 1000},  # 约 20 万条
+    'medium': {'users': 10000, 'characters': 20000, 'days': 7, 'messages': 20, 'wills': 20000},  # 约 1 千万条
+    'large': {'users': 50000, 'characters': 100000, 'days': 4, 'messages': 10, 'wills': 100000},  # 约 3 千万条
+}
+
+
+def display_code(index):
+    """由序号生成 6 位唯一展示码"""
+    chars = []
+    for _ in range(6):
+        index, remainder = divmod(index, len(DISPLAY_CODE_ALPHABET))
+        chars.append(DISPLAY_CODE_ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+def seeded_uuid(rng):
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def status_payload(rng, status_type):
+    if status_type == 'vital_signs':
+        return {
+            'battery': rng.randint(5, 100),
+            'phone': rng.choice(APPS),
+            'location': rng.choice(CITIES),
+            'weather': rng.choice(WEATHERS),
+        }
+    return {'app': rng.choice(APPS), 'online': rng.random() < 0.8}
+
+
+def status_config(rng):
+    """在默认配置基础上随机调整主题、超时文案和展示的状态项"""
+    config = get_default_status_config()
+    config['theme']['background_url'] = rng.choice(BACKGROUNDS)
+    timeout_messages = config['display']['timeout_messages']
+    config['display']['timeout_messages'] = timeout_messages[:rng.randint(1, len(timeout_messages))]
+    if rng.random() < 0.3:
+        config['display']['default_message'] = rng.choice(['活着', '在线', '还在喘气'])
+    vital_signs = config['vital_signs']
+    keep = sorted(rng.sample(sorted(vital_signs), rng.randint(1, len(vital_signs))))
+    config['vital_signs'] = {key: copy.deepcopy(vital_signs[key]) for key in keep}
+    return config
+
+
+def _copy_value(value):
+    """转换为 COPY 文本格式的字段值"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, ensure_ascii=False)
+    elif isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return (
+        value.replace('\\', '\\\\').replace('\t', '\\t')
+        .replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+class Seeder:
+    """
+    :param seed: 随机种子
+    :param method: 'copy' / 'insert'，默认 PostgreSQL 用 copy，其他数据库用 insert
+    :param stdout: 进度输出，需提供 write(str)
+    """
+
+    def __init__(self, seed=42, now=None, method=None, batch_size=DEFAULT_BATCH_SIZE, stdout=None):
+        self.rng = random.Random(seed)
+        self.now = now or timezone.now()
+        if method is None:
+            method = 'copy' if connection.vendor == 'postgresql' else 'insert'
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise ValueError('COPY 仅支持 PostgreSQL')
+        self.method = method
+        self.batch_size = batch_size
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def run(self, users, characters, days, messages, wills):
+        """
+        生成数据
+
+        :param users: 用户数
+        :param characters: 角色数，轮流分配给用户
+        :param days: 状态历史天数
+        :param messages: 每个角色的平均留言数
+        :param wills: 配置遗嘱的角色数
+        :return: 各表写入行数
+        """
+        counts = {}
+        with transaction.atomic():
+            user_uids = self.create_users(users)
+            counts['users'] = len(user_uids)
+            self.log(f'users: {counts["users"]}')
+
+            character_rows = self.create_characters(characters, user_uids, days)
+            counts['characters'] = len(character_rows)
+            self.log(f'characters: {counts["characters"]}')
+
+            counts['statuses'] = self.write(CharacterStatus, self.status_rows(character_rows, days))
+            self.log(f'statuses: {counts["statuses"]}')
+
+            counts['messages'] = self.write(Message, self.message_rows(character_rows, days, messages))
+            self.log(f'messages: {counts["messages"]}')
+
+            counts['wills'] = self.write(WillConfig, self.will_rows(character_rows[:wills]))
+            self.log(f'wills: {counts["wills"]}')
+        return counts
+
+    def create_users(self, count):
+        password = make_password(PASSWORD, salt='seed')
+        uids = [f'smtx{index:010d}' for index in range(count)]
+        self.write(User, (
+            {
+                'uid': uid,
+                'username': f'seed{index}',
+                'email': f'seed{index}@example.com',
+                'password': password,
+                'is_email_verified': True,
+                'date_joined': self.now,
+                'created_at': self.now,
+            }
+            for index, uid in enumerate(uids)
+        ))
+        return uids
+
+    def create_characters(self, count, user_uids, days):
+        rng = self.rng
+        history = int(days * 24 * 60)
+        rows = []
+        for index in range(count):
+            # 约 70% 角色在最近一天内活跃，其余在历史区间内某天停止上报
+            if rng.random() < 0.7:
+                last_active = self.now - timedelta(minutes=rng.randint(0, min(24 * 60, history)))
+            else:
+                last_active = self.now - timedelta(minutes=rng.randint(min(24 * 60, history), history))
+            streak = rng.randint(0, 60)
+            rows.append({
+                'uid': seeded_uuid(rng),
+                'user_id': user_uids[index % len(user_uids)],
+                'name': f'角色{index}',
+                'bio': rng.choice(['', '今天也在好好活着', '摸鱼中']),
+                'secret_key': seeded_uuid(rng),
+                'display_code': display_code(index),
+                'is_public': rng.random() < 0.6,
+                'status_config': status_config(rng),
+                'experience': streak * (streak + 1) // 2 + rng.randint(0, 500),
+                'sync_streak': streak,
+                'last_sync_date': last_active.date(),
+                'last_active_at': last_active,
+                'created_at': self.now - timedelta(days=days, minutes=rng.randint(0, 30 * 24 * 60)),
+                # 以下字段仅供生成状态历史使用，不写入数据库
+                '_interval': rng.choice(UPLOAD_INTERVALS),
+                '_types': ['vital_signs'] + (['pc'] if rng.random() < 0.4 else []),
+                '_sleep_start': rng.randint(0, 3),
+            })
+        self.write(Character, rows)
+        return rows
+
+    def status_rows(self, character_rows, days):
+        rng = self.rng
+        start = self.now - timedelta(days=days)
+        utc_offset = timezone.localtime(self.now).utcoffset()
+        for character in character_rows:
+            for status_type in character['_types']:
+                interval = character['_interval']
+                moment = start + timedelta(minutes=rng.uniform(0, interval))
+                end = character['last_active_at']
+                current = None
+                while moment <= end:
+                    # 夜间约 6 小时基本不上报
+                    hour = (moment + utc_offset).hour
+                    sleep_start = character['_sleep_start']
+                    if sleep_start <= hour < sleep_start + 6 and rng.random() < 0.9:
+                        moment += timedelta(minutes=interval * 4)
+                        continue
+                    if current is not None and rng.random() < 0.35:
+                        current['repeat_count'] += 1
+                        current['last_seen'] = moment
+                    else:
+                        if current is not None:
+                            yield current
+                        current = {
+                            'character_id': character['uid'],
+                            'status_type': status_type,
+                            'data': status_payload(rng, status_type),
+                            'timestamp': moment,
+                            'last_seen': None,
+                            'repeat_count': 1,
+                        }
+                    moment += timedelta(minutes=interval * rng.uniform(0.7, 1.3))
+                if current is not None:
+                    # 最后一次上报与 last_active_at 对齐
+                    if current['repeat_count'] > 1:
+                        current['last_seen'] = end
+                    else:
+                        current['timestamp'] = end
+                    yield current
+
+    def message_rows(self, character_rows, days, average):
+        rng = self.rng
+        for character in character_rows:
+            for _ in range(rng.randint(0, average * 2)):
+                if rng.random() < 0.1:
+                    ip = f'240e:{rng.randint(0, 0xffff):x}:{rng.randint(0, 0xffff):x}::{rng.randint(1, 0xffff):x}'
+                else:
+                    prefix = rng.choice([36, 58, 111, 113, 116, 183, 223])
+                    ip = f'{prefix}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}'
+                yield {
+                    'character_id': character['uid'],
+                    'owner_id': character['user_id'],
+                    'content': rng.choice(MESSAGES),
+                    'ip_address': ip,
+                    'location': rng.choice(CITIES) if rng.random() < 0.9 else None,
+                    'created_at': self.now - timedelta(minutes=rng.randint(0, int(days * 24 * 60))),
+                }
+
+    def will_rows(self, character_rows):
+        rng = self.rng
+        for index, character in enumerate(character_rows):
+            yield {
+                'character_id': character['uid'],
+                'is_enabled': rng.random() < 0.9,
+                'content': '如果你收到这封邮件，说明我已经很久没有上线了。',
+                'target_email': f'will{index}@example.com',
+                'cc_emails': [f'cc{index}@example.com'] if rng.random() < 0.2 else [],
+                'timeout_hours': rng.choice(TIMEOUT_HOURS),
+                'created_at': character['created_at'],
+            }
+
+    def write(self, model, rows):
+        """写入字典形式的行（键为字段 attname），返回行数"""
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not isinstance(field, models.AutoField)
+        ]
+        if self.method == 'copy':
+            return self._copy(model, fields, rows)
+        return self._insert(model, fields, rows)
+
+    def _insert(self, model, fields, rows):
+        # 直接 executemany，跳过 bulk_create 逐个构造模型实例和编译 SQL 的开销，
+        # 也不会像 bulk_create 那样把 auto_now_add 字段覆盖为当前时间
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+        )
+        # connection 是按线程查找的代理对象，逐个字段访问开销明显，先取出实际连接
+        db = connections[DEFAULT_DB_ALIAS]
+        prepare = [(field, field.get_db_prep_save) for field in fields]
+        total = 0
+        batch = []
+        with db.cursor() as cursor:
+            for row in rows:
+                batch.append([
+                    prep_save(self._row_value(field, row), db)
+                    for field, prep_save in prepare
+                ])
+                if len(batch) >= self.batch_size:
+                    cursor.executemany(sql, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                total += len(batch)
+        return total
+
+    def _copy(self, model, fields, rows):
+        sql = 'COPY {} ({}) FROM STDIN'.format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+        )
+        total = 0
+        buffer = io.StringIO()
+        with connection.cursor() as cursor:
+            for row in rows:
+                buffer.write('\t'.join(
+                    _copy_value(self._row_value(field, row)) for field in fields
+                ))
+                buffer.write('\n')
+                total += 1
+                if total % self.batch_size == 0:
+                    self._flush_copy(cursor, sql, buffer)
+                    buffer = io.StringIO()
+            self._flush_copy(cursor, sql, buffer)
+        return total
+
+    def _row_value(self, field, row):
+        if field.attname in row:
+            return row[field.attname]
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            return self.now
+        return field.get_default()
+
+    @staticmethod
+    def _flush_copy(cursor, sql, buffer):
+        if not buffer.tell():
+            return
+        buffer.seek(0)
+        # Django 游标包装了数据库驱动的游标，COPY 需要使用原生游标
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):  # psycopg2
+            raw_cursor.copy_expert(sql, buffer)
+        else:  # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
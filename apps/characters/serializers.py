@@ -165,4 +165,46 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ['id', 'content', 'created_at', 'ip_address', 'location']
-        read_only_fields = ['id', 'created_at', 'ip_address', 'location']
\ No newline at end of file
+        read_only_fields = ['id', 'created_at', 'ip_address', 'location']
+
+class MessageInboxSerializer(MessageSerializer):
+    character = serializers.UUIDField(source='character_id', read_only=True)
+    character_name = serializers.CharField(source='character.name', read_only=True)
+
+    class Meta(MessageSerializer.Meta):
+        fields = MessageSerializer.Meta.fields + ['character', 'character_name']
+
+
+class MessageFilterSerializer(serializers.Serializer):
+    """按 IP 与时间范围筛选留言的条件"""
+    ip_address = serializers.IPAddressField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        after = data.get('created_after')
+        before = data.get('created_before')
+        if after and before and after >= before:
+            raise serializers.ValidationError({'created_before': '结束时间必须晚于开始时间'})
+        return data
+
+
+class MessageBulkDeleteSerializer(MessageFilterSerializer):
+    """批量删除留言的条件，至少提供一项，多项同时满足才删除"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=1000
+    )
+
+    def validate(self, data):
+        if not data:
+            raise serializers.ValidationError('至少需要提供一个删除条件')
+        return super().validate(data)
+
+
+class MessageInboxQuerySerializer(MessageFilterSerializer):
+    """收件箱的查询参数"""
+    character = serializers.UUIDField(required=False)
+    before_id = serializers.IntegerField(required=False, min_value=1)
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Character, Message
+from . import counters, leaderboard, message_window
+
+# 影响排行榜的字段
+LEADERBOARD_FIELDS = {'experience', 'is_active', 'is_public'}
+
+
+@receiver(post_save, sender=Character)
+def sync_leaderboard_on_save(sender, instance, update_fields=None, **kwargs):
+    """经验值或公开状态变化时同步排行榜"""
+    if update_fields is not None and not LEADERBOARD_FIELDS.intersection(update_fields):
+        return
+    leaderboard.update(instance)
+
+
+@receiver(post_delete, sender=Character)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    """删除角色时移出排行榜"""
+    leaderboard.remove(instance.uid)
+
+
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+def invalidate_message_window(sender, instance, **kwargs):
+    """留言新增、修改或删除时使最近留言缓存失效"""
+    message_window.invalidate(instance.character_id)
+
+
+@receiver(post_save, sender=Character)
+def count_created_character(sender, instance, created, **kwargs):
+    if created:
+        counters.incr_on_commit('characters', 1)
+
+
+@receiver(post_delete, sender=Character)
+def count_deleted_character(sender, instance, **kwargs):
+    counters.incr_on_commit('characters', -1)
@@ -4,7 +4,11 @@ from datetime import timedelta
 from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 from django.conf import settings
-from .models import WillConfig, CharacterStatus
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from .models import Character, WillConfig, CharacterStatus
+from . import counters, geolocation, moderation, presence
+from utils import metrics
 import logging
 import os
 from django.db import transaction
@@ -25,12 +29,12 @@ def send_will_email(self, will_config_id):
     try:
         will_config = WillConfig.objects.select_related('character').get(id=will_config_id)
         
-        # 获取最后更新时间
-        last_status = CharacterStatus.objects.filter(
-            character=will_config.character
-        ).order_by('-timestamp').first()
-        
-        last_updated = last_status.timestamp if last_status else timezone.now()
+        # 获取最后更新时间，旧数据未回填时从状态历史推导
+        last_updated = (
+            will_config.character.last_active_at
+            or CharacterStatus.get_last_reported_at(will_config.character)
+            or timezone.now()
+        )
         
         # 计算自上次更新以来的时间
         now = timezone.now()
@@ -72,13 +76,48 @@ def send_will_email(self, will_config_id):
         
         # 发送邮件
         email.send()
+        metrics.WILL_EMAILS.labels(result='sent').inc()
         
         logger.info(f"Will email sent successfully for character {will_config.character.name}")
         return True
     except Exception as e:
+        metrics.WILL_EMAILS.labels(result='failed').inc()
         logger.error(f"Failed to send will email: {str(e)}")
         raise self.retry(exc=e)
 
+def last_status_subquery():
+    """角色最后一次上报任意状态的时间，用于最后活跃时间未回填的角色"""
+    return Subquery(
+        CharacterStatus.objects.filter(character=OuterRef('character_id'))
+        .values('character')
+        .annotate(last_reported_at=Max(Coalesce('last_seen', 'timestamp')))
+        .values('last_reported_at')[:1]
+    )
+
+
+def get_will_candidates(now):
+    """
+    获取可能超时的遗嘱配置
+
+    :return: (启用的遗嘱总数, 候选查询集)，没有启用的遗嘱时候选为 None
+    """
+    # 获取所有启用了遗嘱功能的配置
+    active_wills = WillConfig.objects.filter(
+        is_enabled=True
+    ).select_related('character')
+
+    summary = active_wills.aggregate(total=Count('id'), min_timeout=Min('timeout_hours'))
+    if not summary['total']:
+        return 0, None
+
+    # 只取可能超时的角色：最后活跃时间早于最短超时时间，或尚未记录活跃时间
+    stale_before = now - timedelta(hours=summary['min_timeout'])
+    candidates = active_wills.filter(
+        Q(character__last_active_at__isnull=True) |
+        Q(character__last_active_at__lt=stale_before)
+    ).annotate(last_reported_at=Coalesce('character__last_active_at', last_status_subquery()))
+    return summary['total'], candidates
+
 @shared_task
 def check_wills():
     """
@@ -87,27 +126,24 @@ def check_wills():
     now = timezone.now()
     logger.info("Starting will check task")
     
-    # 获取所有启用了遗嘱功能的配置
-    active_wills = WillConfig.objects.filter(
-        is_enabled=True
-    ).select_related('character')
-
-    logger.info(f"Found {active_wills.count()} active wills")
+    total, candidates = get_will_candidates(now)
+    logger.info(f"Found {total} active wills")
+    if candidates is None:
+        logger.info("Will check task completed")
+        return
 
-    for will in active_wills:
+    for will in candidates:
         try:
-            # 获取角色最后的状态更新时间
-            last_status = CharacterStatus.objects.filter(
-                character=will.character
-            ).order_by('-timestamp').first()
+            # 角色最后的状态更新时间，旧数据未回填时由候选查询从状态历史推导
+            last_reported_at = will.last_reported_at
 
-            if not last_status:
+            if not last_reported_at:
                 logger.info(f"No status found for character {will.character.name}")
                 continue
 
             # 计算是否超过设定的超时时间
             timeout = timedelta(hours=will.timeout_hours)
-            time_since_last_update = now - last_status.timestamp
+            time_since_last_update = now - last_reported_at
             
             # 只保留关键日志，移除详细的调试信息
             if time_since_last_update > timeout:
@@ -122,10 +158,64 @@ def check_wills():
                 
                 # 发送邮件通知
                 send_will_email.delay(will.id)
+                metrics.WILL_TRIGGERS.labels(source='check_wills').inc()
                 logger.info(f"Will config disabled for character {will.character.name}")
             
         except Exception as e:
             logger.error(f"Error processing will for character {will.character.name}: {str(e)}")
             continue
 
-    logger.info("Will check task completed") 
\ No newline at end of file
+    logger.info("Will check task completed")
+
+@shared_task
+def rebuild_presence(force=False):
+    """
+    在线状态一致性修复：Redis 被清空后根据角色表中的最后活跃时间重建
+
+    定时执行时只在重建标记缺失时才全量重建，否则仅清理过期成员
+    """
+    ready = presence.is_ready()
+    if ready is None:
+        logger.info("Presence store unavailable, skip rebuild")
+        return None
+
+    if ready and not force:
+        return presence.prune()
+
+    cutoff = timezone.now() - timedelta(seconds=presence.get_ttl())
+    recent = Character.objects.filter(
+        last_active_at__gte=cutoff
+    ).values_list('uid', 'last_active_at')
+
+    count = presence.rebuild(dict(recent))
+    logger.info(f"Presence rebuilt with {count} online characters")
+    return count
+
+
+@shared_task
+def reconcile_counters():
+    """用数据库计数校正全站统计计数器"""
+    counts = counters.reconcile()
+    if counts is None:
+        logger.info("Counter store unavailable, skip reconcile")
+    return counts
+
+
+@shared_task
+def enrich_message_locations(batch_size=None):
+    """
+    批量在线补全留言的 IP 归属地
+
+    发送留言时按需安排，定时执行兜底；返回补全的留言数
+    """
+    return geolocation.enrich_pending(batch_size)
+
+
+@shared_task
+def archive_expired_messages():
+    """
+    归档并删除超过保留期的留言
+
+    保留期由 MESSAGE_RETENTION_DAYS 配置，为 0 时不处理；返回处理的留言数
+    """
+    return moderation.archive_expired()
@@ -0,0 +1,124 @@
+import re
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import include, path, reverse
+
+from api.v1.urls import async_urlpatterns
+from apps.characters.models import Character, CharacterStatus, Message
+from apps.users.models import User
+
+# 本模块同时作为测试用 URLConf：异步视图优先匹配，其余路由不变
+urlpatterns = [
+    path('api/v1/', include(async_urlpatterns)),
+    path('', include('config.urls')),
+]
+
+
+def query_count(response):
+    return int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response['Server-Timing']).group(1))
+
+
+@override_settings(ALLOWED_HOSTS=['*'], PERFORMANCE_SERVER_TIMING=True)
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(email='async@example.com', password='testpass123')
+        self.character = Character.objects.create(
+            user=user, name='Async', display_code='async01', is_public=True
+        )
+        self.status_url = reverse('status-get', kwargs={'code': 'async01'})
+        self.messages_url = reverse('character-messages', kwargs={'code': 'async01'})
+
+    def upload(self, client, status_type='vital_signs', data=None):
+        return client.post(
+            reverse('status-update'),
+            {'type': status_type, 'data': data or {'heart_rate': 70}},
+            content_type='application/json',
+            headers={'X-Character-Key': str(self.character.secret_key)},
+        )
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_status_update_and_read(self):
+        response = await self.upload(self.async_client)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'success'})
+
+        character = await Character.objects.aget(pk=self.character.pk)
+        self.assertEqual(character.experience, 1)
+        self.assertIsNotNone(character.last_active_at)
+        self.assertEqual(await CharacterStatus.objects.filter(character=character).acount(), 1)
+
+        response = await self.async_client.get(self.status_url)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['status'], 'online')
+        self.assertEqual(body['status_data']['vital_signs']['data'], {'heart_rate': 70})
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_status_update_errors(self):
+        response = await self.async_client.post(
+            reverse('status-update'), {'type': 'x', 'data': {}}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 401)
+
+        response = await self.async_client.get(reverse('status-update'))
+        self.assertEqual(response.status_code, 405)
+
+        response = await self.async_client.post(
+            reverse('status-update'), {'data': {}}, content_type='application/json',
+            headers={'X-Character-Key': str(self.character.secret_key)},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('type', response.json())
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_messages(self):
+        response = await self.async_client.post(
+            self.messages_url, {'content': 'hello'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['location'], '本地')
+
+        response = await self.async_client.get(self.messages_url)
+        self.assertEqual([m['content'] for m in response.json()], ['hello'])
+
+        character = await Character.objects.aget(pk=self.character.pk)
+        self.assertEqual(character.experience, 1)
+
+        response = await self.async_client.get(
+            reverse('character-messages', kwargs={'code': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_responses_match_sync_views(self):
+        """异步视图与 DRF 视图的响应一致，且性能中间件统计到相同的查询次数"""
+        self.upload(self.client)
+        Message.objects.create(character=self.character, content='hi', ip_address='127.0.0.1')
+        urls = [
+            self.status_url,
+            self.messages_url,
+            f'{self.messages_url}?before_id=999999',
+            f'{self.messages_url}?before_id=abc',
+            reverse('status-get', kwargs={'code': 'missing'}),
+            reverse('character-messages', kwargs={'code': 'missing'}),
+        ]
+
+        expected = [self.client.get(url) for url in urls]
+        # 两次都从空缓存开始，查询次数才可比较
+        cache.clear()
+        with self.settings(ROOT_URLCONF=__name__):
+            actual = [self.client.get(url) for url in urls]
+
+        for url, sync_response, async_response in zip(urls, expected, actual):
+            with self.subTest(url=url):
+                self.assertEqual(async_response.status_code, sync_response.status_code)
+                self.assertEqual(async_response.json(), sync_response.json())
+                self.assertEqual(query_count(async_response), query_count(sync_response))
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_performance_middleware_counts_async_queries(self):
+        await self.upload(self.async_client)
+        response = await self.async_client.get(self.status_url)
+        # 角色 + 各类型最新 id + 最新状态
+        self.assertEqual(query_count(response), 3)
@@ -0,0 +1,33 @@
+import random
+
+from django.test import TransactionTestCase, override_settings
+
+from apps.characters.models import Character, CharacterStatus, WillConfig
+from benchmarks import data
+from benchmarks.scenarios import SCENARIOS
+
+TINY = {'users': 3, 'characters': 6, 'days': 1, 'messages': 2, 'wills': 6}
+
+
+@override_settings(
+    ALLOWED_HOSTS=['*'],
+    CELERY_TASK_ALWAYS_EAGER=True,
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class BenchmarkSmokeTest(TransactionTestCase):
+    """保证基准测试数据生成与场景随代码演进仍可运行"""
+
+    def test_scenarios_run_without_errors(self):
+        data.generate(seed=7, **TINY)
+        # 保证展示页场景至少有一个公开角色
+        Character.objects.filter(display_code=data.display_code(0)).update(is_public=True)
+
+        for name, scenario_class in SCENARIOS.items():
+            with self.subTest(scenario=name):
+                result = scenario_class(random.Random(7)).run(iterations=4)
+                self.assertEqual(result['errors'], 0)
+                self.assertEqual(result['operations'], 4)
+                self.assertIsNotNone(result['latency_ms']['p99'])
+
+        self.assertTrue(CharacterStatus.objects.exists())
+        self.assertTrue(WillConfig.objects.exists())
@@ -0,0 +1,99 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from apps.characters import counters
+from apps.characters.models import Character
+from apps.characters.tasks import reconcile_counters
+from apps.users import signals as user_signals
+from apps.users.models import User
+
+
+class CountersTest(TestCase):
+    """全站统计计数测试"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser(username='admin', email='admin@example.com', password='testpass123')
+        self.user = User.objects.create_user(email='test@example.com', password='testpass123')
+        Character.objects.create(
+            user=self.user, name='Online', display_code='online', last_active_at=timezone.now()
+        )
+        Character.objects.create(user=self.user, name='Idle', display_code='idle01')
+
+    def test_stats_fallback_counts_database(self):
+        """Redis 不可用时从数据库计数，且不包含超级用户"""
+        response = self.client.get(reverse('stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'users': 1, 'characters': 2, 'online': 1})
+        self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_stats_are_cached(self):
+        self.client.get(reverse('stats'))
+        User.objects.create_user(email='other@example.com', password='testpass123')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('stats'))
+        self.assertEqual(response.data['users'], 1)
+
+    def test_user_count_uses_counter(self):
+        with patch('apps.characters.counters.total', return_value=42) as total:
+            response = self.client.get(reverse('user-count'))
+        self.assertEqual(response.data, {'total': 42})
+        total.assert_called_once_with('users')
+
+    def test_signals_update_counters_on_commit(self):
+        with patch('apps.characters.counters.incr') as incr:
+            with self.captureOnCommitCallbacks(execute=True):
+                other = User.objects.create_user(email='other@example.com', password='testpass123')
+                character = Character.objects.create(user=other, name='New', display_code='new001')
+            self.assertEqual(incr.call_args_list, [(('users', 1),), (('characters', 1),)])
+
+            incr.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                character.save()
+                other.delete()
+            self.assertEqual(incr.call_args_list, [(('characters', -1),), (('users', -1),)])
+
+    def test_superuser_change_updates_user_counter(self):
+        with patch('apps.characters.counters.incr') as incr:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.is_superuser = True
+                self.user.save()
+                self.user.save()
+            self.assertEqual(incr.call_args_list, [(('users', -1),)])
+
+            incr.reset_mock()
+            user = User.objects.get(pk=self.user.pk)
+            with self.captureOnCommitCallbacks(execute=True):
+                user.is_superuser = False
+                user.save()
+                user.delete()
+            # 删除用户时其角色级联删除，只看用户计数
+            self.assertEqual(
+                [call for call in incr.call_args_list if call.args[0] == 'users'],
+                [(('users', 1),), (('users', -1),)]
+            )
+
+        # 接收者不读取延迟加载的 is_superuser，避免额外查询
+        user = User.objects.only('uid').get(email='admin@example.com')
+        with self.assertNumQueries(0):
+            user_signals.count_saved_user(sender=User, instance=user, created=False)
+        self.assertIn('is_superuser', user.get_deferred_fields())
+
+    def test_missing_key_is_initialized_from_database(self):
+        client = MagicMock()
+        client.get.return_value = None
+        with patch('apps.characters.counters.get_redis_client', return_value=client):
+            self.assertEqual(counters.total('characters'), 2)
+        client.set.assert_called_once_with('counters:characters', 2, nx=True)
+
+    def test_reconcile(self):
+        self.assertIsNone(reconcile_counters())
+        client = MagicMock()
+        with patch('apps.characters.counters.get_redis_client', return_value=client):
+            self.assertEqual(reconcile_counters(), {'users': 1, 'characters': 2})
+        client.pipeline.return_value.set.assert_any_call('counters:users', 1)
@@ -0,0 +1,81 @@
+import time
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.characters.models import Character, Message
+from apps.users.models import User
+from utils import db_router
+
+
+@skipUnless('replica' in settings.DATABASES, '需要独立的副本库 replica，见 config/settings/test.py')
+@override_settings(DATABASE_REPLICAS=['replica'], ALLOWED_HOSTS=['*'])
+class ReplicaRoutingTest(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(email='router@example.com', password='testpass123')
+        self.character = Character.objects.create(
+            user=user, name='Primary', display_code='route01', is_public=True
+        )
+        # 模拟复制：副本上有同一条记录，名称不同，据此判断查询落在哪个库
+        user.save(using='replica')
+        self.character.save(using='replica')
+        Character.objects.using('replica').filter(pk=self.character.pk).update(name='Replica')
+        self.display_url = reverse('character-display', kwargs={'code': 'route01'})
+        self.messages_url = reverse('character-messages', kwargs={'code': 'route01'})
+
+    def test_reads_use_primary_by_default(self):
+        self.assertEqual(Character.objects.get(pk=self.character.pk).name, 'Primary')
+
+    def test_routing_scope_pins_primary_after_write(self):
+        with db_router.routing_scope(replica=True):
+            self.assertEqual(Character.objects.get(pk=self.character.pk).name, 'Replica')
+            Message.objects.create(character=self.character, content='hi')
+            self.assertEqual(Character.objects.get(pk=self.character.pk).name, 'Primary')
+        with db_router.routing_scope(replica=True):
+            self.assertEqual(Character.objects.get(pk=self.character.pk).name, 'Replica')
+
+    def test_public_read_view_uses_replica(self):
+        response = self.client.get(self.display_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], 'Replica')
+        self.assertNotIn(settings.DB_REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_write_makes_client_sticky_to_primary(self):
+        response = self.client.post(
+            self.messages_url, {'content': 'hello'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(settings.DB_REPLICA_STICKY_COOKIE, response.cookies)
+
+        # 写入者马上能读到自己的留言
+        response = self.client.get(self.messages_url)
+        self.assertEqual([m['content'] for m in response.json()], ['hello'])
+        self.assertEqual(self.client.get(self.display_url).json()['name'], 'Primary')
+
+        # 其他客户端读副本
+        self.assertEqual(self.client_class().get(self.display_url).json()['name'], 'Replica')
+
+    def test_message_window_is_rebuilt_from_primary(self):
+        Message.objects.create(character=self.character, content='hello')
+        # 副本尚未复制到该留言，但共享的最近留言缓存从主库重建
+        response = self.client.get(self.messages_url)
+        self.assertEqual([m['content'] for m in response.json()], ['hello'])
+        response = self.client.get(self.messages_url, {'before_id': 10 ** 6})
+        self.assertEqual(response.json(), [])
+
+    def test_expired_sticky_cookie_uses_replica(self):
+        self.client.cookies[settings.DB_REPLICA_STICKY_COOKIE] = str(int(time.time()) - 1)
+        self.assertEqual(self.client.get(self.display_url).json()['name'], 'Replica')
+        self.client.cookies[settings.DB_REPLICA_STICKY_COOKIE] = str(int(time.time()) + 60)
+        self.assertEqual(self.client.get(self.display_url).json()['name'], 'Primary')
+
+    def test_failed_write_is_not_sticky(self):
+        response = self.client.post(self.messages_url, {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(settings.DB_REPLICA_STICKY_COOKIE, response.cookies)
@@ -0,0 +1,29 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.characters.models import Character
+from apps.users.models import User
+from utils.db import iterate_in_chunks
+
+
+class IterateInChunksTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='chunks@example.com', password='testpass123')
+        for index in range(7):
+            Character.objects.create(user=user, name=f'c{index}', display_code=f'CHUNK{index:03d}')
+        self.uids = sorted(str(uid) for uid in Character.objects.values_list('uid', flat=True))
+
+    def test_iterator_path(self):
+        rows = iterate_in_chunks(Character.objects.values('uid'), chunk_size=3, key='uid')
+        self.assertEqual(sorted(str(row['uid']) for row in rows), self.uids)
+
+    def test_keyset_path_without_server_side_cursors(self):
+        """服务端游标被禁用时按键集分页，每批一次查询"""
+        with mock.patch('utils.db.server_side_cursors_disabled', return_value=True):
+            with self.assertNumQueries(3):
+                rows = list(iterate_in_chunks(Character.objects.all(), chunk_size=3, key='uid'))
+            dict_rows = list(iterate_in_chunks(Character.objects.values('uid'), chunk_size=7, key='uid'))
+
+        self.assertEqual([str(row.uid) for row in rows], self.uids)
+        self.assertEqual([str(row['uid']) for row in dict_rows], self.uids)
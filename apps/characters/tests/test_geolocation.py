@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.characters import geolocation
+from apps.characters.models import Character, Message
+from apps.users.models import User
+from utils import ip_region
+
+
+class StubProvider:
+    """按前缀返回固定归属地的在线接口桩"""
+    name = 'stub'
+    calls = []
+    failing = False
+
+    def lookup(self, ip):
+        StubProvider.calls.append(ip)
+        if StubProvider.failing:
+            raise OSError('provider down')
+        if ip.startswith('203.0.113.'):
+            return '浙江 杭州'
+        return None
+
+
+@override_settings(
+    ALLOWED_HOSTS=['*'],
+    CELERY_TASK_ALWAYS_EAGER=True,
+    GEOLOCATION_PROVIDER=f'{__name__}.StubProvider',
+    GEOLOCATION_BREAKER_THRESHOLD=2,
+    IP2REGION_XDB_PATH='/nonexistent/ip2region.xdb',
+)
+class GeolocationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        ip_region.reset()
+        self.addCleanup(ip_region.reset)
+        StubProvider.calls = []
+        StubProvider.failing = False
+        user = User.objects.create_user(email='geo@example.com', password='testpass123')
+        self.character = Character.objects.create(
+            user=user, name='Geo', display_code='geo01', is_public=True
+        )
+
+    def create_messages(self, *ips):
+        return [
+            Message.objects.create(character=self.character, content=ip, ip_address=ip)
+            for ip in ips
+        ]
+
+    def test_message_post_does_not_wait_for_provider(self):
+        response = self.client.post(
+            reverse('character-messages', kwargs={'code': 'geo01'}),
+            {'content': 'hello'},
+            content_type='application/json',
+            headers={'X-Forwarded-For': '203.0.113.7'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.json()['location'])
+        # 测试中任务同步执行，响应后留言已补全
+        self.assertEqual(Message.objects.get(pk=response.json()['id']).location, '浙江 杭州')
+        self.assertFalse(geolocation.schedule_enrichment())
+
+    def test_results_are_cached_per_network(self):
+        first, second, unknown = self.create_messages('203.0.113.7', '203.0.113.99', '198.51.100.1')
+        self.assertEqual(geolocation.enrich_pending(), 2)
+        self.assertEqual(StubProvider.calls, ['203.0.113.7', '198.51.100.1'])
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        unknown.refresh_from_db()
+        self.assertEqual((first.location, second.location), ('浙江 杭州', '浙江 杭州'))
+        self.assertIsNone(unknown.location)
+
+        # 已处理的留言不再重复查询，同网段的新留言命中缓存
+        self.create_messages('203.0.113.200', '198.51.100.2')
+        self.assertEqual(geolocation.enrich_pending(), 1)
+        self.assertEqual(len(StubProvider.calls), 2)
+
+    def test_circuit_breaker_stops_calling_failing_provider(self):
+        messages = self.create_messages('203.0.113.1', '192.0.2.1', '198.51.100.1')
+        StubProvider.failing = True
+        for _ in range(3):
+            self.assertEqual(geolocation.enrich_pending(), 0)
+        # 连续失败两次后熔断，之后不再调用
+        self.assertEqual(StubProvider.calls, ['203.0.113.1', '203.0.113.1'])
+        self.assertTrue(geolocation.get_breaker(StubProvider()).is_open())
+
+        # 冷却结束且接口恢复后从未处理的留言继续
+        StubProvider.failing = False
+        cache.delete(geolocation.get_breaker(StubProvider()).open_key)
+        self.assertEqual(geolocation.enrich_pending(), 1)
+        messages[0].refresh_from_db()
+        self.assertEqual(messages[0].location, '浙江 杭州')
+        self.assertEqual(StubProvider.calls[2:], ['203.0.113.1', '192.0.2.1', '198.51.100.1'])
+
+    def test_network_key(self):
+        self.assertEqual(geolocation.network_key('203.0.113.7'), 'geo:net:203.0.113.0/24')
+        self.assertEqual(geolocation.network_key('2001:db8::1'), 'geo:net:2001:db8::/48')
@@ -0,0 +1,85 @@
+import re
+import threading
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.characters.models import Character
+from apps.users.models import User
+from utils.instrumentation import RequestMetrics, current_metrics
+
+INSTRUMENTED_CACHES = {
+    'default': {'BACKEND': 'utils.cache.InstrumentedLocMemCache', 'LOCATION': 'instrumentation-test'}
+}
+
+
+@override_settings(CACHES=INSTRUMENTED_CACHES, PERFORMANCE_SERVER_TIMING=True)
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        user = User.objects.create_user(email='test@example.com', password='testpass123')
+        self.character = Character.objects.create(
+            user=user, name='Test Character', display_code='abc123', is_public=True
+        )
+
+    def test_server_timing_header(self):
+        """响应头中的查询次数与实际执行的查询一致"""
+        url = reverse('status-get', kwargs={'code': 'abc123'})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+        self.assertRegex(timing, r'view;dur=[\d.]+')
+        queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', timing).group(1))
+        self.assertEqual(queries, len(ctx.captured_queries))
+
+    @override_settings(PERFORMANCE_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        response = self.client.get(reverse('status-get', kwargs={'code': 'abc123'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_cache_hits_and_misses(self):
+        cache = caches['default']
+        cache.set('present', 1)
+        metrics = RequestMetrics().activate()
+        try:
+            cache.get('present')
+            cache.get('absent')
+            cache.get_many(['present', 'absent'])
+        finally:
+            metrics.deactivate()
+
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (2, 2))
+        self.assertIsNone(current_metrics())
+
+    def test_metrics_isolated_between_threads(self):
+        """多线程并发时各请求的统计互不影响"""
+        cache = caches['default']
+        barrier = threading.Barrier(2)
+        results = {}
+
+        def worker(name, lookups):
+            metrics = RequestMetrics().activate()
+            barrier.wait()
+            for _ in range(lookups):
+                cache.get('absent')
+            barrier.wait()
+            metrics.deactivate()
+            results[name] = metrics.cache_misses
+
+        threads = [
+            threading.Thread(target=worker, args=('a', 3)),
+            threading.Thread(target=worker, args=('b', 5)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {'a': 3, 'b': 5})
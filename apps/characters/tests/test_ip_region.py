@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from api.v1.views.characters import get_location_from_ip
+from benchmarks.ip_lookup import build_xdb
+from utils import ip_region
+
+SEGMENTS = [
+    ('1.0.0.0', '1.0.0.255', '中国|广东省|深圳市|电信'),
+    ('1.0.1.0', '1.2.255.255', '中国|上海|上海市|联通'),
+    ('8.8.8.0', '8.8.8.255', '美国|0|0|谷歌'),
+]
+
+
+class IpRegionTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.xdb_path = os.path.join(cls.tmpdir.name, 'ip2region.xdb')
+        build_xdb(cls.xdb_path, SEGMENTS)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        ip_region.reset()
+        self.addCleanup(ip_region.reset)
+
+    def test_modes_return_same_regions(self):
+        for mode in ip_region.MODES:
+            with self.subTest(mode=mode):
+                searcher = ip_region.load_searcher(self.xdb_path, mode)
+                self.assertEqual(ip_region.search(searcher, '1.0.0.8'), '中国|广东省|深圳市|电信')
+                self.assertEqual(ip_region.search(searcher, '1.2.3.4'), '中国|上海|上海市|联通')
+                self.assertEqual(ip_region.search(searcher, '9.9.9.9'), '0|0|0|0')
+                searcher.close()
+
+        with self.assertRaises(ValueError):
+            ip_region.load_searcher(self.xdb_path, 'disk')
+
+    def test_lookup_province_is_cached(self):
+        with self.settings(IP2REGION_XDB_PATH=self.xdb_path, IP2REGION_MODE='mmap'):
+            self.assertEqual(ip_region.lookup_province('1.0.0.8'), '广东')
+            self.assertEqual(ip_region.lookup_province('1.2.3.4'), '上海')
+            self.assertEqual(ip_region.lookup_province('8.8.8.8'), '')
+            self.assertEqual(ip_region.lookup_province('1.0.0.8'), '广东')
+        info = ip_region.lookup_province.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 3))
+
+    def test_missing_xdb(self):
+        with self.settings(IP2REGION_XDB_PATH=os.path.join(self.tmpdir.name, 'missing.xdb')):
+            self.assertIsNone(ip_region.get_searcher())
+            self.assertIsNone(ip_region.lookup_province('1.0.0.8'))
+
+    def test_get_location_from_ip(self):
+        with self.settings(IP2REGION_XDB_PATH=self.xdb_path):
+            self.assertEqual(get_location_from_ip('1.0.0.8'), '广东')
+            self.assertIsNone(get_location_from_ip('8.8.8.8'))
+            self.assertEqual(get_location_from_ip('127.0.0.1'), '本地')
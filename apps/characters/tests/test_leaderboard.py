@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.characters.models import Character
+from apps.users.models import User
+
+
+class LeaderboardTest(APITestCase):
+    """经验值排行榜测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.characters = [
+            Character.objects.create(
+                user=self.user,
+                name=f'Character {experience}',
+                display_code=f'code{experience:02d}',
+                is_public=True,
+                experience=experience
+            )
+            for experience in (5, 30, 12)
+        ]
+        self.private = Character.objects.create(
+            user=self.user,
+            name='Private',
+            display_code='privat',
+            experience=100
+        )
+
+    def test_top_fallback_orders_by_experience(self):
+        """Redis 不可用时按经验值从数据库排序，且不包含未公开角色"""
+        response = self.client.get(reverse('leaderboard'), {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['experience'] for item in response.data['results']],
+            [30, 12]
+        )
+        self.assertEqual(response.data['results'][0]['rank'], 1)
+
+    def test_top_uses_sorted_set(self):
+        """Redis 可用时按有序集合顺序返回"""
+        entries = [(str(self.characters[0].uid), 5)]
+        with patch('apps.characters.leaderboard.top', return_value=entries):
+            response = self.client.get(reverse('leaderboard'))
+        self.assertEqual(
+            [item['display_code'] for item in response.data['results']],
+            ['code05']
+        )
+
+    def test_my_rank(self):
+        """获取自己角色的排名"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(
+            reverse('character-rank', kwargs={'pk': self.characters[2].uid})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rank'], 2)
+        self.assertEqual(response.data['total'], 3)
+
+        response = self.client.get(
+            reverse('character-rank', kwargs={'pk': self.private.uid})
+        )
+        self.assertIsNone(response.data['rank'])
+
+    def test_experience_change_syncs_leaderboard(self):
+        """经验值变化时同步排行榜，无关字段更新时不同步"""
+        character = self.characters[0]
+        with patch('apps.characters.leaderboard.update') as update:
+            character.experience += 1
+            character.save(update_fields=['experience'])
+            character.save(update_fields=['name'])
+        update.assert_called_once_with(character)
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.characters.models import Character, Message
+from apps.users.models import User
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class MessageWindowTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='window@example.com', password='testpass123')
+        self.character = Character.objects.create(
+            user=self.user, name='Window', display_code='window01', is_public=True
+        )
+        self.url = reverse('character-messages', kwargs={'code': 'window01'})
+
+    def contents(self, response):
+        return [message['content'] for message in response.json()]
+
+    def test_recent_page_is_cached_until_messages_change(self):
+        Message.objects.create(character=self.character, content='first')
+        with self.assertNumQueries(2):
+            self.assertEqual(self.contents(self.client.get(self.url)), ['first'])
+        # 命中缓存时只查询角色
+        with self.assertNumQueries(1):
+            self.assertEqual(self.contents(self.client.get(self.url)), ['first'])
+
+        response = self.client.post(self.url, {'content': 'second'}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.contents(self.client.get(self.url)), ['second', 'first'])
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        detail_url = reverse(
+            'character-message-detail', kwargs={'code': 'window01', 'pk': response.json()['id']}
+        )
+        self.assertEqual(client.delete(detail_url).status_code, 204)
+        self.assertEqual(self.contents(self.client.get(self.url)), ['first'])
+
+    def test_before_id_pages_through_history(self):
+        Message.objects.bulk_create([
+            Message(character=self.character, owner_id=self.character.user_id, content=str(index))
+            for index in range(120)
+        ])
+        page = self.client.get(self.url).json()
+        self.assertEqual([m['content'] for m in page], [str(index) for index in range(119, 69, -1)])
+
+        page = self.client.get(self.url, {'before_id': page[-1]['id']}).json()
+        self.assertEqual([m['content'] for m in page], [str(index) for index in range(69, 19, -1)])
+
+        page = self.client.get(self.url, {'before_id': page[-1]['id']}).json()
+        self.assertEqual([m['content'] for m in page], [str(index) for index in range(19, -1, -1)])
+
+    def test_invalid_before_id(self):
+        for value in ('abc', '0', '-1'):
+            with self.subTest(value=value):
+                response = self.client.get(self.url, {'before_id': value})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('before_id', response.json())
@@ -0,0 +1,65 @@
+from unittest import skipUnless
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.characters.models import Character
+from apps.users.models import User
+from utils import metrics
+
+
+@skipUnless(metrics.PROMETHEUS_AVAILABLE, 'prometheus_client is not installed')
+class MetricsTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='test@example.com', password='testpass123')
+        self.character = Character.objects.create(
+            user=user, name='Test Character', display_code='abc123', is_public=True
+        )
+
+    def sample(self, name, labels):
+        return metrics.get_registry().get_sample_value(name, labels) or 0
+
+    def upload(self):
+        return self.client.post(
+            reverse('status-update'),
+            {'type': 'pc', 'data': {'battery': 80}},
+            content_type='application/json',
+            HTTP_X_CHARACTER_KEY=str(self.character.secret_key),
+        )
+
+    def test_status_uploads_counted(self):
+        created = self.sample('stillalive_status_uploads_total', {'result': 'created'})
+        requests = self.sample(
+            'stillalive_http_requests_total',
+            {'view': 'status-update', 'method': 'POST', 'status': '200'}
+        )
+
+        self.assertEqual(self.upload().status_code, 200)
+
+        self.assertEqual(self.sample('stillalive_status_uploads_total', {'result': 'created'}), created + 1)
+        self.assertEqual(
+            self.sample(
+                'stillalive_http_requests_total',
+                {'view': 'status-update', 'method': 'POST', 'status': '200'}
+            ),
+            requests + 1
+        )
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('status-get', kwargs={'code': 'abc123'}))
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'stillalive_http_request_duration_seconds_bucket', response.content)
+
+    @override_settings(METRICS_AUTH_TOKEN='secret', METRICS_PUBLIC=True)
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_AUTH_TOKEN='', METRICS_PUBLIC=False)
+    def test_metrics_denied_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
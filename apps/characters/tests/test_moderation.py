@@ -0,0 +1,220 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.characters import moderation
+from apps.characters.models import Character, Message
+from apps.characters.tasks import archive_expired_messages
+from apps.users.models import User
+
+
+class ModerationTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='mod@example.com', password='testpass123')
+        self.character = Character.objects.create(
+            user=self.user, name='Mod', display_code='mod01', is_public=True
+        )
+        self.other = Character.objects.create(
+            user=self.user, name='Other', display_code='mod02', is_public=True
+        )
+
+    def create_message(self, character, content, ip='198.51.100.1', age=timedelta()):
+        message = Message.objects.create(character=character, content=content, ip_address=ip)
+        if age:
+            Message.objects.filter(pk=message.pk).update(created_at=timezone.now() - age)
+        return message
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class BulkDeleteTest(ModerationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('character-messages-bulk-delete', kwargs={'code': 'mod01'})
+
+    def remaining(self, character=None):
+        return sorted(Message.objects.filter(character=character or self.character).values_list('content', flat=True))
+
+    def test_delete_by_ip_and_time_range(self):
+        self.create_message(self.character, 'spam old', age=timedelta(days=2))
+        self.create_message(self.character, 'spam new')
+        self.create_message(self.character, 'kept', ip='198.51.100.2')
+        self.create_message(self.other, 'other board')
+
+        response = self.client.post(self.url, {
+            'ip_address': '198.51.100.1',
+            'created_after': (timezone.now() - timedelta(days=1)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'deleted': 1})
+        self.assertEqual(self.remaining(), ['kept', 'spam old'])
+        self.assertEqual(self.remaining(self.other), ['other board'])
+
+    def test_delete_by_ids_is_single_query(self):
+        messages = [self.create_message(self.character, f'spam {i}') for i in range(20)]
+        foreign = self.create_message(self.other, 'other board')
+        # 缓存最近留言，删除后应失效
+        self.client.get(reverse('character-messages', kwargs={'code': 'mod01'}))
+
+        ids = [message.pk for message in messages[:15]] + [foreign.pk]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'ids': ids}, format='json')
+        self.assertEqual(response.json(), {'deleted': 15})
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('DELETE')]), 1)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(Message.objects.filter(pk=foreign.pk).count(), 1)
+
+        response = self.client.get(reverse('character-messages', kwargs={'code': 'mod01'}))
+        self.assertEqual(len(response.json()), 5)
+
+    def test_raw_delete(self):
+        kept = self.create_message(self.character, 'kept')
+        self.create_message(self.character, 'spam')
+        self.create_message(self.other, 'spam')
+        queryset = Message.objects.filter(character=self.character, content='spam')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(moderation.raw_delete(queryset), 1)
+        self.assertEqual([q['sql'].split()[0] for q in queries], ['DELETE'])
+        self.assertEqual(moderation.raw_delete(Message.objects.filter(id__in=[])), 0)
+        self.assertEqual(Message.objects.filter(character=self.character).get(), kept)
+
+    def test_requires_owner_and_condition(self):
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, 400)
+        response = self.client.post(self.url, {
+            'created_after': timezone.now().isoformat(),
+            'created_before': (timezone.now() - timedelta(days=1)).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        stranger = User.objects.create_user(email='stranger@example.com', password='testpass123')
+        self.client.force_authenticate(stranger)
+        response = self.client.post(self.url, {'ip_address': '198.51.100.1'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class ArchiveTest(ModerationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+        settings = override_settings(MESSAGE_ARCHIVE_DIR=self.archive_dir, MESSAGE_RETENTION_DAYS=30)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def read_archives(self, character):
+        rows = []
+        directory = os.path.join(self.archive_dir, str(character.pk))
+        for name in sorted(os.listdir(directory)):
+            self.assertTrue(name.endswith('.jsonl.gz'))
+            with gzip.open(os.path.join(directory, name), 'rt', encoding='utf-8') as archive:
+                rows += [json.loads(line) for line in archive]
+        return rows
+
+    def test_archive_expired_in_batches(self):
+        old = [self.create_message(self.character, f'old {i}', age=timedelta(days=40)) for i in range(5)]
+        other_old = self.create_message(self.other, '旧留言', age=timedelta(days=31))
+        recent = self.create_message(self.character, 'recent', age=timedelta(days=29))
+
+        self.assertEqual(moderation.archive_expired(batch_size=2), 6)
+        self.assertEqual(list(Message.objects.values_list('pk', flat=True)), [recent.pk])
+
+        rows = self.read_archives(self.character)
+        self.assertEqual([row['id'] for row in rows], [message.pk for message in old])
+        self.assertEqual(rows[0]['content'], 'old 0')
+        self.assertEqual(rows[0]['ip_address'], '198.51.100.1')
+        self.assertEqual([row['content'] for row in self.read_archives(self.other)], ['旧留言'])
+        self.assertEqual(self.read_archives(self.other)[0]['id'], other_old.pk)
+
+    def test_max_batches_leaves_rest_for_next_run(self):
+        for i in range(5):
+            self.create_message(self.character, f'old {i}', age=timedelta(days=40))
+        self.assertEqual(moderation.archive_expired(batch_size=2, max_batches=2), 4)
+        self.assertEqual(Message.objects.count(), 1)
+        self.assertEqual(archive_expired_messages(), 1)
+        self.assertEqual(Message.objects.count(), 0)
+
+    @override_settings(MESSAGE_RETENTION_DAYS=0)
+    def test_zero_retention_keeps_messages(self):
+        self.create_message(self.character, 'old', age=timedelta(days=400))
+        self.assertEqual(archive_expired_messages(), 0)
+        self.assertEqual(Message.objects.count(), 1)
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class InboxTest(ModerationTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('message-inbox')
+        stranger = User.objects.create_user(email='stranger@example.com', password='testpass123')
+        self.foreign = Character.objects.create(user=stranger, name='Foreign', display_code='mod03')
+
+    def test_owner_is_set_from_character(self):
+        message = self.create_message(self.character, 'hello')
+        self.assertEqual(message.owner_id, self.user.uid)
+
+    def test_lists_messages_across_characters(self):
+        first = self.create_message(self.character, 'one')
+        second = self.create_message(self.other, 'two')
+        self.create_message(self.foreign, 'not mine')
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([m['id'] for m in body['results']], [second.pk, first.pk])
+        self.assertEqual(body['results'][0]['character'], str(self.other.pk))
+        self.assertEqual(body['results'][0]['character_name'], 'Other')
+        self.assertIsNone(body['next_before_id'])
+
+    def test_keyset_pagination(self):
+        messages = [
+            self.create_message((self.character, self.other)[i % 2], f'm{i}') for i in range(55)
+        ]
+        body = self.client.get(self.url).json()
+        self.assertEqual(len(body['results']), 50)
+        self.assertEqual(body['next_before_id'], messages[5].pk)
+
+        body = self.client.get(self.url, {'before_id': body['next_before_id']}).json()
+        self.assertEqual([m['content'] for m in body['results']], ['m4', 'm3', 'm2', 'm1', 'm0'])
+        self.assertIsNone(body['next_before_id'])
+
+    def test_filters(self):
+        self.create_message(self.character, 'old', age=timedelta(days=3))
+        self.create_message(self.character, 'spam', ip='198.51.100.9')
+        self.create_message(self.other, 'other')
+
+        def contents(**params):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            return [m['content'] for m in response.json()['results']]
+
+        self.assertEqual(contents(character=str(self.other.pk)), ['other'])
+        self.assertEqual(contents(character=str(self.foreign.pk)), [])
+        self.assertEqual(contents(ip_address='198.51.100.9'), ['spam'])
+        self.assertEqual(contents(created_before=(timezone.now() - timedelta(days=1)).isoformat()), ['old'])
+        self.assertEqual(self.client.get(self.url, {'before_id': 0}).status_code, 400)
+
+    def test_inbox_query_count(self):
+        for i in range(10):
+            self.create_message(self.character, f'm{i}')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertEqual(len(queries), 1)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.characters.models import Character
+from apps.characters.tasks import rebuild_presence
+from apps.users.models import User
+
+
+class ProfilingTest(APITestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+        settings_override = override_settings(PROFILING_ENABLED=True, PROFILING_DIR=self.profile_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='testpass123'
+        )
+        self.user = User.objects.create_user(email='test@example.com', password='testpass123')
+        Character.objects.create(user=self.user, name='Test Character', display_code='abc123')
+        self.url = reverse('status-get', kwargs={'code': 'abc123'})
+
+    def profiles(self):
+        return sorted(os.listdir(self.profile_dir))
+
+    def get_as(self, user, **extra):
+        token = RefreshToken.for_user(user).access_token
+        return self.client.get(self.url, HTTP_AUTHORIZATION=f'Bearer {token}', **extra)
+
+    def test_superuser_can_request_profile(self):
+        response = self.get_as(self.admin, HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.profiles(), [response['X-Profile-File']])
+        self.assertTrue(response['X-Profile-File'].startswith('view-status-get-'))
+
+    def test_regular_user_cannot_request_profile(self):
+        response = self.get_as(self.user, HTTP_X_PROFILE='1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(self.profiles(), [])
+
+    def test_sampled_profiling(self):
+        with override_settings(PROFILING_SAMPLE_RATES={'status-get': 1.0}):
+            self.client.get(self.url)
+        self.client.get(reverse('survivors-list'))
+
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].startswith('view-status-get-'))
+
+    def test_sampled_task_profiling(self):
+        with override_settings(PROFILING_TASK_SAMPLE_RATES={rebuild_presence.name: 1.0}):
+            rebuild_presence.apply()
+
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].startswith(f'task-{rebuild_presence.name}-'))
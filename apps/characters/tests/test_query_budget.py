@@ -0,0 +1,368 @@
+"""
+热点接口查询次数回归测试
+
+对 api/v1/urls.py 中的每个接口分别在少量数据和大量数据下各请求一次，
+断言查询次数不随数据量增长（没有 N+1），且不超过 QUERY_BUDGETS 中配置的预算。
+"""
+import io
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.characters.models import Character, CharacterStatus, Message, WillConfig
+from apps.characters.tasks import check_wills
+from apps.users.models import BlacklistedUser, InvitationCode, User
+
+SMALL_SIZE = 1
+LARGE_SIZE = 25
+PASSWORD = 'testpass123'
+
+
+def collect_url_names(patterns):
+    """收集 URLConf 中所有具名路由"""
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= collect_url_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+class QueryBudgetTest(APITestCase):
+    """接口查询次数回归测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.fixture_size = 0
+        self.serial = 0
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password=PASSWORD
+        )
+        self.user = User.objects.create_user(email='owner@example.com', password=PASSWORD)
+        self.character = Character.objects.create(
+            user=self.user, name='Owner Character', display_code='owner1', is_public=True
+        )
+        WillConfig.objects.create(
+            character=self.character, is_enabled=True,
+            target_email='target@example.com', timeout_hours=24
+        )
+        self.populate(SMALL_SIZE)
+
+    def next_serial(self):
+        self.serial += 1
+        return self.serial
+
+    def populate(self, size):
+        """补充公开角色、状态历史、留言、遗嘱、黑名单和邀请码，使每类数据达到 size 条"""
+        now = timezone.now()
+        for index in range(self.fixture_size, size):
+            other = User.objects.create_user(email=f'user{index}@example.com', password=PASSWORD)
+            character = Character.objects.create(
+                user=other, name=f'Survivor {index}', display_code=f'sv{index:04d}',
+                is_public=True, experience=index, last_active_at=now - timedelta(minutes=index)
+            )
+            CharacterStatus.objects.bulk_create([
+                CharacterStatus(character=character, status_type='vital_signs', data={'battery': index}),
+                CharacterStatus(character=self.character, status_type='vital_signs', data={'battery': index}),
+                CharacterStatus(character=self.character, status_type=f'type_{index % 3}', data={}),
+            ])
+            Message.objects.create(character=self.character, content=f'留言 {index}', ip_address='10.0.0.1')
+            WillConfig.objects.create(
+                character=character, is_enabled=True,
+                target_email='target@example.com', timeout_hours=24
+            )
+            # 超过最短超时时间但未超过自身超时时间的遗嘱，以及从未上报过状态的遗嘱，
+            # 每次检查都会被列为候选但不会触发
+            stale = Character.objects.create(
+                user=other, name=f'Stale {index}', display_code=f'st{index:04d}',
+                last_active_at=now - timedelta(hours=48)
+            )
+            silent = Character.objects.create(user=other, name=f'Silent {index}', display_code=f'si{index:04d}')
+            WillConfig.objects.bulk_create([
+                WillConfig(character=stale, is_enabled=True, target_email='target@example.com', timeout_hours=72),
+                WillConfig(character=silent, is_enabled=True, target_email='target@example.com', timeout_hours=24),
+            ])
+            BlacklistedUser.objects.create(user=self.user, blocked_user=other)
+            InvitationCode.create_invitation_code(created_by=self.admin, note=f'note {index}')
+        self.fixture_size = size
+
+    # 每个用例返回 (method, url, data, format, user)，user 为 None 时匿名访问
+
+    def case_api_root(self):
+        return 'get', reverse('api-root'), None, None, self.user
+
+    def case_status_update(self):
+        # 每次都按当天首次同步计算经验奖励
+        Character.objects.filter(pk=self.character.pk).update(last_sync_date=None)
+        self.client.credentials(HTTP_X_CHARACTER_KEY=str(self.character.secret_key))
+        data = {'type': 'vital_signs', 'data': {'battery': self.next_serial()}}
+        return 'post', reverse('status-update'), data, 'json', None
+
+    def case_survivors_list(self):
+        return 'get', reverse('survivors-list'), None, None, None
+
+    def case_leaderboard(self):
+        return 'get', reverse('leaderboard'), None, None, None
+
+    def case_stats(self):
+        return 'get', reverse('stats'), None, None, None
+
+    def case_status_get(self):
+        return 'get', reverse('status-get', kwargs={'code': self.character.display_code}), None, None, None
+
+    def case_character_messages(self):
+        url = reverse('character-messages', kwargs={'code': self.character.display_code})
+        return 'get', url, None, None, None
+
+    def case_character_messages_post(self):
+        # 每次都按当天首次留言的 IP 计算经验奖励
+        Character.objects.filter(pk=self.character.pk).update(danmaku_ips_today=[])
+        url = reverse('character-messages', kwargs={'code': self.character.display_code})
+        return 'post', url, {'content': f'新留言 {self.next_serial()}'}, 'json', None
+
+    def case_character_message_detail(self):
+        message = Message.objects.create(character=self.character, content='待删除')
+        url = reverse('character-message-detail', kwargs={'code': self.character.display_code, 'pk': message.pk})
+        return 'delete', url, None, None, self.user
+
+    def case_character_messages_bulk_delete(self):
+        url = reverse('character-messages-bulk-delete', kwargs={'code': self.character.display_code})
+        return 'post', url, {'ip_address': '10.0.0.1'}, 'json', self.user
+
+    def case_message_inbox(self):
+        return 'get', reverse('message-inbox'), {'ip_address': '10.0.0.1'}, None, self.user
+
+    def case_character_display(self):
+        return 'get', reverse('character-display', kwargs={'code': self.character.display_code}), None, None, None
+
+    def case_token_obtain_pair(self):
+        data = {'email': self.user.email, 'password': PASSWORD}
+        return 'post', reverse('token_obtain_pair'), data, 'json', None
+
+    def case_token_refresh(self):
+        data = {'refresh': str(RefreshToken.for_user(self.user))}
+        return 'post', reverse('token_refresh'), data, 'json', None
+
+    def case_user_list(self):
+        return 'get', reverse('user-list'), None, None, self.admin
+
+    def case_user_register_email(self):
+        email = f'new{self.next_serial()}@example.com'
+        invitation = InvitationCode.create_invitation_code(created_by=self.admin)
+        cache.set(f'email_verify_code_{email}', '123456', timeout=300)
+        data = {'email': email, 'password': PASSWORD, 'verify_code': '123456', 'invitation_code': invitation.code}
+        return 'post', reverse('user-register-email'), data, 'json', None
+
+    def case_user_send_verify_code(self):
+        data = {'email': f'verify{self.next_serial()}@example.com'}
+        return 'post', reverse('user-send-verify-code'), data, 'json', None
+
+    def case_user_profile(self):
+        return 'get', reverse('user-profile'), None, None, self.user
+
+    def case_user_change_password(self):
+        data = {'old_password': PASSWORD, 'new_password': PASSWORD}
+        return 'post', reverse('user-change-password'), data, 'json', self.user
+
+    def case_user_upload_avatar(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (10, 10), color='red').save(buffer, format='JPEG')
+        avatar = SimpleUploadedFile('avatar.jpg', buffer.getvalue(), content_type='image/jpeg')
+        return 'post', reverse('user-upload-avatar'), {'avatar': avatar}, 'multipart', self.user
+
+    def case_user_ban(self):
+        target = User.objects.create_user(email=f'ban{self.next_serial()}@example.com')
+        url = reverse('user-ban', kwargs={'pk': target.uid})
+        return 'post', url, {'is_active': False}, 'json', self.admin
+
+    def case_user_count(self):
+        return 'get', reverse('user-count'), None, None, None
+
+    def case_user_blacklist(self):
+        target = User.objects.create_user(email=f'block{self.next_serial()}@example.com')
+        return 'post', reverse('user-blacklist'), {'uid': target.uid}, 'json', self.user
+
+    def case_user_unblacklist(self):
+        target = User.objects.create_user(email=f'unblock{self.next_serial()}@example.com')
+        BlacklistedUser.objects.create(user=self.user, blocked_user=target)
+        return 'delete', f"{reverse('user-unblacklist')}?uid={target.uid}", None, None, self.user
+
+    def case_user_blacklist_list(self):
+        return 'get', reverse('user-blacklist-list'), None, None, self.user
+
+    def case_user_delete_account(self):
+        target = User.objects.create_user(email=f'delete{self.next_serial()}@example.com', password=PASSWORD)
+        return 'delete', reverse('user-delete-account'), {'password': PASSWORD}, 'json', target
+
+    def case_user_send_reset_code(self):
+        cache.delete(f'email_verify_code_limit_{self.user.email}')
+        return 'post', reverse('user-send-reset-code'), {'email': self.user.email}, 'json', None
+
+    def case_user_reset_password(self):
+        cache.set(f'email_verify_code_{self.user.email}', '123456', timeout=300)
+        data = {'email': self.user.email, 'verify_code': '123456', 'new_password': PASSWORD}
+        return 'post', reverse('user-reset-password'), data, 'json', None
+
+    def case_user_create_invitation(self):
+        return 'post', reverse('user-create-invitation'), {'note': 'test'}, 'json', self.admin
+
+    def case_user_list_invitations(self):
+        return 'get', reverse('user-list-invitations'), None, None, self.admin
+
+    def case_character_list(self):
+        return 'get', reverse('character-list'), None, None, self.user
+
+    def case_character_create(self):
+        return 'post', reverse('character-list'), {'name': 'Created'}, 'json', self.admin
+
+    def case_character_detail(self):
+        return 'get', reverse('character-detail', kwargs={'pk': self.character.uid}), None, None, self.user
+
+    def case_character_secret_key(self):
+        url = reverse('character-secret-key', kwargs={'pk': self.character.uid})
+        return 'get', url, None, None, self.user
+
+    def case_character_regenerate_secret_key(self):
+        url = reverse('character-regenerate-secret-key', kwargs={'pk': self.character.uid})
+        return 'post', url, None, None, self.user
+
+    def case_character_regenerate_display_code(self):
+        url = reverse('character-regenerate-display-code', kwargs={'pk': self.character.uid})
+        return 'post', url, None, None, self.user
+
+    def case_character_update_status(self):
+        url = reverse('character-update-status', kwargs={'pk': self.character.uid})
+        return 'post', url, {'is_active': True}, 'json', self.user
+
+    def case_character_rank(self):
+        return 'get', reverse('character-rank', kwargs={'pk': self.character.uid}), None, None, self.user
+
+    def case_character_will_list(self):
+        url = reverse('character-will-list', kwargs={'character_pk': self.character.uid})
+        return 'get', url, None, None, self.user
+
+    def case_character_will_detail(self):
+        url = reverse('character-will-detail', kwargs={'character_pk': self.character.uid, 'pk': 1})
+        return 'patch', url, {'content': f'遗嘱 {self.next_serial()}'}, 'json', self.user
+
+    # 用例名 -> 对应的 URL 名称
+    CASES = {
+        'api_root': 'api-root',
+        'status_update': 'status-update',
+        'survivors_list': 'survivors-list',
+        'leaderboard': 'leaderboard',
+        'stats': 'stats',
+        'status_get': 'status-get',
+        'character_messages': 'character-messages',
+        'character_messages_post': 'character-messages',
+        'character_message_detail': 'character-message-detail',
+        'character_messages_bulk_delete': 'character-messages-bulk-delete',
+        'message_inbox': 'message-inbox',
+        'character_display': 'character-display',
+        'token_obtain_pair': 'token_obtain_pair',
+        'token_refresh': 'token_refresh',
+        'user_list': 'user-list',
+        'user_register_email': 'user-register-email',
+        'user_send_verify_code': 'user-send-verify-code',
+        'user_profile': 'user-profile',
+        'user_change_password': 'user-change-password',
+        'user_upload_avatar': 'user-upload-avatar',
+        'user_ban': 'user-ban',
+        'user_count': 'user-count',
+        'user_blacklist': 'user-blacklist',
+        'user_unblacklist': 'user-unblacklist',
+        'user_blacklist_list': 'user-blacklist-list',
+        'user_delete_account': 'user-delete-account',
+        'user_send_reset_code': 'user-send-reset-code',
+        'user_reset_password': 'user-reset-password',
+        'user_create_invitation': 'user-create-invitation',
+        'user_list_invitations': 'user-list-invitations',
+        'character_list': 'character-list',
+        'character_create': 'character-list',
+        'character_detail': 'character-detail',
+        'character_secret_key': 'character-secret-key',
+        'character_regenerate_secret_key': 'character-regenerate-secret-key',
+        'character_regenerate_display_code': 'character-regenerate-display-code',
+        'character_update_status': 'character-update-status',
+        'character_rank': 'character-rank',
+        'character_will_list': 'character-will-list',
+        'character_will_detail': 'character-will-detail',
+    }
+
+    def measure(self, case):
+        """执行用例并返回 (状态码, 查询次数)"""
+        cache.clear()
+        self.client.force_authenticate(user=None)
+        self.character.refresh_from_db()
+        method, url, data, format, user = getattr(self, f'case_{case}')()
+        if user is not None:
+            self.client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format=format)
+        return response.status_code, len(queries)
+
+    def test_all_urls_covered(self):
+        """api/v1/urls.py 中的每个具名路由都有对应用例"""
+        url_names = collect_url_names(get_resolver('api.v1.urls').url_patterns)
+        self.assertEqual(url_names - set(self.CASES.values()), set())
+
+    def test_query_counts_are_constant(self):
+        """查询次数不随数据量增长，且不超过配置的预算"""
+        small = {case: self.measure(case) for case in self.CASES}
+        self.populate(LARGE_SIZE)
+        large = {case: self.measure(case) for case in self.CASES}
+
+        for case, url_name in self.CASES.items():
+            with self.subTest(case=case):
+                small_status, small_count = small[case]
+                large_status, large_count = large[case]
+                self.assertLess(small_status, 500)
+                self.assertEqual(small_status, large_status)
+                self.assertEqual(small_count, large_count)
+
+                budget = settings.QUERY_BUDGETS.get(url_name, settings.QUERY_BUDGET_DEFAULT)
+                self.assertLessEqual(large_count, budget)
+
+    def test_check_wills_query_count_is_constant(self):
+        """遗嘱检查任务的查询次数不随遗嘱数量增长"""
+        with CaptureQueriesContext(connection) as small:
+            check_wills()
+        self.populate(LARGE_SIZE)
+        with CaptureQueriesContext(connection) as large:
+            check_wills()
+        self.assertEqual(len(small), len(large))
+        # 候选遗嘱都未超时，不应被禁用
+        self.assertFalse(WillConfig.objects.filter(is_enabled=False).exists())
+
+    @override_settings(
+        QUERY_BUDGET_ENABLED=True,
+        QUERY_BUDGET_ACTION='reject',
+        QUERY_BUDGETS={'survivors-list': 0}
+    )
+    def test_middleware_rejects_over_budget(self):
+        """reject 模式下超出预算的请求返回 503"""
+        response = self.client.get(reverse('survivors-list'))
+        self.assertEqual(response.status_code, 503)
+
+    @override_settings(
+        QUERY_BUDGET_ENABLED=True,
+        QUERY_BUDGET_ACTION='log',
+        QUERY_BUDGETS={'survivors-list': 0}
+    )
+    def test_middleware_logs_over_budget(self):
+        """log 模式下超出预算只记录日志"""
+        with self.assertLogs('utils.middleware', level='WARNING') as logs:
+            response = self.client.get(reverse('survivors-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('survivors-list', logs.output[0])
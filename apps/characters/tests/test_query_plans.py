@@ -0,0 +1,87 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from apps.characters.models import Character, CharacterStatus, Message, WillConfig
+from apps.characters import query_plans
+from apps.characters.query_plans import REGISTRY
+from apps.users.models import User
+
+
+class ExplainQueriesCommandTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        user = User.objects.create_user(email='plan@example.com', username='plan', password='test')
+        character = Character.objects.create(
+            user=user, name='plan', display_code='PLAN0001', is_public=True
+        )
+        CharacterStatus.objects.create(character=character, status_type='vital_signs', data={})
+        Message.objects.create(character=character, content='hi', ip_address='127.0.0.1')
+        WillConfig.objects.create(character=character, is_enabled=True, target_email='a@example.com')
+
+    def explain(self, *args):
+        out = io.StringIO()
+        call_command('explain_queries', '--baseline-dir', self.directory, *args, stdout=out)
+        return out.getvalue()
+
+    def test_update_then_check_passes(self):
+        self.explain('--update')
+        self.assertEqual(
+            sorted(os.listdir(self.directory)), sorted(f'{name}.json' for name in REGISTRY)
+        )
+        output = self.explain()
+        self.assertEqual(output.count('OK'), len(REGISTRY))
+
+    def test_shape_change_is_reported(self):
+        self.explain('--update', '--only', 'message_list')
+        path = os.path.join(self.directory, 'message_list.json')
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        baseline[0]['shape'] = ['SCAN characters_message']
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f)
+
+        with self.assertRaises(CommandError):
+            self.explain('--only', 'message_list')
+
+    def test_missing_baseline(self):
+        self.assertIn('没有基线', self.explain('--only', 'message_list'))
+        with self.assertRaises(CommandError):
+            self.explain('--only', 'message_list', '--require-baseline')
+
+    def test_full_scan_of_indexed_table(self):
+        """声明为 indexed 的表出现全表扫描时，无论有无基线都视为回归"""
+        postgres = ['Limit', '  Seq Scan on characters_message']
+        sqlite = ['SCAN characters_message', 'SEARCH characters_character USING INDEX x (uid=?)']
+        indexed = [
+            'Index Scan using characters__charact_idx on characters_message',
+            'SCAN characters_message USING INDEX x',
+        ]
+        self.assertEqual(query_plans.full_scans(postgres, ['characters_message']), ['characters_message'])
+        self.assertEqual(query_plans.full_scans(sqlite, ['characters_message']), ['characters_message'])
+        self.assertEqual(query_plans.full_scans(indexed, ['characters_message']), [])
+        self.assertEqual(
+            query_plans.check_scans('message_list', [{'shape': postgres}]), ['语句 0 全表扫描 characters_message']
+        )
+
+    def test_unsupported_database(self):
+        with patch.object(connection, 'vendor', 'oracle'):
+            with self.assertRaisesMessage(ValueError, '不支持的数据库: oracle'):
+                query_plans.explain('SELECT 1')
+        with patch('apps.characters.query_plans.explain', side_effect=ValueError('不支持的数据库: oracle')):
+            with self.assertRaisesMessage(CommandError, '不支持的数据库: oracle'):
+                self.explain('--only', 'message_list')
+
+    def test_requires_seeded_data(self):
+        Character.objects.all().delete()
+        with self.assertRaises(CommandError):
+            self.explain()
@@ -0,0 +1,54 @@
+import io
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from apps.characters.models import Character, CharacterStatus, Message, WillConfig
+from apps.users.models import User
+
+SEED_ARGS = [
+    '--users', '3', '--characters', '6', '--days', '2', '--messages', '3', '--wills', '4',
+    '--seed', '7', '--now', '2026-01-15T12:00:00',
+]
+
+
+class SeedDataCommandTest(TestCase):
+    def seed(self, *args):
+        call_command('seed_data', *SEED_ARGS, *args, '--force', stdout=io.StringIO())
+
+    def snapshot(self):
+        return (
+            list(Character.objects.order_by('uid').values_list('uid', 'secret_key', 'last_active_at', 'status_config')),
+            list(CharacterStatus.objects.order_by('character', 'status_type', 'timestamp')
+                 .values_list('character', 'timestamp', 'last_seen', 'repeat_count', 'data')),
+            list(Message.objects.order_by('character', 'created_at', 'content')
+                 .values_list('ip_address', 'created_at')),
+            list(WillConfig.objects.order_by('character').values_list('character', 'timeout_hours', 'is_enabled')),
+        )
+
+    def test_deterministic_for_same_seed_and_time(self):
+        self.seed()
+        first = self.snapshot()
+
+        Character.objects.all().delete()
+        User.objects.all().delete()
+        self.seed()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_generated_data_is_consistent(self):
+        self.seed()
+
+        self.assertEqual(User.objects.count(), 3)
+        self.assertEqual(WillConfig.objects.count(), 4)
+        self.assertTrue(User.objects.first().check_password('seed-password'))
+        for character in Character.objects.all():
+            # 最后活跃时间与状态历史中的最后一次上报一致
+            self.assertEqual(
+                CharacterStatus.get_last_reported_at(character), character.last_active_at
+            )
+            self.assertTrue(character.status_config['vital_signs'])
+
+    def test_refuses_without_debug(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_data', *SEED_ARGS, stdout=io.StringIO())
@@ -0,0 +1,69 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from utils.stack_sampler import StackSampler
+
+
+class StackSamplerTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_samples_other_threads(self):
+        """采样到其他线程的调用栈，且不包含采样线程自身"""
+        release = threading.Event()
+        worker = threading.Thread(target=release.wait, name='busy-worker')
+        worker.start()
+        try:
+            sampler = StackSampler('web', self.directory)
+            sampler.sample_once()
+            sampler.sample_once()
+        finally:
+            release.set()
+            worker.join()
+
+        worker_stacks = {s: c for s, c in sampler.stacks.items() if s.startswith('busy-worker;')}
+        self.assertEqual(sum(worker_stacks.values()), 2)
+        self.assertTrue(any(';wait (threading.py:' in s for s in worker_stacks))
+
+    def test_interval_keeps_overhead_bounded(self):
+        sampler = StackSampler('web', self.directory, interval=0.01, max_overhead=0.01)
+
+        sampler.adjust_interval(0.001)
+        self.assertAlmostEqual(sampler.interval, 0.1)
+
+        sampler.adjust_interval(0.1)
+        self.assertEqual(sampler.interval, sampler.max_interval)
+
+        for _ in range(100):
+            sampler.adjust_interval(0.00001)
+        self.assertAlmostEqual(sampler.interval, 0.01)
+
+    def test_merge_command(self):
+        for role, counts in (('web', [1, 2]), ('celery', [4])):
+            for index, count in enumerate(counts):
+                path = os.path.join(self.directory, f'{role}-host-{index}-0.folded')
+                with open(path, 'w') as f:
+                    f.write(f'MainThread;main (app.py:1);handle (views.py:10) {count}\n')
+                    f.write(f'MainThread;main (app.py:1) 1\n')
+
+        out = io.StringIO()
+        call_command('merge_stack_samples', dir=self.directory, stdout=out, stderr=io.StringIO())
+        self.assertEqual(out.getvalue().splitlines(), [
+            'MainThread;main (app.py:1);handle (views.py:10) 7',
+            'MainThread;main (app.py:1) 3',
+        ])
+
+        out = io.StringIO()
+        call_command(
+            'merge_stack_samples', dir=self.directory, role='web', delete=True,
+            stdout=out, stderr=io.StringIO()
+        )
+        self.assertIn('handle (views.py:10) 3', out.getvalue())
+        self.assertEqual(os.listdir(self.directory), ['celery-host-0-0.folded'])
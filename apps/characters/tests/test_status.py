@@ -0,0 +1,180 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from redis.exceptions import RedisError
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.characters import presence
+from apps.characters.models import Character, CharacterStatus
+from apps.users.models import User
+
+
+class StatusDedupTest(APITestCase):
+    """状态上报去重测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.character = Character.objects.create(
+            user=self.user,
+            name='Test Character',
+            display_code='abc123'
+        )
+        self.url = reverse('status-update')
+        self.payload = {
+            'type': 'vital_signs',
+            'data': {'battery': 80, 'phone': '微信', 'location': '上海'}
+        }
+
+    def upload(self, payload):
+        return self.client.post(
+            self.url,
+            payload,
+            format='json',
+            HTTP_X_CHARACTER_KEY=str(self.character.secret_key)
+        )
+
+    def test_identical_payload_is_merged(self):
+        """相同内容只刷新 last_seen 和 repeat_count"""
+        self.assertEqual(self.upload(self.payload).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.upload(self.payload).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.upload(self.payload).status_code, status.HTTP_200_OK)
+
+        statuses = CharacterStatus.objects.filter(character=self.character)
+        self.assertEqual(statuses.count(), 1)
+        status_item = statuses.get()
+        self.assertEqual(status_item.repeat_count, 3)
+        self.assertIsNotNone(status_item.last_seen)
+        self.assertGreaterEqual(status_item.last_seen, status_item.timestamp)
+
+    def test_changed_payload_inserts_new_row(self):
+        """内容变化或类型不同时插入新记录"""
+        self.upload(self.payload)
+        self.upload({'type': 'vital_signs', 'data': {'battery': 79}})
+        self.upload({'type': 'other', 'data': {'battery': 79}})
+
+        self.assertEqual(CharacterStatus.objects.filter(character=self.character).count(), 3)
+
+    @override_settings(STATUS_DEDUP_ENABLED=False)
+    def test_dedup_disabled(self):
+        """关闭去重后每次上报都插入新记录"""
+        self.upload(self.payload)
+        self.upload(self.payload)
+
+        self.assertEqual(CharacterStatus.objects.filter(character=self.character).count(), 2)
+
+    def test_upload_marks_character_active(self):
+        """上报状态时更新角色最后活跃时间，且只向前推进"""
+        self.upload(self.payload)
+        self.character.refresh_from_db()
+        last_active_at = self.character.last_active_at
+        self.assertIsNotNone(last_active_at)
+
+        self.assertFalse(self.character.mark_active(last_active_at - timedelta(minutes=5)))
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.last_active_at, last_active_at)
+
+    def test_reads_report_merged_freshness(self):
+        """读取状态时使用最后一次上报时间判断在线"""
+        self.upload(self.payload)
+        past_time = timezone.now() - timedelta(hours=2)
+        CharacterStatus.objects.filter(character=self.character).update(timestamp=past_time)
+        self.upload(self.payload)
+
+        response = self.client.get(
+            reverse('status-get', kwargs={'code': self.character.display_code})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'online')
+        self.assertEqual(
+            CharacterStatus.get_last_reported_at(self.character),
+            CharacterStatus.objects.get(character=self.character).last_seen
+        )
+
+
+class PresenceTest(APITestCase):
+    """在线状态测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.character = Character.objects.create(
+            user=self.user,
+            name='Test Character',
+            display_code='abc123',
+            is_public=True
+        )
+
+    def test_survivors_use_presence_store(self):
+        """Redis 在线集合可用时以其为准"""
+        with patch('apps.characters.presence.online_uids', return_value={str(self.character.uid)}):
+            response = self.client.get(reverse('survivors-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['results'][0]['is_online'])
+
+    def test_survivors_fallback_without_presence_store(self):
+        """Redis 不可用时回退到按最后活跃时间判断"""
+        self.character.mark_active()
+        response = self.client.get(reverse('survivors-list'))
+        self.assertTrue(response.data['results'][0]['is_online'])
+
+        Character.objects.update(last_active_at=timezone.now() - timedelta(hours=1))
+        response = self.client.get(reverse('survivors-list'))
+        self.assertFalse(response.data['results'][0]['is_online'])
+
+    def test_unscheduled_upload_does_not_touch_presence(self):
+        """非定时更新（other）不刷新在线状态"""
+        with patch('apps.characters.presence.touch') as touch:
+            self.client.post(
+                reverse('status-update'),
+                {'type': 'other', 'data': {'note': 'hi'}},
+                format='json',
+                HTTP_X_CHARACTER_KEY=str(self.character.secret_key)
+            )
+            touch.assert_not_called()
+
+            self.client.post(
+                reverse('status-update'),
+                {'type': 'vital_signs', 'data': {'battery': 80}},
+                format='json',
+                HTTP_X_CHARACTER_KEY=str(self.character.secret_key)
+            )
+            touch.assert_called_once()
+
+    def test_prune_survives_redis_error(self):
+        client = MagicMock()
+        client.zremrangebyscore.side_effect = RedisError('down')
+        with patch('apps.characters.presence.get_redis_client', return_value=client):
+            self.assertEqual(presence.prune(), 0)
+
+    def test_unscheduled_upload_keeps_stale_character_offline(self):
+        """只上报 other 的角色不会因此变为在线"""
+        stale = timezone.now() - timedelta(hours=1)
+        Character.objects.update(last_active_at=stale)
+        response = self.client.post(
+            reverse('status-update'),
+            {'type': 'other', 'data': {'note': 'hi'}},
+            format='json',
+            HTTP_X_CHARACTER_KEY=str(self.character.secret_key)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.character.refresh_from_db()
+        self.assertEqual(self.character.last_active_at, stale)
+        response = self.client.get(reverse('survivors-list'))
+        self.assertFalse(response.data['results'][0]['is_online'])
+        response = self.client.get(
+            reverse('status-get', kwargs={'code': self.character.display_code})
+        )
+        self.assertEqual(response.data['status'], 'offline')
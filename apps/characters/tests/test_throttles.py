@@ -0,0 +1,102 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.exceptions import Throttled
+
+from apps.characters import throttles
+from apps.characters.models import Character, Message
+from apps.users.models import User
+
+
+@override_settings(
+    ALLOWED_HOSTS=['*'],
+    CELERY_TASK_ALWAYS_EAGER=True,
+    GEOLOCATION_PROVIDER='apps.characters.tests.test_geolocation.StubProvider',
+    MESSAGE_THROTTLE_RATES={'ip': (2, 1), 'character': (3, 1), 'global': (100, 60)},
+    MESSAGE_DUPLICATE_WINDOW=60,
+)
+class MessageThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        throttles.local_buckets.clear()
+        self.addCleanup(throttles.local_buckets.clear)
+        user = User.objects.create_user(email='flood@example.com', password='testpass123')
+        self.character = Character.objects.create(
+            user=user, name='Flood', display_code='flood01', is_public=True
+        )
+        self.messages_url = reverse('character-messages', kwargs={'code': 'flood01'})
+
+    def post(self, content, ip='198.51.100.1', client=None):
+        return (client or self.client).post(
+            self.messages_url,
+            {'content': content},
+            content_type='application/json',
+            headers={'X-Forwarded-For': ip},
+        )
+
+    def test_ip_bucket(self):
+        self.assertEqual(self.post('one').status_code, 201)
+        self.assertEqual(self.post('two').status_code, 201)
+        response = self.post('three')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(Message.objects.count(), 2)
+
+        # 被拒绝的请求不消耗角色维度的令牌，其他 IP 仍可发送一条
+        self.assertEqual(self.post('four', ip='198.51.100.2').status_code, 201)
+        self.assertEqual(self.post('five', ip='198.51.100.3').status_code, 429)
+
+    def test_spoofed_forwarded_for(self):
+        """客户端在 X-Forwarded-For 前面伪造的地址不会换到新的 IP 令牌桶"""
+        self.assertEqual(self.post('one').status_code, 201)
+        self.assertEqual(self.post('two').status_code, 201)
+        # Nginx 把真实地址追加在末尾
+        self.assertEqual(self.post('three', ip='203.0.113.5, 198.51.100.1').status_code, 429)
+        self.assertEqual(self.post('four', ip='10.0.0.1, 203.0.113.6, 198.51.100.1').status_code, 429)
+        self.assertEqual(Message.objects.count(), 2)
+
+    def test_reading_is_not_throttled(self):
+        for content in ('one', 'two', 'three'):
+            self.post(content)
+        self.assertEqual(self.client.get(self.messages_url).status_code, 200)
+
+    def test_duplicate_content(self):
+        self.assertEqual(self.post('Hello  World').status_code, 201)
+        response = self.post(' hello world ', ip='198.51.100.2')
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(response.json()['detail'].startswith('请勿重复发送相同内容'))
+        self.assertEqual(self.post('hello again', ip='198.51.100.2').status_code, 201)
+
+    def test_local_buckets_refill(self):
+        buckets = throttles.get_buckets('198.51.100.1', 'flood01')
+        self.assertEqual([scope for scope, *_ in buckets], ['ip', 'character', 'global'])
+        local = throttles.LocalTokenBuckets()
+        args = [bucket[1:] for bucket in buckets]
+        self.assertEqual(local.consume(args), (0, 0.0))
+        self.assertEqual(local.consume(args), (0, 0.0))
+        index, wait = local.consume(args)
+        self.assertEqual(index, 1)
+        self.assertAlmostEqual(wait, 60, delta=1)
+
+        # 模拟时间流逝补充令牌
+        for key, (tokens, ts) in local.buckets.items():
+            local.buckets[key] = (tokens, ts - 60)
+        self.assertEqual(local.consume(args), (0, 0.0))
+
+    @override_settings(ROOT_URLCONF='apps.characters.tests.test_async_views')
+    async def test_async_view_parity(self):
+        for content in ('one', 'two'):
+            response = await self.async_client.post(
+                self.messages_url, {'content': content}, content_type='application/json',
+                headers={'X-Forwarded-For': '198.51.100.1'},
+            )
+            self.assertEqual(response.status_code, 201)
+        response = await self.async_client.post(
+            self.messages_url, {'content': 'three'}, content_type='application/json',
+            headers={'X-Forwarded-For': '198.51.100.1'},
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        # 与 DRF 视图抛出 Throttled 时的响应一致
+        self.assertEqual(response.json(), {'detail': str(Throttled(60).detail)})
+        self.assertEqual(await Message.objects.acount(), 2)
@@ -0,0 +1,223 @@
+"""
+留言防刷
+
+令牌桶限流：按客户端 IP、按角色、全局三个维度，每个维度的桶容量（允许的突发条数）
+与每分钟补充的令牌数由 MESSAGE_THROTTLE_RATES 配置。三个桶在 Redis 中由一个 Lua 脚本
+原子地检查并扣减，只有全部有令牌时才放行，被拒绝的请求不消耗其他维度的令牌；
+Redis 不可用时退回进程内的令牌桶（每个 worker 独立计数）。
+重复内容抑制：同一角色在 MESSAGE_DUPLICATE_WINDOW 秒内收到规范化后相同的内容时拒绝。
+两者都在解析请求体之后、访问数据库之前执行。
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import RedisError
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from utils import metrics
+from utils.redis_client import get_async_redis_client, get_redis_client
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'throttle:message:'
+SCOPES = ('ip', 'character', 'global')
+
+# KEYS 为各令牌桶，ARGV 依次为每个桶的容量与每秒补充的令牌数。
+# 返回 {0, '0'} 表示放行；否则返回第一个令牌不足的桶的序号与需要等待的秒数
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local tokens = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local available = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    available = math.min(capacity, available + math.max(0, now - ts) * rate)
+    if available < 1 then
+        return {i, tostring((1 - available) / rate)}
+    end
+    tokens[i] = available
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    redis.call('HSET', key, 'tokens', tostring(tokens[i] - 1), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return {0, '0'}
+"""
+
+
+class LocalTokenBuckets:
+    """进程内令牌桶，Redis 不可用时使用；最多保留 max_size 个桶，超出时淘汰最久未用的"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def consume(self, buckets):
+        now = time.monotonic()
+        with self.lock:
+            available = []
+            for index, (key, capacity, rate) in enumerate(buckets, start=1):
+                tokens, ts = self.buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - ts) * rate)
+                if tokens < 1:
+                    return index, (1 - tokens) / rate
+                available.append(tokens)
+            for (key, _, _), tokens in zip(buckets, available):
+                self.buckets[key] = (tokens - 1, now)
+                self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_size:
+                self.buckets.popitem(last=False)
+        return 0, 0.0
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+local_buckets = LocalTokenBuckets()
+
+
+def get_buckets(ip, character_code):
+    """按配置生成 (scope, 键, 容量, 每秒补充令牌数) 列表，未配置的维度不限制"""
+    rates = getattr(settings, 'MESSAGE_THROTTLE_RATES', {})
+    idents = {'ip': ip, 'character': character_code, 'global': 'all'}
+    buckets = []
+    for scope in SCOPES:
+        rate = rates.get(scope)
+        if rate is None or idents[scope] is None:
+            continue
+        capacity, per_minute = rate
+        buckets.append((scope, f'{KEY_PREFIX}{scope}:{idents[scope]}', capacity, per_minute / 60))
+    return buckets
+
+
+def _script_args(buckets):
+    args = []
+    for _, _, capacity, rate in buckets:
+        args += [capacity, rate]
+    return [key for _, key, _, _ in buckets], args
+
+
+def _result(buckets, index, wait):
+    """脚本或本地令牌桶的返回值转换为 (被拒绝的 scope, 等待秒数)，放行时返回 None"""
+    index = int(index)
+    if index == 0:
+        return None
+    return buckets[index - 1][0], float(wait)
+
+
+def consume(buckets):
+    """扣减令牌，全部放行时返回 None，否则返回 (scope, 等待秒数)"""
+    if not buckets:
+        return None
+    client = get_redis_client()
+    if client is not None:
+        keys, args = _script_args(buckets)
+        try:
+            index, wait = client.register_script(TOKEN_BUCKET_SCRIPT)(keys=keys, args=args)
+            return _result(buckets, index, wait)
+        except RedisError as e:
+            logger.warning(f"Message throttle falling back to local buckets: {e}")
+    return _result(buckets, *local_buckets.consume([bucket[1:] for bucket in buckets]))
+
+
+async def aconsume(buckets):
+    """consume 的异步版本"""
+    if not buckets:
+        return None
+    client = get_async_redis_client()
+    if client is not None:
+        keys, args = _script_args(buckets)
+        try:
+            index, wait = await client.register_script(TOKEN_BUCKET_SCRIPT)(keys=keys, args=args)
+            return _result(buckets, index, wait)
+        except RedisError as e:
+            logger.warning(f"Message throttle falling back to local buckets: {e}")
+    return _result(buckets, *local_buckets.consume([bucket[1:] for bucket in buckets]))
+
+
+def normalize_content(content):
+    """去掉首尾与重复空白并忽略大小写，用于判断重复内容"""
+    return ' '.join(content.split()).casefold()
+
+
+def duplicate_key(character_code, content):
+    digest = hashlib.sha1(normalize_content(content).encode('utf-8')).hexdigest()
+    return f'message_duplicate:{character_code}:{digest}'
+
+
+def get_duplicate_window():
+    return getattr(settings, 'MESSAGE_DUPLICATE_WINDOW', 60)
+
+
+def get_content(data):
+    content = data.get('content') if hasattr(data, 'get') else None
+    return content if isinstance(content, str) and content.strip() else None
+
+
+def rejection(scope, wait=None):
+    """记录拒绝并返回与 DRF 一致的 Throttled 异常"""
+    metrics.RATE_LIMIT_REJECTIONS.labels(scope=f'message_{scope}').inc()
+    if scope == 'duplicate':
+        return Throttled(wait, detail='请勿重复发送相同内容')
+    return Throttled(wait)
+
+
+def check_message_post(ip, character_code, data):
+    """发送留言前检查限流与重复内容，被拒绝时抛出 Throttled"""
+    rejected = consume(get_buckets(ip, character_code))
+    if rejected is not None:
+        raise rejection(*rejected)
+    window = get_duplicate_window()
+    content = get_content(data)
+    if not (window and content):
+        return
+    try:
+        added = cache.add(duplicate_key(character_code, content), 1, window)
+    except RedisError as e:
+        logger.warning(f"Duplicate message check skipped: {e}")
+        return
+    if not added:
+        raise rejection('duplicate', window)
+
+
+async def acheck_message_post(ip, character_code, data):
+    """check_message_post 的异步版本"""
+    rejected = await aconsume(get_buckets(ip, character_code))
+    if rejected is not None:
+        raise rejection(*rejected)
+    window = get_duplicate_window()
+    content = get_content(data)
+    if not (window and content):
+        return
+    try:
+        added = await cache.aadd(duplicate_key(character_code, content), 1, window)
+    except RedisError as e:
+        logger.warning(f"Duplicate message check skipped: {e}")
+        return
+    if not added:
+        raise rejection('duplicate', window)
+
+
+class MessagePostThrottle(BaseThrottle):
+    """留言发送限流，只作用于 POST"""
+
+    def allow_request(self, request, view):
+        if request.method != 'POST':
+            return True
+        check_message_post(
+            self.get_ident(request), view.kwargs.get('code'), request.data
+        )
+        return True
@@ -0,0 +1,135 @@
+"""
+带用户缓存的 JWT 认证
+
+JWTAuthentication 每个请求都按 uid 查询一次用户表。CachedJWTAuthentication 把认证所需的
+最少字段缓存在进程内（AUTH_USER_LOCAL_TTL 秒）与共享缓存（AUTH_USER_CACHE_TTL 秒）中，
+命中时不查询数据库；返回的用户其余字段延迟加载，首次访问时一次取回（见 User.refresh_from_db）。
+用户保存或删除时（封禁、修改密码、注销账号等）由信号清除共享缓存与本进程的缓存，
+其他进程最迟 AUTH_USER_LOCAL_TTL 秒后读到新状态。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+# 缓存的字段，足够完成认证、权限判断和按用户过滤
+FIELDS = ('id', 'uid', 'is_active', 'is_staff', 'is_superuser')
+
+
+def cache_key(uid):
+    return f'auth:user:{uid}'
+
+
+class LocalUserCache:
+    """进程内的用户记录缓存，最多保留 max_size 个，超出时淘汰最久未用的"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.records = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, uid):
+        with self.lock:
+            entry = self.records.get(uid)
+            if entry is None:
+                return None
+            expires, record = entry
+            if expires <= time.monotonic():
+                del self.records[uid]
+                return None
+            self.records.move_to_end(uid)
+            return record
+
+    def set(self, uid, record, timeout):
+        if timeout <= 0:
+            return
+        with self.lock:
+            self.records[uid] = (time.monotonic() + timeout, record)
+            self.records.move_to_end(uid)
+            while len(self.records) > self.max_size:
+                self.records.popitem(last=False)
+
+    def delete(self, uid):
+        with self.lock:
+            self.records.pop(uid, None)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+
+local_users = LocalUserCache()
+
+
+def load_record(uid):
+    """从数据库读取用户记录，用户不存在时返回 None"""
+    fields = FIELDS + (('password',) if api_settings.CHECK_REVOKE_TOKEN else ())
+    record = User.objects.filter(uid=uid).values(*fields).first()
+    if record is not None and api_settings.CHECK_REVOKE_TOKEN:
+        # 只缓存令牌中携带的密码哈希摘要
+        record['password'] = get_md5_hash_password(record['password'])
+    return record
+
+
+def get_record(uid):
+    """依次查进程内缓存、共享缓存、数据库"""
+    record = local_users.get(uid)
+    if record is not None:
+        return record
+    key = cache_key(uid)
+    record = cache.get(key)
+    if record is None:
+        record = load_record(uid)
+        if record is None:
+            return None
+        cache.set(key, record, settings.AUTH_USER_CACHE_TTL)
+    local_users.set(uid, record, settings.AUTH_USER_LOCAL_TTL)
+    return record
+
+
+def build_user(record):
+    """由缓存的字段构造用户实例，其余字段为延迟加载"""
+    # from_db 要求字段按模型定义的顺序排列
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in FIELDS]
+    return User.from_db(router.db_for_read(User), names, [record[name] for name in names])
+
+
+def invalidate(uid):
+    """用户变化后清除缓存"""
+    local_users.delete(uid)
+    cache.delete(cache_key(uid))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """与 JWTAuthentication 的校验相同，用户记录从缓存读取"""
+
+    def get_user(self, validated_token):
+        try:
+            uid = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        record = get_record(uid)
+        if record is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not record['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != record.get('password'):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return build_user(record)
@@ -12,16 +12,21 @@ class EmailBackend(ModelBackend):
     """
     
     def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None or password is None:
+            return None
         try:
             # 支持使用邮箱或用户名登录
             user = User.objects.get(
                 Q(username=username) | Q(email=username)
             )
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
+        except (User.DoesNotExist, User.MultipleObjectsReturned):
+            # 账号不存在时也计算一次密码哈希，使耗时与密码错误相同，避免据此探测账号
+            User().set_password(password)
             return None
-        
+        if user.check_password(password):
+            return user
+        return None
+
     def get_user(self, user_id):
         try:
             return User.objects.get(pk=user_id)
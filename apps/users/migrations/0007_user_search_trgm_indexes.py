@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-19 01:40
+
+from django.db import migrations
+
+# 与 apps/users/search.py 中的 SEARCH_FIELDS 一致
+SEARCH_FIELDS = ('uid', 'username', 'email')
+
+
+def index_name(field):
+    return f'users_user_{field}_trgm'
+
+
+def create_trgm_indexes(apps, schema_editor):
+    """PostgreSQL 上为用户搜索字段创建 pg_trgm GIN 索引，其他数据库跳过"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in SEARCH_FIELDS:
+        # 与 icontains 生成的表达式 UPPER(col::text) 一致；CONCURRENTLY 建索引不阻塞写入
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name(field)} '
+            f'ON users_user USING gin (UPPER({field}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index_name(field)}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY 不能在事务中执行
+    atomic = False
+
+    dependencies = [
+        ("users", "0006_invitationcode"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
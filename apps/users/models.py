@@ -85,6 +85,14 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username}({self.uid})"
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # 认证缓存构造的用户只加载了少数字段，访问任一延迟字段时一次取回全部延迟字段，
+        # 避免逐个字段查询
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
     def save(self, *args, **kwargs):
         if not self.pk and not self.username:
             self.username = self.uid
@@ -1,6 +1,45 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 
+from utils.db import estimate_count
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
-    max_page_size = 100 
\ No newline at end of file
+    max_page_size = 100
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    结果集较大时用查询计划的估算值作为总数，避免 COUNT(*) 再扫描一遍
+
+    估算值不小于 APPROXIMATE_COUNT_THRESHOLD 时才采用，否则精确计数；
+    估算偏大时最后几页可能为空。
+    """
+    approximate = False
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate >= settings.APPROXIMATE_COUNT_THRESHOLD:
+            self.approximate = True
+            return estimate
+        return super().count
+
+
+class ApproximateCountPagination(StandardResultsSetPagination):
+    """总数可能为估算值的分页，响应中 count_approximate 标明总数是否为估算值"""
+    django_paginator_class = ApproximateCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_approximate'] = self.page.paginator.approximate
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count_approximate'] = {'type': 'boolean'}
+        return schema
@@ -0,0 +1,22 @@
+"""
+管理后台的用户搜索
+
+PostgreSQL 上 uid、username、email 各有一个 UPPER(col::text) 的 pg_trgm GIN 索引（迁移 0007），
+icontains 生成的 UPPER(col::text) LIKE UPPER(...) 可以直接使用这些索引。
+少于三个字符的关键词提取不出完整的三元组，只能扫描整个索引，仍按包含匹配；
+管理员很少输入这么短的关键词，不为此改变搜索结果。
+"""
+from django.db.models import Q
+
+SEARCH_FIELDS = ('uid', 'username', 'email')
+
+
+def search_users(queryset, term):
+    """按 uid、用户名或邮箱包含关键词搜索用户"""
+    term = term.strip()
+    if not term:
+        return queryset
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__icontains': term})
+    return queryset.filter(condition)
@@ -4,6 +4,7 @@ from django.core.cache import cache
 from django.conf import settings
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 import random
+from apps.users import throttles
 from apps.users.models import BlacklistedUser, InvitationCode
 
 User = get_user_model()
@@ -21,9 +22,11 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         password = attrs.get('password')
 
         if email and password:
-            user = authenticate(request=self.context.get('request'),
+            request = self.context.get('request')
+            user = authenticate(request=request,
                               username=email, password=password)  # 使用 username 参数传递 email
             if not user:
+                throttles.record_failure(throttles.get_ip(request) if request else None, email)
                 msg = '账号或密码错误'
                 raise serializers.ValidationError(
                     {'error': msg},
@@ -42,6 +45,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
                 code='authorization'
             )
 
+        throttles.record_success(email)
         refresh = self.get_token(user)
         data = {
             'refresh': str(refresh),
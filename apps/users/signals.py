@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from apps.characters import counters
+
+from . import authentication
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_auth_cache(sender, instance, **kwargs):
+    """封禁、修改密码、注销等用户变化后清除认证缓存"""
+    authentication.invalidate(instance.uid)
+    # 提交前并发的请求可能从数据库读到旧记录并写回缓存，提交后再清除一次
+    transaction.on_commit(lambda: authentication.invalidate(instance.uid))
+
+
+@receiver(post_init, sender=User)
+def remember_superuser(sender, instance, **kwargs):
+    """记录加载时的 is_superuser，保存时据此判断是否变化；延迟加载的字段不读取，避免额外查询"""
+    instance._counted_superuser = instance.__dict__.get('is_superuser')
+
+
+@receiver(post_save, sender=User)
+def count_saved_user(sender, instance, created, **kwargs):
+    """用户数不含超级用户：新建普通用户，或 is_superuser 变化时增减计数"""
+    is_superuser = instance.__dict__.get('is_superuser')
+    if created:
+        if not is_superuser:
+            counters.incr_on_commit('users', 1)
+    elif is_superuser is not None and instance._counted_superuser is not None \
+            and is_superuser != instance._counted_superuser:
+        counters.incr_on_commit('users', -1 if is_superuser else 1)
+    instance._counted_superuser = is_superuser
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    if not instance.__dict__.get('is_superuser', False):
+        counters.incr_on_commit('users', -1)
@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users import authentication
+from apps.users.models import User
+
+
+def user_queries(queries):
+    return [q for q in queries if 'FROM "users_user"' in q['sql']]
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.local_users.clear()
+        self.addCleanup(authentication.local_users.clear)
+        self.user = User.objects.create_user(email='cached@example.com', password='testpass123')
+        self.client = self.client_for(self.user)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def get_characters(self, client=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = (client or self.client).get('/api/v1/characters/')
+        return response, user_queries(queries)
+
+    def test_user_is_cached(self):
+        response, queries = self.get_characters()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+
+        response, queries = self.get_characters()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+        # 进程内缓存失效后从共享缓存读取
+        authentication.local_users.clear()
+        self.assertEqual(self.get_characters()[1], [])
+
+    def test_cached_user_fields(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.get_characters()
+        user = authentication.build_user(authentication.get_record(self.user.uid))
+        self.assertEqual(
+            (user.pk, user.uid, user.is_active, user.is_staff, user.is_superuser),
+            (self.user.pk, self.user.uid, True, True, False)
+        )
+        self.assertEqual(user.get_deferred_fields() & set(authentication.FIELDS), set())
+
+    def test_deferred_fields_load_in_one_query(self):
+        self.get_characters()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/users/profile/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], 'cached@example.com')
+        self.assertEqual(len(user_queries(queries)), 1)
+
+    def test_ban_locks_user_out(self):
+        self.get_characters()
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='testpass123'
+        )
+        response = self.client_for(admin).post(
+            f'/api/v1/users/{self.user.uid}/ban/', {'is_active': False}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response, _ = self.get_characters()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cache(self):
+        self.get_characters()
+        self.assertIsNotNone(cache.get(authentication.cache_key(self.user.uid)))
+        response = self.client.post('/api/v1/users/change_password/', {
+            'old_password': 'testpass123',
+            'new_password': 'newpass12345',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(cache.get(authentication.cache_key(self.user.uid)))
+        self.assertIsNone(authentication.local_users.get(self.user.uid))
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpass12345'))
+        self.assertEqual(self.user.email, 'cached@example.com')
+
+    def test_deleted_user_is_rejected(self):
+        self.get_characters()
+        self.user.delete()
+        response, _ = self.get_characters()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
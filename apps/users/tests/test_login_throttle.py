@@ -0,0 +1,87 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from apps.users import throttles
+from apps.users.models import User
+
+
+@override_settings(
+    ALLOWED_HOSTS=['*'],
+    LOGIN_THROTTLE={'account': 2, 'ip': 4},
+    LOGIN_LOCKOUT_BASE=30,
+    LOGIN_LOCKOUT_MAX=100,
+)
+class LoginThrottleTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='login@example.com', password='testpass123')
+        self.url = reverse('token_obtain_pair')
+
+    def login(self, password, email='login@example.com', ip='198.51.100.1'):
+        return self.client.post(
+            self.url,
+            {'email': email, 'password': password},
+            content_type='application/json',
+            headers={'X-Forwarded-For': ip},
+        )
+
+    def test_account_lockout(self):
+        for _ in range(2):
+            self.assertEqual(self.login('wrong').status_code, status.HTTP_400_BAD_REQUEST)
+        # 超过允许次数的失败触发锁定
+        self.assertEqual(self.login('wrong').status_code, status.HTTP_400_BAD_REQUEST)
+
+        # 锁定期间即使密码正确也不校验密码，换 IP 也一样
+        with patch('apps.users.backends.EmailBackend.authenticate') as authenticate:
+            response = self.login('testpass123', ip='198.51.100.2')
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+        # 邮箱大小写不同视为同一账号，其他账号不受影响
+        self.assertEqual(self.login('x', email='LOGIN@example.com', ip='198.51.100.3').status_code, 429)
+        self.assertEqual(self.login('x', email='other@example.com', ip='198.51.100.3').status_code, 400)
+
+    def test_ip_lockout(self):
+        for index in range(5):
+            self.login('wrong', email=f'user{index}@example.com')
+        response = self.login('testpass123')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.login('testpass123', ip='198.51.100.9').status_code, status.HTTP_200_OK)
+
+    def test_ip_lockout_ignores_spoofed_forwarded_for(self):
+        """锁定后在 X-Forwarded-For 前面添加伪造地址不能解除 IP 锁定"""
+        for index in range(5):
+            self.login('wrong', email=f'user{index}@example.com', ip=f'203.0.113.{index}, 198.51.100.1')
+        for ip in ('198.51.100.1', '203.0.113.50, 198.51.100.1', '10.0.0.1, 203.0.113.51, 198.51.100.1'):
+            self.assertEqual(self.login('testpass123', ip=ip).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_success_resets_account_failures(self):
+        self.login('wrong')
+        self.login('wrong')
+        self.assertEqual(self.login('testpass123').status_code, status.HTTP_200_OK)
+        self.login('wrong')
+        self.assertEqual(self.login('testpass123').status_code, status.HTTP_200_OK)
+
+    def test_lockout_grows(self):
+        self.assertEqual(
+            [throttles.lockout_seconds(failures, 2) for failures in range(1, 7)],
+            [0, 0, 30, 60, 100, 100]
+        )
+
+
+class UnknownAccountTest(TestCase):
+    def test_unknown_account_hashes_password(self):
+        """账号不存在时同样计算一次密码哈希"""
+        with patch('django.contrib.auth.base_user.make_password', return_value='!') as make_password:
+            response = self.client.post(
+                reverse('token_obtain_pair'),
+                {'email': 'missing@example.com', 'password': 'testpass123'},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        make_password.assert_called_once_with('testpass123')
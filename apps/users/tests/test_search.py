@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from apps.users.search import search_users
+from utils.db import estimate_count
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='testpass123'
+        )
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        self.bob = User.objects.create_user(username='bob', email='bob@sample.org', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, term):
+        return set(search_users(User.objects.filter(is_superuser=False), term))
+
+    def test_contains_match(self):
+        self.assertEqual(self.search('LIC'), {self.alice})
+        self.assertEqual(self.search('sample'), {self.bob})
+        self.assertEqual(self.search(self.bob.uid[-6:]), {self.bob})
+        self.assertEqual(self.search('  '), {self.alice, self.bob})
+
+    def test_short_term_matches_substring(self):
+        self.assertEqual(self.search('al'), {self.alice})
+        self.assertEqual(self.search('li'), {self.alice})
+        self.assertEqual(self.search('rg'), {self.bob})
+
+    def test_list_view(self):
+        response = self.client.get('/api/v1/users/', {'search': 'example'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([user['username'] for user in response.data['results']], ['alice'])
+        self.assertEqual(response.data['count'], 1)
+        self.assertFalse(response.data['count_approximate'])
+
+    def test_estimate_count_requires_postgresql(self):
+        self.assertIsNone(estimate_count(User.objects.all()))
+
+    @override_settings(APPROXIMATE_COUNT_THRESHOLD=1000)
+    def test_large_estimate_replaces_count(self):
+        with mock.patch('apps.users.pagination.estimate_count', return_value=250000):
+            response = self.client.get('/api/v1/users/')
+        self.assertEqual(response.data['count'], 250000)
+        self.assertTrue(response.data['count_approximate'])
+        self.assertEqual(len(response.data['results']), 2)
+
+        # 估算值低于阈值时精确计数
+        with mock.patch('apps.users.pagination.estimate_count', return_value=10):
+            response = self.client.get('/api/v1/users/')
+        self.assertEqual(response.data['count'], 2)
+        self.assertFalse(response.data['count_approximate'])
@@ -0,0 +1,104 @@
+"""
+运行基准测试
+
+    python -m benchmarks --scale small --output reports/bench.json
+    BENCH_BACKEND=postgres REDIS_URL=redis://127.0.0.1:6379/3 python -m benchmarks --scale large
+
+首次运行（或 --reset）会迁移数据库并按 --seed 生成数据，之后默认复用已有数据。
+结果以 JSON 输出，包含运行环境与各场景的吞吐量、延迟分位数和每次操作的查询次数。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='StillAlive 基准测试')
+    parser.add_argument('--scale', default='small', help='数据规模：tiny / small / medium / large')
+    parser.add_argument('--seed', type=int, default=42, help='数据与请求序列的随机种子')
+    parser.add_argument('--scenarios', default='all', help='逗号分隔的场景名，默认全部')
+    parser.add_argument('--iterations', type=int, default=None, help='覆盖每个场景的默认操作次数')
+    parser.add_argument('--concurrency', type=int, default=1, help='并发线程数')
+    parser.add_argument('--reset', action='store_true', help='清空数据库后重新生成数据')
+    parser.add_argument('--output', '-o', default=None, help='JSON 报告输出路径，默认输出到标准输出')
+    return parser.parse_args(argv)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.core.management import call_command
+
+    from apps.characters.models import Character
+    from benchmarks import data
+    from benchmarks.scenarios import SCENARIOS
+
+    if args.scale not in data.SCALES:
+        sys.exit(f'unknown scale: {args.scale}')
+    names = list(SCENARIOS) if args.scenarios == 'all' else args.scenarios.split(',')
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f'unknown scenarios: {", ".join(unknown)}')
+
+    call_command('migrate', verbosity=0)
+    if args.reset:
+        call_command('flush', interactive=False, verbosity=0)
+    if args.reset or not Character.objects.exists():
+        started = time.perf_counter()
+        counts = data.generate(seed=args.seed, stdout=_Stderr(), **data.SCALES[args.scale])
+        print(f'generated {counts} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_revision': git_revision(),
+        'backend': settings.BENCH_BACKEND,
+        'database': settings.DATABASES['default']['ENGINE'],
+        'cache': settings.CACHES['default']['BACKEND'],
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'scale': args.scale,
+        'seed': args.seed,
+        'scenarios': {},
+    }
+    for name in names:
+        cache.clear()
+        scenario = SCENARIOS[name](random.Random(args.seed))
+        print(f'running {name}...', file=sys.stderr)
+        report['scenarios'][name] = scenario.run(args.iterations, args.concurrency)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+class _Stderr:
+    def write(self, message):
+        print(message, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
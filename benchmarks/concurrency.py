@@ -0,0 +1,138 @@
+"""
+WSGI 与 ASGI 部署模式的并发对比
+
+    python -m benchmarks.concurrency --requests 400 --concurrency 64 --upstream-delay 0.5
+
+在同一台机器上依次以两种模式启动 gunicorn（相同 worker 数），
+IP 归属地在线补全指向本地模拟的慢速上游（IP_LOOKUP_URL），
+用同样的并发客户端请求留言与状态接口，比较吞吐量与延迟分位数。
+数据库与 python -m benchmarks 共用，首次运行时按 --scale 生成数据。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.server import (
+    free_port, prepare_data, run_load, start_server, stop_server, summarize_results, write_report,
+)
+
+MODES = {
+    'wsgi': ['config.wsgi:application', '--worker-class', 'sync'],
+    'asgi': ['config.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.concurrency', description='WSGI / ASGI 并发对比')
+    parser.add_argument('--modes', default='wsgi,asgi', help='逗号分隔的部署模式')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker 数')
+    parser.add_argument('--threads', type=int, default=2, help='wsgi 模式每个 worker 的线程数')
+    parser.add_argument('--requests', type=int, default=400, help='每种模式的请求总数')
+    parser.add_argument('--concurrency', type=int, default=64, help='并发客户端数')
+    parser.add_argument('--upstream-delay', type=float, default=0.5, help='模拟 IP 归属地接口的响应耗时（秒）')
+    parser.add_argument('--slow-ratio', type=float, default=0.5, help='请求中发送留言（触发在线查询）的比例')
+    parser.add_argument('--scale', default='tiny', help='数据库为空时生成的数据规模')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', '-o', default=None, help='JSON 报告输出路径，默认输出到标准输出')
+    return parser.parse_args(argv)
+
+
+def start_upstream(delay):
+    """模拟 ip-api 的慢速上游"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = json.dumps({'status': 'success', 'regionName': '上海', 'city': '上海'}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', free_port()), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_requests(base_url, codes, args):
+    """生成与模式无关的固定请求序列"""
+    rng = random.Random(args.seed)
+    requests = []
+    for index in range(args.requests):
+        code = rng.choice(codes)
+        if rng.random() < args.slow_ratio:
+            requests.append(('message', urllib.request.Request(
+                f'{base_url}/api/v1/characters/{code}/messages/',
+                data=json.dumps({'content': f'bench {index}'}).encode(),
+                headers={
+                    'Content-Type': 'application/json',
+                    # 文档地址段，保证走在线查询
+                    'X-Forwarded-For': f'198.51.100.{index % 250 + 1}',
+                },
+            )))
+        else:
+            requests.append(('status', urllib.request.Request(f'{base_url}/api/v1/d/{code}/status/')))
+    return requests
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    modes = args.modes.split(',')
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        sys.exit(f'unknown modes: {", ".join(unknown)}')
+
+    codes = prepare_data(args.scale, args.seed)
+    upstream = start_upstream(args.upstream_delay)
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'cpu_count': os.cpu_count(),
+        'workers': args.workers,
+        'threads': args.threads,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'upstream_delay': args.upstream_delay,
+        'slow_ratio': args.slow_ratio,
+        'modes': {},
+    }
+    try:
+        for mode in modes:
+            gunicorn_args = [*MODES[mode], '--workers', str(args.workers)]
+            if mode == 'wsgi':
+                gunicorn_args += ['--threads', str(args.threads)]
+            env = {
+                'IP_LOOKUP_URL': f'http://127.0.0.1:{upstream.server_address[1]}/{{ip}}',
+                'ASYNC_VIEWS': 'True' if mode == 'asgi' else 'False',
+            }
+            print(f'running {mode}...', file=sys.stderr)
+            process, base_url = start_server(gunicorn_args, env, name=mode)
+            try:
+                results, elapsed = run_load(build_requests(base_url, codes, args), args.concurrency)
+            finally:
+                stop_server(process)
+            report['modes'][mode] = summarize_results(results, elapsed)
+    finally:
+        upstream.shutdown()
+
+    if 'wsgi' in report['modes'] and 'asgi' in report['modes']:
+        report['throughput_ratio'] = round(
+            report['modes']['asgi']['throughput_per_second']
+            / report['modes']['wsgi']['throughput_per_second'], 2
+        )
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+数据库连接复用方式的单请求延迟对比
+
+    BENCH_BACKEND=postgres python -m benchmarks.connections --requests 500
+    BENCH_BACKEND=postgres python -m benchmarks.connections --modes none,persistent,pgbouncer --pgbouncer-port 6432
+
+依次以各 DB_POOL_MODE 启动同步 gunicorn，请求轻量的只读接口（状态、展示页），
+这类接口的耗时中建立数据库连接占比最大。pool 模式需安装 psycopg[pool]，
+pgbouncer 模式需自行启动 PgBouncer（事务池）并通过 --pgbouncer-port 指定端口。
+SQLite 没有连接建立开销，本测试需使用 postgres 后端。
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import urllib.request
+
+from benchmarks.server import (
+    prepare_data, run_load, start_server, stop_server, summarize_results, write_report,
+)
+
+MODES = {
+    'none': {'DB_POOL_MODE': 'none'},
+    'persistent': {'DB_POOL_MODE': 'persistent', 'DB_CONN_MAX_AGE': '600'},
+    'pool': {'DB_POOL_MODE': 'pool'},
+    'pgbouncer': {'DB_POOL_MODE': 'pgbouncer', 'DB_CONN_MAX_AGE': '600'},
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.connections', description='数据库连接复用方式对比')
+    parser.add_argument('--modes', default='none,persistent,pool', help='逗号分隔的 DB_POOL_MODE')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker 数')
+    parser.add_argument('--threads', type=int, default=2, help='每个 worker 的线程数')
+    parser.add_argument('--requests', type=int, default=500, help='每种模式的请求总数')
+    parser.add_argument('--concurrency', type=int, default=1, help='并发客户端数，默认顺序请求以观察单请求延迟')
+    parser.add_argument('--pgbouncer-port', default=None, help='pgbouncer 模式连接的端口')
+    parser.add_argument('--scale', default='tiny', help='数据库为空时生成的数据规模')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', '-o', default=None, help='JSON 报告输出路径，默认输出到标准输出')
+    return parser.parse_args(argv)
+
+
+def build_requests(base_url, codes, count, seed):
+    rng = random.Random(seed)
+    requests = []
+    for index in range(count):
+        code = rng.choice(codes)
+        if index % 2:
+            requests.append(('display', urllib.request.Request(f'{base_url}/api/v1/d/{code}/')))
+        else:
+            requests.append(('status', urllib.request.Request(f'{base_url}/api/v1/d/{code}/status/')))
+    return requests
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    if os.environ.get('BENCH_BACKEND') != 'postgres':
+        sys.exit('connection benchmark requires BENCH_BACKEND=postgres')
+    modes = args.modes.split(',')
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        sys.exit(f'unknown modes: {", ".join(unknown)}')
+    if 'pgbouncer' in modes and not args.pgbouncer_port:
+        sys.exit('pgbouncer mode requires --pgbouncer-port')
+
+    codes = prepare_data(args.scale, args.seed)
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'cpu_count': os.cpu_count(),
+        'workers': args.workers,
+        'threads': args.threads,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'modes': {},
+    }
+    for mode in modes:
+        env = dict(MODES[mode])
+        if mode == 'pgbouncer':
+            env['DB_PORT'] = args.pgbouncer_port
+        gunicorn_args = [
+            'config.wsgi:application', '--worker-class', 'sync',
+            '--workers', str(args.workers), '--threads', str(args.threads),
+        ]
+        print(f'running {mode}...', file=sys.stderr)
+        process, base_url = start_server(gunicorn_args, env, name=mode)
+        try:
+            # 预热：让各 worker 完成导入与首次连接
+            run_load(build_requests(base_url, codes, args.workers * args.threads * 4, args.seed), args.concurrency)
+            results, elapsed = run_load(
+                build_requests(base_url, codes, args.requests, args.seed), args.concurrency
+            )
+        finally:
+            stop_server(process)
+        report['modes'][mode] = summarize_results(results, elapsed)
+
+    if 'none' in report['modes']:
+        baseline = report['modes']['none']['latency_ms']['p50']
+        report['p50_saving_ms'] = {
+            mode: round(baseline - summary['latency_ms']['p50'], 3)
+            for mode, summary in report['modes'].items() if mode != 'none'
+        }
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""
+基准测试数据
+
+数据由 apps.characters.seeding 按固定随机种子生成，与 seed_data 命令共用规模预设。
+"""
+from apps.characters.seeding import SCALES, STATUS_TYPES, Seeder, display_code, status_payload
+
+__all__ = ['SCALES', 'STATUS_TYPES', 'display_code', 'generate', 'status_payload']
+
+
+def generate(seed=42, stdout=None, **params):
+    """按参数生成数据，返回各表写入行数"""
+    return Seeder(seed=seed, stdout=stdout).run(**params)
@@ -0,0 +1,177 @@
+"""
+ip2region 加载方式与查询缓存的微基准
+
+    python -m benchmarks.ip_lookup --lookups 200000 --distinct 5000
+    python -m benchmarks.ip_lookup --xdb data/ip2region.xdb -o benchmarks/reports/ip_lookup.json
+
+依次以 file / buffer / mmap 方式加载 xdb，用同一组随机 IP 测每秒查询次数，
+并测 LRU 缓存下的查询速度（--distinct 控制 IP 的重复程度，模拟留言集中来自少数 IP）。
+未指定 --xdb 或文件不存在时生成与正式库规模相近的合成 xdb。
+"""
+import argparse
+import ipaddress
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from functools import lru_cache
+
+from benchmarks.server import write_report
+
+HEADER_LENGTH = 256
+VECTOR_INDEX_LENGTH = 256 * 256 * 8
+SEGMENT_INDEX_SIZE = 14
+
+PROVINCES = ['北京', '上海', '广东省', '浙江省', '江苏省', '四川省', '湖北省', '山东省']
+
+
+def build_xdb(path, segments):
+    """
+    写入 IPv4 xdb 文件
+
+    segments 为按起始地址排序、互不重叠的 (起始 IP, 结束 IP, 区域字符串)，
+    未覆盖的地址段记为 0|0|0|0。
+    """
+    filled = []
+    cursor = 0
+    for start, end, region in segments:
+        start, end = int(ipaddress.IPv4Address(start)), int(ipaddress.IPv4Address(end))
+        if start > cursor:
+            filled.append((cursor, start - 1, '0|0|0|0'))
+        filled.append((start, end, region))
+        cursor = end + 1
+    if cursor <= 0xFFFFFFFF:
+        filled.append((cursor, 0xFFFFFFFF, '0|0|0|0'))
+
+    # 区域数据紧跟向量索引，相同的区域只写一次
+    data = bytearray()
+    region_ptrs = {}
+    data_start = HEADER_LENGTH + VECTOR_INDEX_LENGTH
+    for _, _, region in filled:
+        if region not in region_ptrs:
+            encoded = region.encode('utf-8')
+            region_ptrs[region] = (data_start + len(data), len(encoded))
+            data += encoded
+
+    # 段索引按前两个字节（/16）切分，向量索引记录每个 /16 的首尾索引位置
+    index = bytearray()
+    index_start = data_start + len(data)
+    vector = bytearray(VECTOR_INDEX_LENGTH)
+    for start, end, region in filled:
+        ptr, length = region_ptrs[region]
+        while start <= end:
+            block_end = min(end, start | 0xFFFF)
+            entry_ptr = index_start + len(index)
+            index += struct.pack('<IIHI', start, block_end, length, ptr)
+            offset = (start >> 16) * 8
+            if vector[offset:offset + 4] == b'\0\0\0\0':
+                struct.pack_into('<I', vector, offset, entry_ptr)
+            struct.pack_into('<I', vector, offset + 4, entry_ptr)
+            start = block_end + 1
+
+    header = bytearray(HEADER_LENGTH)
+    index_end = index_start + len(index) - SEGMENT_INDEX_SIZE
+    struct.pack_into('<HHIII', header, 0, 2, 1, int(time.time()), index_start, index_end)
+    with open(path, 'wb') as f:
+        f.write(header + vector + data + index)
+
+
+def synthetic_segments(count, seed):
+    """随机切分整个 IPv4 地址空间，区域从若干省份中选取"""
+    rng = random.Random(seed)
+    bounds = sorted(rng.sample(range(1, 0xFFFFFFFF), count - 1))
+    segments = []
+    start = 0
+    for bound in [*bounds, 0x100000000]:
+        province = rng.choice(PROVINCES)
+        segments.append((start, bound - 1, f'中国|{province}|{province}|电信'))
+        start = bound
+    return segments
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.ip_lookup', description='ip2region 查询微基准')
+    parser.add_argument('--xdb', default=None, help='xdb 文件路径，默认生成合成文件')
+    parser.add_argument('--segments', type=int, default=700000, help='合成 xdb 的地址段数')
+    parser.add_argument('--modes', default='file,buffer,mmap', help='逗号分隔的加载方式')
+    parser.add_argument('--lookups', type=int, default=200000, help='每种方式的查询次数')
+    parser.add_argument('--distinct', type=int, default=5000, help='查询中不同 IP 的数量')
+    parser.add_argument('--cache-size', type=int, default=4096, help='LRU 缓存容量')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', '-o', default=None, help='JSON 报告输出路径，默认输出到标准输出')
+    return parser.parse_args(argv)
+
+
+def measure(lookup, ips):
+    started = time.perf_counter()
+    for ip in ips:
+        lookup(ip)
+    elapsed = time.perf_counter() - started
+    return {
+        'seconds': round(elapsed, 3),
+        'lookups_per_second': round(len(ips) / elapsed),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    django.setup()
+    from utils import ip_region
+
+    modes = args.modes.split(',')
+    unknown = [mode for mode in modes if mode not in ip_region.MODES]
+    if unknown:
+        sys.exit(f'unknown modes: {", ".join(unknown)}')
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = args.xdb
+        if not path or not os.path.exists(path):
+            path = os.path.join(tmpdir, 'synthetic.xdb')
+            print(f'building synthetic xdb with {args.segments} segments...', file=sys.stderr)
+            build_xdb(path, synthetic_segments(args.segments, args.seed))
+
+        rng = random.Random(args.seed)
+        pool = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(args.distinct)]
+        ips = [rng.choice(pool) for _ in range(args.lookups)]
+        report = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'xdb': args.xdb if path == args.xdb else 'synthetic',
+            'xdb_bytes': os.path.getsize(path),
+            'lookups': args.lookups,
+            'distinct': args.distinct,
+            'cache_size': args.cache_size,
+            'modes': {},
+        }
+        for mode in modes:
+            print(f'running {mode}...', file=sys.stderr)
+            searcher = ip_region.load_searcher(path, mode)
+            if searcher is None:
+                sys.exit(f'failed to load {path}')
+
+            def lookup(ip):
+                return ip_region.parse_province(ip_region.search(searcher, ip))
+
+            cached = lru_cache(maxsize=args.cache_size)(lookup)
+            report['modes'][mode] = {
+                'uncached': measure(lookup, ips),
+                'cached': measure(cached, ips),
+                'cache_hit_ratio': round(cached.cache_info().hits / len(ips), 3),
+            }
+            searcher.close()
+
+    if 'file' in report['modes']:
+        baseline = report['modes']['file']['uncached']['lookups_per_second']
+        report['speedup_vs_file'] = {
+            f'{mode}_{kind}': round(summary[kind]['lookups_per_second'] / baseline, 1)
+            for mode, summary in report['modes'].items()
+            for kind in ('uncached', 'cached')
+        }
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
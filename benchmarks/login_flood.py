@@ -0,0 +1,134 @@
+"""
+登录洪泛下的服务可用性对比
+
+    python -m benchmarks.login_flood --requests 600 --concurrency 32
+
+依次在关闭与开启登录限流（apps/users/throttles.py）的情况下启动同步 gunicorn，
+用同一组请求模拟撞库：大部分请求从少量 IP 对少量账号提交错误密码，其余为正常流量
+（读取状态接口、未被攻击的账号从其他 IP 正常登录）。密码哈希使用默认的 PBKDF2，
+关闭限流时每次失败的登录都完整计算一次哈希并占住 worker。
+
+报告按类别（attack / status / login）分别统计延迟与错误数，重点比较正常流量的延迟分位数。
+SQLite 后端使用进程内缓存，失败计数在各 worker 间不共享；多 worker 时锁定生效得更晚，
+使用 BENCH_BACKEND=postgres 与 Redis 时与线上一致。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+
+from benchmarks.server import (
+    prepare_data, run_load, start_server, stop_server, summarize_results, write_report,
+)
+
+MODES = {
+    'unthrottled': {'BENCH_LOGIN_THROTTLE': 'False'},
+    'throttled': {'BENCH_LOGIN_THROTTLE': 'True'},
+}
+LOGIN_EMAIL = 'bench-login@example.com'
+LOGIN_PASSWORD = 'bench-password-123'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.login_flood', description='登录洪泛下的可用性对比')
+    parser.add_argument('--modes', default='unthrottled,throttled', help='逗号分隔的模式')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker 数')
+    parser.add_argument('--threads', type=int, default=2, help='每个 worker 的线程数')
+    parser.add_argument('--requests', type=int, default=600, help='每种模式的请求总数')
+    parser.add_argument('--concurrency', type=int, default=32, help='并发客户端数')
+    parser.add_argument('--attack-ratio', type=float, default=0.8, help='请求中错误密码登录的比例')
+    parser.add_argument('--attack-ips', type=int, default=4, help='攻击来源 IP 数')
+    parser.add_argument('--attack-accounts', type=int, default=8, help='被攻击的账号数，一半为不存在的账号')
+    parser.add_argument('--scale', default='tiny', help='数据库为空时生成的数据规模')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', '-o', default=None, help='JSON 报告输出路径，默认输出到标准输出')
+    return parser.parse_args(argv)
+
+
+def prepare_accounts(count):
+    """正常登录的账号与被攻击的账号，被攻击的账号一半存在、一半不存在"""
+    from apps.users.models import User
+
+    emails = []
+    for index in range(count):
+        email = f'bench-victim{index}@example.com'
+        if index % 2 == 0 and not User.objects.filter(email=email).exists():
+            User.objects.create_user(email=email, password=f'victim-{index}')
+        emails.append(email)
+    user = User.objects.filter(email=LOGIN_EMAIL).first() or User(email=LOGIN_EMAIL)
+    user.set_password(LOGIN_PASSWORD)
+    user.save()
+    return emails
+
+
+def login_request(base_url, email, password, ip):
+    return urllib.request.Request(
+        f'{base_url}/api/v1/auth/token/',
+        data=json.dumps({'email': email, 'password': password}).encode(),
+        headers={'Content-Type': 'application/json', 'X-Forwarded-For': ip},
+    )
+
+
+def build_requests(base_url, codes, emails, args):
+    """生成与模式无关的固定请求序列"""
+    rng = random.Random(args.seed)
+    requests = []
+    for index in range(args.requests):
+        if rng.random() < args.attack_ratio:
+            ip = f'203.0.113.{rng.randrange(args.attack_ips) + 1}'
+            requests.append(('attack', login_request(base_url, rng.choice(emails), f'guess-{index}', ip)))
+        elif index % 5 == 0:
+            ip = f'198.51.100.{index % 250 + 1}'
+            requests.append(('login', login_request(base_url, LOGIN_EMAIL, LOGIN_PASSWORD, ip)))
+        else:
+            code = rng.choice(codes)
+            requests.append(('status', urllib.request.Request(f'{base_url}/api/v1/d/{code}/status/')))
+    return requests
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    # 准备数据与启动服务共用真实的密码哈希
+    os.environ['BENCH_PASSWORD_HASHER'] = 'default'
+    modes = args.modes.split(',')
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        sys.exit(f'unknown modes: {", ".join(unknown)}')
+
+    codes = prepare_data(args.scale, args.seed)
+    emails = prepare_accounts(args.attack_accounts)
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'cpu_count': os.cpu_count(),
+        'workers': args.workers,
+        'threads': args.threads,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'attack_ratio': args.attack_ratio,
+        'modes': {},
+    }
+    for mode in modes:
+        gunicorn_args = [
+            'config.wsgi:application', '--worker-class', 'gthread',
+            '--workers', str(args.workers), '--threads', str(args.threads),
+        ]
+        print(f'running {mode}...', file=sys.stderr)
+        process, base_url = start_server(gunicorn_args, MODES[mode], name=mode)
+        try:
+            results, elapsed = run_load(build_requests(base_url, codes, emails, args), args.concurrency)
+        finally:
+            stop_server(process)
+        summary = summarize_results(results, elapsed)
+        for kind in sorted({kind for kind, _, _ in results}):
+            summary[f'{kind}_errors'] = sum(1 for k, _, ok in results if k == kind and not ok)
+        report['modes'][mode] = summary
+
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
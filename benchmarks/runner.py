@@ -0,0 +1,139 @@
+"""
+基准测试执行与统计
+
+每个场景由若干次操作组成，单次操作记录耗时、数据库查询次数和是否成功，
+汇总为吞吐量与 p50/p95/p99 延迟。concurrency > 1 时每个线程使用独立的测试客户端
+和数据库连接并发执行。
+"""
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.db import connections
+from django.test import Client
+
+
+class QueryCounter:
+    """统计当前线程所有数据库连接上执行的查询次数"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc):
+        self._stack.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """
+    :param samples: [(耗时秒, 查询次数, 是否成功)]
+    :param elapsed: 场景总耗时（秒）
+    """
+    latencies = sorted(sample[0] for sample in samples)
+    queries = [sample[1] for sample in samples]
+    errors = sum(1 for sample in samples if not sample[2])
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'operations': len(samples),
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_per_second': round(len(samples) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': to_ms(statistics.fmean(latencies)) if latencies else None,
+            'p50': to_ms(percentile(latencies, 0.50)),
+            'p95': to_ms(percentile(latencies, 0.95)),
+            'p99': to_ms(percentile(latencies, 0.99)),
+            'max': to_ms(latencies[-1]) if latencies else None,
+        },
+        'queries_per_operation': {
+            'mean': round(statistics.fmean(queries), 2) if queries else None,
+            'max': max(queries) if queries else None,
+        },
+    }
+
+
+class Scenario:
+    """
+    基准场景
+
+    子类实现 operation(client, index)，返回是否成功；
+    setup() 在计时前执行一次，用于准备参数。
+    """
+    name = None
+    description = ''
+    default_iterations = 200
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def setup(self):
+        pass
+
+    def operation(self, client, index):
+        raise NotImplementedError
+
+    def run(self, iterations=None, concurrency=1):
+        iterations = iterations or self.default_iterations
+        self.setup()
+        local = threading.local()
+
+        def execute(index):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+            with QueryCounter() as counter:
+                start = time.perf_counter()
+                try:
+                    ok = self.operation(client, index)
+                except Exception:
+                    ok = False
+                duration = time.perf_counter() - start
+            return duration, counter.count, ok
+
+        start = time.perf_counter()
+        if concurrency <= 1:
+            samples = [execute(index) for index in range(iterations)]
+        else:
+            indexes = iter(range(iterations))
+            indexes_lock = threading.Lock()
+
+            def worker():
+                results = []
+                try:
+                    while True:
+                        with indexes_lock:
+                            index = next(indexes, None)
+                        if index is None:
+                            return results
+                        results.append(execute(index))
+                finally:
+                    # 每个线程持有独立的数据库连接，结束时关闭
+                    connections.close_all()
+
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = [pool.submit(worker) for _ in range(concurrency)]
+                samples = [sample for future in futures for sample in future.result()]
+        elapsed = time.perf_counter() - start
+
+        result = summarize(samples, elapsed)
+        result['description'] = self.description
+        result['concurrency'] = concurrency
+        return result
@@ -0,0 +1,88 @@
+"""
+基准场景
+"""
+from django.urls import reverse
+
+from apps.characters.models import Character, WillConfig
+from apps.characters.tasks import check_wills
+from benchmarks.data import STATUS_TYPES, status_payload
+from benchmarks.runner import Scenario
+
+SAMPLE_CHARACTERS = 1000
+
+
+class StatusUploadStorm(Scenario):
+    name = 'status_upload_storm'
+    description = '大量设备同时上报状态'
+    default_iterations = 1000
+
+    def setup(self):
+        self.url = reverse('status-update')
+        self.keys = [
+            str(key) for key in Character.objects.filter(is_active=True)
+            .order_by('uid').values_list('secret_key', flat=True)[:SAMPLE_CHARACTERS]
+        ]
+
+    def operation(self, client, index):
+        status_type = self.rng.choice(STATUS_TYPES)
+        response = client.post(
+            self.url,
+            {'type': status_type, 'data': status_payload(self.rng, status_type)},
+            content_type='application/json',
+            HTTP_X_CHARACTER_KEY=self.rng.choice(self.keys),
+        )
+        return response.status_code == 200
+
+
+class SurvivorsFanIn(Scenario):
+    name = 'survivors_fan_in'
+    description = '大量访客集中请求存活者列表前几页'
+    default_iterations = 500
+
+    def setup(self):
+        self.url = reverse('survivors-list')
+
+    def operation(self, client, index):
+        page = 1 if self.rng.random() < 0.8 else self.rng.randint(2, 5)
+        response = client.get(self.url, {'page': page})
+        return response.status_code in (200, 404)
+
+
+class DisplayPolling(Scenario):
+    name = 'display_polling'
+    description = '展示页轮询角色信息与最新状态'
+    default_iterations = 1000
+
+    def setup(self):
+        self.codes = list(
+            Character.objects.filter(is_active=True, is_public=True)
+            .order_by('uid').values_list('display_code', flat=True)[:SAMPLE_CHARACTERS]
+        )
+
+    def operation(self, client, index):
+        code = self.rng.choice(self.codes)
+        if index % 2:
+            response = client.get(reverse('character-display', kwargs={'code': code}))
+        else:
+            response = client.get(reverse('status-get', kwargs={'code': code}))
+        return response.status_code == 200
+
+
+class CheckWillsRun(Scenario):
+    name = 'check_wills'
+    description = '全量执行一次遗嘱检查（遗嘱邮件以 eager 模式发送到 dummy 后端）'
+    default_iterations = 1
+
+    def setup(self):
+        # 恢复上一次运行中被触发而禁用的遗嘱
+        WillConfig.objects.filter(is_enabled=False).update(is_enabled=True)
+
+    def operation(self, client, index):
+        check_wills()
+        return True
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (StatusUploadStorm, SurvivorsFanIn, DisplayPolling, CheckWillsRun)
+}
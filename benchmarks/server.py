@@ -0,0 +1,131 @@
+"""
+以独立 gunicorn 进程运行的基准测试的公共部分
+
+测试客户端在进程内调用视图，不经过连接建立、worker 调度等环节；
+部署层面的对比（worker 类型、数据库连接复用等）需要启动真实的服务进程。
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def prepare_data(scale, seed):
+    """迁移并在需要时生成数据，返回公开角色的展示码"""
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+
+    from apps.characters.models import Character
+    from benchmarks import data
+
+    call_command('migrate', verbosity=0)
+    if not Character.objects.exists():
+        data.generate(seed=seed, **data.SCALES[scale])
+    Character.objects.filter(display_code=data.display_code(0)).update(is_public=True, is_active=True)
+    return list(
+        Character.objects.filter(is_active=True, is_public=True)
+        .order_by('uid').values_list('display_code', flat=True)[:100]
+    )
+
+
+def start_server(gunicorn_args, env=None, name='server'):
+    """
+    启动 gunicorn 并等待就绪，返回 (进程, 基础 URL)
+
+    :param gunicorn_args: 应用路径与 worker 相关参数
+    :param env: 额外的环境变量
+    """
+    port = free_port()
+    command = [
+        sys.executable, '-m', 'gunicorn', *gunicorn_args,
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', '--timeout', '120',
+    ]
+    env = {**os.environ, 'PYTHONPATH': ROOT, **(env or {})}
+    # 在空目录中启动，避免 gunicorn 自动加载仓库根目录下面向容器的 gunicorn.conf.py
+    process = subprocess.Popen(command, env=env, cwd=tempfile.gettempdir())
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline and process.poll() is None:
+        try:
+            # 只要返回 HTTP 响应（包括 401）即视为已就绪
+            urllib.request.urlopen(f'{base_url}/api/v1/', timeout=5).close()
+            return process, base_url
+        except urllib.error.HTTPError:
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    sys.exit(f'{name} failed to start')
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_load(requests, concurrency):
+    """
+    并发发送请求
+
+    :param requests: [(类别, urllib.request.Request)]
+    :return: ([(类别, 耗时秒, 是否成功)], 总耗时秒)
+    """
+    def send(item):
+        kind, request = item
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                response.read()
+                ok = response.status < 400
+        except OSError:
+            ok = False
+        return kind, time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, requests))
+    return results, time.perf_counter() - start
+
+
+def summarize_results(results, elapsed):
+    """按 runner.summarize 的格式汇总，另按请求类别分别统计延迟"""
+    from benchmarks.runner import summarize
+
+    summary = summarize([(duration, 0, ok) for _, duration, ok in results], elapsed)
+    # 进程外无法统计查询次数
+    summary.pop('queries_per_operation')
+    for kind in sorted({kind for kind, _, _ in results}):
+        samples = [(duration, 0, ok) for k, duration, ok in results if k == kind]
+        summary[f'{kind}_latency_ms'] = summarize(samples, elapsed)['latency_ms']
+    return summary
+
+
+def write_report(report, output):
+    import json
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
@@ -0,0 +1,66 @@
+"""
+基准测试配置
+
+BENCH_BACKEND=sqlite（默认）使用 SQLite 文件数据库 + 本地内存缓存，无需外部服务；
+BENCH_BACKEND=postgres 使用 base 中的 Postgres/Redis 配置（DB_NAME 等环境变量），
+数据库名默认为 BENCH_DB_NAME=stillalive_bench，避免误写业务库。
+"""
+import os
+
+from config.settings.base import *  # noqa: F401,F403
+from config.settings.base import BASE_DIR, DATABASES, MIDDLEWARE
+
+BENCH_BACKEND = os.environ.get('BENCH_BACKEND', 'sqlite')
+
+DEBUG = False
+SECRET_KEY = 'benchmark-secret-key'
+ALLOWED_HOSTS = ['*']
+
+if BENCH_BACKEND == 'postgres':
+    DATABASES = {
+        'default': {
+            **DATABASES['default'],
+            'NAME': os.environ.get('BENCH_DB_NAME', 'stillalive_bench'),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('BENCH_SQLITE_PATH', os.path.join(BASE_DIR, 'benchmarks', 'bench.sqlite3')),
+            'OPTIONS': {'timeout': 30},
+        }
+    }
+    CACHES = {
+        'default': {
+            'BACKEND': 'utils.cache.InstrumentedLocMemCache',
+            'LOCATION': 'benchmarks',
+        }
+    }
+
+# 基准测试只关心接口本身的开销
+MIDDLEWARE = [m for m in MIDDLEWARE if m not in (
+    'utils.middleware.QueryBudgetMiddleware',
+    'utils.profiling.ProfilingMiddleware',
+)]
+QUERY_BUDGET_ENABLED = False
+PROFILING_ENABLED = False
+STACK_SAMPLER_ENABLED = False
+PERFORMANCE_SERVER_TIMING = False
+PERFORMANCE_SLOW_REQUEST_THRESHOLD = float('inf')
+
+# 登录洪泛对比（benchmarks/login_flood.py）需要真实的密码哈希开销，并按模式开关登录限流
+if os.environ.get('BENCH_PASSWORD_HASHER') != 'default':
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+if os.environ.get('BENCH_LOGIN_THROTTLE') == 'False':
+    LOGIN_THROTTLE = {}
+EMAIL_BACKEND = 'django.core.mail.backends.dummy.EmailBackend'
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+}
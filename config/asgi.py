@@ -16,5 +16,9 @@ except ImportError:
 
 # Default to production settings if not specified
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.production')
+# ASGI 部署默认由异步视图处理状态读写与留言接口
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+# 异步 ORM 在每个请求各自的线程中执行，线程级长连接无法复用，ASGI 下应改用 DB_POOL_MODE=pool
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -3,6 +3,10 @@ import os
 from celery import Celery
 from celery.schedules import crontab
 
+from utils.metrics import setup_celery_metrics
+from utils.profiling import setup_celery_profiling
+from utils.stack_sampler import setup_celery_sampler
+
 # 设置 Django 默认设置模块
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.local')
 
@@ -17,12 +21,33 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # 自动从所有已注册的 Django app 中加载任务
 app.autodiscover_tasks()
 
+# 任务耗时等 Prometheus 指标与性能剖析
+setup_celery_metrics()
+setup_celery_profiling()
+setup_celery_sampler()
+
 # 配置定时任务
 app.conf.beat_schedule = {
     'check-wills-hourly': {
         'task': 'apps.characters.tasks.check_wills',
         'schedule': crontab(minute=0),  # 每小时执行一次
     },
+    'rebuild-presence': {
+        'task': 'apps.characters.tasks.rebuild_presence',
+        'schedule': crontab(minute='*/5'),  # 每5分钟检查一次
+    },
+    'enrich-message-locations': {
+        'task': 'apps.characters.tasks.enrich_message_locations',
+        'schedule': crontab(minute='*/10'),  # 补全消息队列不可用时漏掉的留言
+    },
+    'reconcile-counters': {
+        'task': 'apps.characters.tasks.reconcile_counters',
+        'schedule': crontab(minute='*/15'),  # 校正全站统计计数
+    },
+    'archive-expired-messages': {
+        'task': 'apps.characters.tasks.archive_expired_messages',
+        'schedule': crontab(hour=4, minute=30),  # 每天凌晨归档过期留言
+    },
 }
 
 @app.task(bind=True)
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from datetime import timedelta
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -42,6 +43,9 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'utils.middleware.PerformanceMiddleware',
+    'utils.middleware.QueryBudgetMiddleware',  # 需设置 QUERY_BUDGET_ENABLED 开启
+    'utils.middleware.ReplicaRoutingMiddleware',  # 配置 DB_REPLICA_HOSTS 后启用
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -50,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'utils.profiling.ProfilingMiddleware',  # 需设置 PROFILING_ENABLED 开启
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -86,10 +91,62 @@ DATABASES = {
     }
 }
 
+# 数据库连接复用，由 DB_POOL_MODE 选择：
+# - persistent（默认）：每个线程保持长连接 DB_CONN_MAX_AGE 秒，复用前做健康检查
+# - pool：psycopg 3 连接池（需安装 psycopg[pool]），连接由池管理，CONN_MAX_AGE 必须为 0
+# - pgbouncer：经 PgBouncer 事务池连接，长连接只连到 PgBouncer；
+#   事务池下服务端游标不能跨事务使用，需禁用（分批遍历见 utils/db.py）
+# - none：每个请求新建连接
+DB_POOL_MODE = os.environ.get('DB_POOL_MODE', 'persistent')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
+if DB_POOL_MODE == 'pool':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        },
+    }
+elif DB_POOL_MODE in ('persistent', 'pgbouncer'):
+    DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = DB_CONN_MAX_AGE > 0
+    if DB_POOL_MODE == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+elif DB_POOL_MODE == 'none':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+else:
+    raise ImproperlyConfigured(f'Unknown DB_POOL_MODE: {DB_POOL_MODE}')
+
+# 只读副本：DB_REPLICA_HOSTS 为逗号分隔的 host[:port]，其余连接参数与主库相同。
+# 只有 DB_REPLICA_VIEWS 中的公开只读接口读副本；客户端写入后 DB_REPLICA_STICKY_SECONDS 秒内
+# 其请求仍读主库（读己之写），该值应大于副本的复制延迟
+DATABASE_REPLICAS = []
+for _index, _address in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    _host, _, _port = _address.strip().partition(':')
+    DATABASES[f'replica{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_index}')
+DATABASE_ROUTERS = ['utils.db_router.ReplicaRouter']
+DB_REPLICA_VIEWS = [
+    'survivors-list',
+    'leaderboard',
+    'character-display',
+    'status-get',
+    'character-messages',
+]
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', '5'))
+DB_REPLICA_STICKY_COOKIE = 'db_primary_until'
+
 # Cache
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'BACKEND': 'utils.cache.InstrumentedRedisCache',  # 统计请求内缓存命中
         'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
     }
 }
@@ -129,15 +186,25 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Authentication
 AUTH_USER_MODEL = 'users.User'
+# EmailBackend 同时支持用户名登录；不再追加 ModelBackend，否则密码错误时会再查询并计算一次哈希
 AUTHENTICATION_BACKENDS = [
     'apps.users.backends.EmailBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
+# 登录防暴力破解（见 apps/users/throttles.py）：维度 -> LOGIN_FAILURE_WINDOW 秒内允许的失败次数，
+# 超过后每次失败锁定 LOGIN_LOCKOUT_BASE 秒并逐次翻倍，最长 LOGIN_LOCKOUT_MAX 秒；删除某个维度即不限制
+LOGIN_THROTTLE = {
+    'account': 5,
+    'ip': 20,
+}
+LOGIN_FAILURE_WINDOW = 60 * 60
+LOGIN_LOCKOUT_BASE = 30
+LOGIN_LOCKOUT_MAX = 60 * 60
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -145,8 +212,15 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # 应用前的反向代理层数，限流按 X-Forwarded-For 倒数第 NUM_PROXIES 个地址识别客户端，
+    # 客户端自行添加的前缀无效；只有 Nginx 一层时为 1，直接暴露应用时为 0
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '1')),
 }
 
+# 分页总数的估算阈值：PostgreSQL 查询计划估算的行数不小于该值时直接用估算值作为总数，
+# 不再执行 COUNT(*)（见 apps/users/pagination.py）
+APPROXIMATE_COUNT_THRESHOLD = 10000
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -159,6 +233,11 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_uid',
 }
 
+# JWT 认证的用户缓存（见 apps/users/authentication.py）：共享缓存与进程内缓存的有效期（秒），
+# 进程内有效期即封禁等变化在其他 worker 生效的最长延迟
+AUTH_USER_CACHE_TTL = 60
+AUTH_USER_LOCAL_TTL = 5
+
 # API Documentation
 SWAGGER_SETTINGS = {
     'DEFAULT_INFO': 'config.urls.schema_view',
@@ -183,6 +262,108 @@ CORS_ALLOW_CREDENTIALS = True
 # 角色展示页面的基础 URL
 CHARACTER_DISPLAY_BASE_URL = os.environ.get('CHARACTER_DISPLAY_BASE_URL', '')
 
+# 状态上报去重：内容与同类型最新记录相同时只刷新 last_seen/repeat_count，不再插入新行
+STATUS_DEDUP_ENABLED = os.environ.get('STATUS_DEDUP_ENABLED', 'True') == 'True'
+# 同类型最新记录哈希的缓存时间（秒）
+STATUS_DEDUP_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 在线判定窗口（秒）：最后一次上报在该时间内视为在线
+PRESENCE_TTL = 15 * 60
+
+# 留言板最近一页的缓存时间（秒），留言变化时立即失效
+MESSAGE_WINDOW_TIMEOUT = 600
+
+# 发送留言的令牌桶限流（见 apps/characters/throttles.py）：维度 -> (桶容量, 每分钟补充的令牌数)，
+# 删除某个维度即不限制该维度
+MESSAGE_THROTTLE_RATES = {
+    'ip': (5, 10),
+    'character': (30, 120),
+    'global': (300, 3000),
+}
+# 同一角色在该时间（秒）内收到相同内容的留言时拒绝，0 为不检查
+MESSAGE_DUPLICATE_WINDOW = 60
+
+# 留言保留天数，超过的留言归档到 MESSAGE_ARCHIVE_DIR 后删除（见 apps/characters/moderation.py），0 为永久保留
+MESSAGE_RETENTION_DAYS = int(os.environ.get('MESSAGE_RETENTION_DAYS', '0'))
+MESSAGE_ARCHIVE_DIR = os.environ.get('MESSAGE_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive', 'messages'))
+# 每批归档的留言数，以及每次任务最多处理的批数
+MESSAGE_ARCHIVE_BATCH_SIZE = 1000
+MESSAGE_ARCHIVE_MAX_BATCHES = 100
+
+# 全站统计（用户数、角色数、在线存活者数，见 apps/characters/counters.py）的缓存时间（秒）
+STATS_CACHE_TIMEOUT = 10
+
+# 经验值排行榜单次最多返回的角色数量
+LEADERBOARD_MAX_LIMIT = 100
+
+# 留言 IP 归属地本地库（见 utils/ip_region.py）：加载方式 mmap / buffer / file，
+# 以及进程内缓存的 IP 数量
+IP2REGION_XDB_PATH = os.environ.get('IP2REGION_XDB_PATH', os.path.join(BASE_DIR, 'data', 'ip2region.xdb'))
+IP2REGION_MODE = os.environ.get('IP2REGION_MODE', 'mmap')
+IP2REGION_CACHE_SIZE = int(os.environ.get('IP2REGION_CACHE_SIZE', '4096'))
+
+# 留言 IP 归属地在线补全（见 apps/characters/geolocation.py），本地库查不到时由 Celery 任务批量查询
+GEOLOCATION_PROVIDER = 'apps.characters.geolocation.IpApiProvider'
+IP_LOOKUP_URL = os.environ.get('IP_LOOKUP_URL', 'http://ip-api.com/json/{ip}?lang=zh-CN')
+IP_LOOKUP_TIMEOUT = float(os.environ.get('IP_LOOKUP_TIMEOUT', '2'))
+GEOLOCATION_BATCH_SIZE = 200
+GEOLOCATION_BATCH_DELAY = 10  # 秒，期间的留言合并到同一批
+GEOLOCATION_MAX_AGE = 24 * 3600  # 秒，没有游标时只补全该时间内的留言
+GEOLOCATION_CACHE_TTL = 7 * 24 * 3600  # 网段结果缓存（秒）
+GEOLOCATION_NEGATIVE_CACHE_TTL = 3600  # 无结果的网段缓存（秒）
+# 熔断：GEOLOCATION_BREAKER_WINDOW 秒内失败 THRESHOLD 次后停止调用 COOLDOWN 秒
+GEOLOCATION_BREAKER_THRESHOLD = 5
+GEOLOCATION_BREAKER_WINDOW = 60
+GEOLOCATION_BREAKER_COOLDOWN = 300
+
+# 异步视图：开启后状态读写与留言接口由异步视图处理，需以 ASGI 方式部署
+# （config/asgi.py 默认开启，gunicorn 通过 GUNICORN_MODE=asgi 使用 uvicorn worker）
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
+# 请求性能统计：超过该耗时（秒）的请求记录日志，DEBUG 下记录全部请求
+PERFORMANCE_SLOW_REQUEST_THRESHOLD = float(os.environ.get('PERFORMANCE_SLOW_REQUEST_THRESHOLD', '1.0'))
+# 是否添加 Server-Timing 响应头，会向客户端暴露各阶段耗时与查询次数，默认关闭
+PERFORMANCE_SERVER_TIMING = os.environ.get('PERFORMANCE_SERVER_TIMING', 'False') == 'True'
+
+# Prometheus 指标：/metrics 额外汇总的多进程目录（如 Celery worker 的目录），逗号分隔
+METRICS_EXTRA_DIRS = [p for p in os.environ.get('METRICS_EXTRA_DIRS', '').split(',') if p]
+# 设置后抓取 /metrics 需携带 Authorization: Bearer <token>；未设置时只有 METRICS_PUBLIC=True 才允许匿名抓取，
+# 否则返回 403
+METRICS_AUTH_TOKEN = os.environ.get('METRICS_AUTH_TOKEN', '')
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'False') == 'True'
+
+# 按需性能剖析：超级用户携带 X-Profile: 1 或 ?_profile=1 剖析单次请求，结果写入 PROFILING_DIR
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_BACKEND = os.environ.get('PROFILING_BACKEND', 'cprofile')  # cprofile / pyinstrument
+PROFILING_DIR = os.path.join(BASE_DIR, 'logs', 'profiles')
+# 按 URL 名称 / Celery 任务名采样剖析的比例，如 {'status-update': 0.01}
+PROFILING_SAMPLE_RATES = {}
+PROFILING_TASK_SAMPLE_RATES = {}
+
+# 后台调用栈采样：各 worker 定时抓取调用栈写入 STACK_SAMPLER_DIR，用 merge_stack_samples 合并
+STACK_SAMPLER_ENABLED = os.environ.get('STACK_SAMPLER_ENABLED', 'False') == 'True'
+STACK_SAMPLER_DIR = os.path.join(BASE_DIR, 'logs', 'stacks')
+STACK_SAMPLER_INTERVAL = 0.01  # 基础采样间隔（秒），开销过高时自动放大
+STACK_SAMPLER_MAX_OVERHEAD = 0.01  # 采样耗时占比上限
+STACK_SAMPLER_FLUSH_INTERVAL = 60  # 写出间隔（秒）
+
+# 查询预算：按 URL 名称限制单个请求的数据库查询次数，超出时记录日志或拒绝请求
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED', 'False') == 'True'
+QUERY_BUDGET_ACTION = os.environ.get('QUERY_BUDGET_ACTION', 'log')  # log / reject
+QUERY_BUDGET_DEFAULT = 15
+QUERY_BUDGETS = {
+    'status-update': 5,
+    'status-get': 4,
+    'survivors-list': 2,
+    'leaderboard': 2,
+    'character-display': 2,
+    'character-messages': 4,
+    'character-message-detail': 4,
+    'character-messages-bulk-delete': 4,
+    'message-inbox': 3,
+    'stats': 3,
+}
+
 # Celery Configuration
 # ------------------------------------------------------------------------------
 CELERY_TIMEZONE = TIME_ZONE
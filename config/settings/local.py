@@ -8,6 +8,9 @@ load_dotenv()
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# 开发环境默认添加 Server-Timing 响应头
+PERFORMANCE_SERVER_TIMING = os.environ.get('PERFORMANCE_SERVER_TIMING', 'True') == 'True'
+
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-development-key'
 
@@ -50,13 +53,16 @@ INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
 
 # 简化中间件链，保留必要的中间件
 MIDDLEWARE = [
-    'utils.middleware.MiddlewareTimingMiddleware',
+    'utils.middleware.PerformanceMiddleware',
+    'utils.middleware.QueryBudgetMiddleware',  # 需设置 QUERY_BUDGET_ENABLED 开启
+    'utils.middleware.ReplicaRoutingMiddleware',  # 配置 DB_REPLICA_HOSTS 后启用
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',  # admin 需要
     'django.contrib.messages.middleware.MessageMiddleware',    # admin 需要
+    'utils.profiling.ProfilingMiddleware',  # 需设置 PROFILING_ENABLED 开启
 ]
 
 INTERNAL_IPS = ['127.0.0.1']
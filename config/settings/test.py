@@ -0,0 +1,35 @@
+"""
+测试配置：SQLite 内存库，不依赖 PostgreSQL 与 Redis
+
+    python -m pytest --ds=config.settings.test
+
+另配置一个独立的 SQLite 库 replica 充当只读副本（不镜像主库），
+读写分离测试据此验证查询实际落在哪个库。其余测试不使用副本。
+"""
+from .local import *  # noqa
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test-primary.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test-replica.sqlite3',
+    },
+}
+DATABASE_REPLICAS = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# 留言防刷的进程内令牌桶在测试间不会重置，默认关闭，相关测试单独开启
+MESSAGE_THROTTLE_RATES = {}
+MESSAGE_DUPLICATE_WINDOW = 0
+# 登录失败锁定同理
+LOGIN_THROTTLE = {}
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
@@ -23,6 +23,8 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 
+from utils.metrics import metrics_view
+
 # API 文档配置
 schema_view = get_schema_view(
     openapi.Info(
@@ -45,6 +47,9 @@ urlpatterns = [
     
     # API 文档
     path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+
+    # Prometheus 指标
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # 开发环境下的媒体文件服务
@@ -1,14 +1,27 @@
+import glob
+import os
+
 # 项目目录
 chdir = '/app'
 
+# 部署模式：wsgi 为同步 worker；asgi 为 uvicorn worker，
+# 状态读写与留言接口由异步视图处理，慢的外部请求不再占满 worker
+mode = os.environ.get('GUNICORN_MODE', 'wsgi')
+
 # 指定进程数
 workers = 4
 
-# 指定每个进程开启的线程数
-threads = 2
+if mode == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'config.wsgi:application'
+    # 指定每个进程开启的线程数
+    threads = 2
+    worker_class = 'sync'
 
-# 启动模式
-worker_class = 'sync'
+# ip2region 以 buffer 方式加载时预加载应用，在 fork 前读入 xdb，各 worker 共享同一份内存
+preload_app = os.environ.get('IP2REGION_MODE') == 'buffer'
 
 # 绑定的ip与端口
 bind = '0.0.0.0:8000'
@@ -40,4 +53,39 @@ daemon = False
 reload = False
 
 # 错误日志输出格式
-error_log_format = '%(asctime)s [%(process)d] [%(levelname)s] %(message)s'
\ No newline at end of file
+error_log_format = '%(asctime)s [%(process)d] [%(levelname)s] %(message)s'
+
+# Prometheus 多进程指标目录，需在 worker 导入应用之前设置
+prometheus_multiproc_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/app/logs/prometheus/web')
+
+
+def on_starting(server):
+    # 清理上次运行残留的指标文件
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+    for filename in glob.glob(os.path.join(prometheus_multiproc_dir, '*.db')):
+        os.remove(filename)
+
+
+def when_ready(server):
+    if preload_app:
+        from utils import ip_region
+        ip_region.get_searcher()
+
+
+def post_worker_init(worker):
+    # 应用加载完成后启动调用栈采样（需设置 STACK_SAMPLER_ENABLED）
+    from utils.stack_sampler import start_sampler
+    start_sampler('web')
+
+
+def worker_exit(server, worker):
+    from utils.stack_sampler import stop_sampler
+    stop_sampler()
+
+
+def child_exit(server, worker):
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
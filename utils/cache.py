@@ -0,0 +1,73 @@
+"""
+带命中统计的缓存后端
+
+在 Django 内置后端的读取操作上记录命中与未命中次数，
+写入当前请求的 RequestMetrics，其余行为与原后端一致。
+
+Django 的 RedisCache 异步方法默认通过 sync_to_async 在线程中调用同步客户端，
+InstrumentedRedisCache 为常用的异步方法改用 redis.asyncio 客户端，不占用线程。
+"""
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from utils.instrumentation import record_cache_lookup
+from utils.redis_client import get_async_client_for
+
+_MISSING = object()
+
+
+class InstrumentedCacheMixin:
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        if value is _MISSING:
+            record_cache_lookup(0, 1)
+            return default
+        record_cache_lookup(1)
+        return value
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+
+    def get_many(self, keys, version=None):
+        # RedisCache 用 MGET 批量读取，不经过 get()，需要单独统计
+        keys = list(keys)
+        found = super().get_many(keys, version=version)
+        record_cache_lookup(len(found), len(keys) - len(found))
+        return found
+
+    # 异步方法，键与序列化格式和同步方法一致，两种部署模式可共用缓存数据
+
+    async def aget(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = await get_async_client_for(self).get(key)
+        if value is None:
+            record_cache_lookup(0, 1)
+            return default
+        record_cache_lookup(1)
+        return self._cache._serializer.loads(value)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        client = get_async_client_for(self)
+        timeout = self.get_backend_timeout(timeout)
+        if timeout == 0:
+            await client.delete(key)
+        else:
+            await client.set(key, self._cache._serializer.dumps(value), ex=timeout)
+
+    async def aincr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        client = get_async_client_for(self)
+        if not await client.exists(key):
+            raise ValueError(f"Key '{key}' not found.")
+        return await client.incr(key, delta)
+
+    async def adelete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(await get_async_client_for(self).delete(key))
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
@@ -0,0 +1,48 @@
+"""
+数据库工具
+"""
+import json
+
+from django.db import connections
+
+
+def server_side_cursors_disabled(using='default'):
+    """PostgreSQL 连接是否禁用了服务端游标（如经 PgBouncer 事务池连接）"""
+    connection = connections[using]
+    return connection.vendor == 'postgresql' and connection.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS', False)
+
+
+def iterate_in_chunks(queryset, chunk_size=2000, key='pk'):
+    """
+    分批遍历查询集，内存占用与 chunk_size 成正比
+
+    默认使用 QuerySet.iterator（PostgreSQL 上为服务端游标）；服务端游标被禁用时
+    iterator 会一次取回全部结果，此时改为按 key 的键集分页逐批查询，结果按 key 排序。
+    queryset 的结果为模型实例或 values() 字典，key 需唯一且包含在结果中。
+    """
+    if not server_side_cursors_disabled(queryset.db):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+
+    queryset = queryset.order_by(key)
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(**{f'{key}__gt': last})
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        row = rows[-1]
+        last = row[key] if isinstance(row, dict) else getattr(row, key)
+
+
+def estimate_count(queryset):
+    """
+    PostgreSQL 上按查询计划估算查询集的行数，不执行查询；其他数据库返回 None
+
+    估算值来自表统计信息，误差可能较大，只适合用于大结果集的分页总数等场景。
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
@@ -0,0 +1,67 @@
+"""
+主从读写分离
+
+只读副本由 DATABASE_REPLICAS 列出。读查询默认仍走主库，只有 ReplicaRoutingMiddleware
+放行的公开只读请求（见 DB_REPLICA_VIEWS）才会读副本；同一请求内一旦发生写入，
+后续读取改回主库，保证请求内读到自己的写入。跨请求的读己之写由中间件的粘滞 Cookie 保证。
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# 当前上下文是否允许读副本
+_replica_allowed = ContextVar('replica_allowed', default=False)
+# 当前上下文是否已写过主库
+_primary_pinned = ContextVar('primary_pinned', default=False)
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+@contextmanager
+def routing_scope(replica=False):
+    """开启新的路由范围：replica 为真时允许读副本，退出时恢复原状态"""
+    allowed = _replica_allowed.set(replica)
+    pinned = _primary_pinned.set(False)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(pinned)
+        _replica_allowed.reset(allowed)
+
+
+def allow_replica_reads():
+    """在当前路由范围内允许读副本"""
+    _replica_allowed.set(True)
+
+
+class ReplicaRouter:
+    """
+    读请求在允许时随机分配到副本，写入始终走主库
+
+    不限制迁移：生产环境副本的表结构由复制同步，测试用的独立副本库需要自行建表。
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _replica_allowed.get() or _primary_pinned.get():
+            return DEFAULT_DB_ALIAS
+        replicas = get_replicas()
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _primary_pinned.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库数据相同，跨别名的关联视为同一数据库
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
@@ -0,0 +1,100 @@
+"""
+请求级性能指标
+
+每个请求创建一个 RequestMetrics，保存在请求对象和 contextvar 中。
+gunicorn 多线程 worker 中各线程拥有独立的上下文，并发请求之间互不干扰；
+缓存后端等拿不到 request 的位置通过 current_metrics() 记录指标。
+"""
+import time
+from contextvars import ContextVar
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """单个请求的耗时、数据库与缓存统计"""
+
+    __slots__ = (
+        'start', 'end', 'view_start', 'view_end',
+        'db_queries', 'db_time', 'cache_hits', 'cache_misses',
+        'response_size', '_token',
+    )
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end = None
+        self.view_start = None
+        self.view_end = None
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.response_size = None
+        self._token = None
+
+    def activate(self):
+        self._token = _current_metrics.set(self)
+        return self
+
+    def deactivate(self):
+        if self._token is not None:
+            _current_metrics.reset(self._token)
+            self._token = None
+
+    def finish(self):
+        now = time.perf_counter()
+        self.end = now
+        if self.view_start is not None and self.view_end is None:
+            self.view_end = now
+
+    @property
+    def total_time(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    @property
+    def view_time(self):
+        if self.view_start is None or self.view_end is None:
+            return None
+        return self.view_end - self.view_start
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        """connection.execute_wrapper 钩子，统计查询次数与耗时"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - start
+
+    def server_timing(self):
+        """生成 Server-Timing 响应头，耗时单位为毫秒"""
+        parts = [f'total;dur={self.total_time * 1000:.1f}']
+        if self.view_time is not None:
+            parts.append(f'view;dur={self.view_time * 1000:.1f}')
+        parts.append(f'db;dur={self.db_time * 1000:.1f};desc="{self.db_queries} queries"')
+        parts.append(f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"')
+        return ', '.join(parts)
+
+    def as_dict(self):
+        return {
+            'total_time': self.total_time,
+            'view_time': self.view_time,
+            'db_queries': self.db_queries,
+            'db_time': self.db_time,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'response_size': self.response_size,
+        }
+
+
+def current_metrics():
+    """当前请求的指标，不在请求上下文中（如 Celery 任务）时返回 None"""
+    return _current_metrics.get()
+
+
+def record_cache_lookup(hits, misses=0):
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
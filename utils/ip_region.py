@@ -0,0 +1,116 @@
+"""
+ip2region 本地 IP 归属地查询
+
+xdb 文件每个进程只加载一次，加载方式由 IP2REGION_MODE 选择：
+- mmap（默认）：只读映射整个文件，查询只访问内存，各 worker 共享操作系统页缓存
+- buffer：整个文件读入进程内存；gunicorn 预加载应用时在 fork 前读入，worker 共享写时复制页面
+- file：每次查询多次随机读文件，仅用于对比
+省份查询结果经有界 LRU 缓存（IP2REGION_CACHE_SIZE），同一 IP 的重复留言无需再次查找。
+"""
+import logging
+import mmap
+import os
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MODES = ('mmap', 'buffer', 'file')
+# 有效的 xdb 文件至少包含头部与向量索引
+MIN_XDB_SIZE = 100000
+
+_load_lock = threading.Lock()
+# file 模式下所有线程共用一个文件句柄，seek 与 read 需要串行
+_file_lock = threading.Lock()
+_searcher = None
+_loaded = False
+
+
+def load_searcher(path, mode='mmap'):
+    """按 mode 加载 xdb，未安装 ip2region 或文件不存在、无效时返回 None"""
+    if mode not in MODES:
+        raise ValueError(f'Unknown IP2REGION_MODE: {mode}')
+    try:
+        from ip2region import searcher
+        from ip2region.util import IPv4
+    except ImportError as e:
+        logger.warning(f"ip2region not installed: {e}")
+        return None
+    if not os.path.exists(path) or os.path.getsize(path) <= MIN_XDB_SIZE:
+        logger.warning(f"ip2region.xdb not found or invalid at {path}")
+        return None
+
+    if mode == 'file':
+        return searcher.new_with_file_only(IPv4, path)
+    with open(path, 'rb') as f:
+        if mode == 'buffer':
+            content = f.read()
+        else:
+            # 关闭文件后映射仍然有效
+            content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return searcher.new_with_buffer(IPv4, content)
+
+
+def get_searcher():
+    """当前进程的 searcher，首次调用时加载，不可用时返回 None"""
+    global _searcher, _loaded
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                try:
+                    _searcher = load_searcher(settings.IP2REGION_XDB_PATH, settings.IP2REGION_MODE)
+                    if _searcher is not None:
+                        logger.info(
+                            f"ip2region initialized with {settings.IP2REGION_XDB_PATH} ({settings.IP2REGION_MODE})"
+                        )
+                except Exception as e:
+                    logger.error(f"Failed to initialize ip2region: {e}")
+                _loaded = True
+    return _searcher
+
+
+def search(searcher, ip):
+    """原始查询结果 国家|省份|城市|ISP"""
+    if searcher.c_buffer is None:
+        with _file_lock:
+            return searcher.search(ip)
+    return searcher.search(ip)
+
+
+def parse_province(region):
+    """从查询结果中取出省份，去掉“省”“市”后缀；没有省份信息时返回空字符串"""
+    parts = region.split('|')
+    province = parts[1] if len(parts) > 1 and parts[1] != '0' else ''
+    return province.replace('省', '').replace('市', '')
+
+
+@lru_cache(maxsize=getattr(settings, 'IP2REGION_CACHE_SIZE', 4096))
+def lookup_province(ip):
+    """
+    IP 所属省份
+
+    返回 None 表示本地库不可用、查询失败或没有该 IP 的记录，调用方可回退到在线查询；
+    返回空字符串表示有记录但没有省份信息。
+    """
+    searcher = get_searcher()
+    if searcher is None:
+        return None
+    try:
+        region = search(searcher, ip)
+    except Exception as e:
+        logger.error(f"ip2region lookup failed for {ip}: {e}")
+        return None
+    if not region:
+        return None
+    return parse_province(region)
+
+
+def reset():
+    """丢弃已加载的 searcher 与查询缓存，下次查询时按当前配置重新加载"""
+    global _searcher, _loaded
+    with _load_lock:
+        _searcher = None
+        _loaded = False
+    lookup_province.cache_clear()
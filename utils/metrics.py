@@ -0,0 +1,197 @@
+"""
+Prometheus 指标
+
+设置环境变量 PROMETHEUS_MULTIPROC_DIR 后 prometheus_client 以多进程模式运行：
+每个 gunicorn worker / Celery 子进程把指标写入该目录下的 mmap 文件，
+/metrics 请求时汇总目录（及 METRICS_EXTRA_DIRS 中其他进程组的目录）下的全部文件，
+不依赖额外的服务。未设置时使用进程内的默认注册表，适用于 runserver 等单进程场景。
+
+环境变量必须在进程启动时设置（gunicorn.conf.py / docker-compose），
+prometheus_client 在导入时决定存储方式。未安装 prometheus_client 时所有指标为空操作。
+"""
+import glob
+import hmac
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+    )
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover - 未安装时降级为空操作
+    PROMETHEUS_AVAILABLE = False
+else:
+    PROMETHEUS_AVAILABLE = True
+
+
+class _NoopMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, amount):
+        pass
+
+
+def _metric(cls_name, name, documentation, labelnames=(), **kwargs):
+    if not PROMETHEUS_AVAILABLE:
+        return _NoopMetric()
+    cls = {'counter': Counter, 'histogram': Histogram}[cls_name]
+    return cls(name, documentation, labelnames, **kwargs)
+
+
+REQUEST_LATENCY = _metric(
+    'histogram', 'stillalive_http_request_duration_seconds',
+    '请求总耗时（按 URL 名称）', ['view', 'method'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+REQUESTS = _metric(
+    'counter', 'stillalive_http_requests_total',
+    '请求数（按 URL 名称和状态码）', ['view', 'method', 'status'],
+)
+REQUEST_DB_QUERIES = _metric(
+    'histogram', 'stillalive_http_request_db_queries',
+    '单个请求的数据库查询次数', ['view'],
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+CACHE_LOOKUPS = _metric(
+    'counter', 'stillalive_cache_lookups_total',
+    '请求内缓存读取次数，result 为 hit/miss', ['view', 'result'],
+)
+STATUS_UPLOADS = _metric(
+    'counter', 'stillalive_status_uploads_total',
+    '状态上报次数，result 为 created/deduplicated', ['result'],
+)
+RATE_LIMIT_REJECTIONS = _metric(
+    'counter', 'stillalive_rate_limit_rejections_total',
+    '因频率限制被拒绝的请求数', ['scope'],
+)
+TASK_DURATION = _metric(
+    'histogram', 'stillalive_celery_task_duration_seconds',
+    'Celery 任务执行耗时', ['task', 'state'],
+    buckets=(0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+WILL_TRIGGERS = _metric(
+    'counter', 'stillalive_will_triggers_total',
+    '超时触发的遗嘱数', ['source'],
+)
+WILL_EMAILS = _metric(
+    'counter', 'stillalive_will_emails_total',
+    '遗嘱邮件发送结果，result 为 sent/failed', ['result'],
+)
+GEOLOCATION_LOOKUPS = _metric(
+    'counter', 'stillalive_geolocation_lookups_total',
+    '留言 IP 归属地补全查询，result 为 local/cached/resolved/failed/circuit_open', ['result'],
+)
+
+
+def observe_request(view, method, status_code, request_metrics):
+    """由 PerformanceMiddleware 在每个请求结束时调用"""
+    REQUEST_LATENCY.labels(view=view, method=method).observe(request_metrics.total_time)
+    REQUESTS.labels(view=view, method=method, status=str(status_code)).inc()
+    REQUEST_DB_QUERIES.labels(view=view).observe(request_metrics.db_queries)
+    if request_metrics.cache_hits:
+        CACHE_LOOKUPS.labels(view=view, result='hit').inc(request_metrics.cache_hits)
+    if request_metrics.cache_misses:
+        CACHE_LOOKUPS.labels(view=view, result='miss').inc(request_metrics.cache_misses)
+
+
+class _MultiProcessDirsCollector:
+    """汇总多个多进程目录（gunicorn 与 Celery 各一个）下的指标文件"""
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def collect(self):
+        files = []
+        for path in self.paths:
+            files.extend(glob.glob(os.path.join(path, '*.db')))
+        return multiprocess.MultiProcessCollector.merge(files, accumulate=True)
+
+
+def get_registry():
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    paths = [MULTIPROC_DIR]
+    paths += [p for p in getattr(settings, 'METRICS_EXTRA_DIRS', []) if p and p != MULTIPROC_DIR]
+    registry = CollectorRegistry()
+    registry.register(_MultiProcessDirsCollector(paths))
+    return registry
+
+
+def metrics_allowed(request):
+    """配置了 METRICS_AUTH_TOKEN 时校验 Bearer Token，否则只有 METRICS_PUBLIC 为 True 时公开"""
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', '')
+    if token:
+        provided = request.META.get('HTTP_AUTHORIZATION', '')
+        return hmac.compare_digest(provided.encode(), f'Bearer {token}'.encode())
+    return getattr(settings, 'METRICS_PUBLIC', False)
+
+
+def metrics_view(request):
+    """Prometheus 抓取接口，默认拒绝访问，见 metrics_allowed"""
+    if not metrics_allowed(request):
+        return HttpResponse(status=403)
+    if not PROMETHEUS_AVAILABLE:
+        return HttpResponse('prometheus_client is not installed', status=503, content_type='text/plain')
+
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def clear_multiproc_dir(path=None):
+    """进程组启动时清理上次运行残留的指标文件"""
+    path = path or MULTIPROC_DIR
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for filename in glob.glob(os.path.join(path, '*.db')):
+        try:
+            os.remove(filename)
+        except OSError as e:
+            logger.warning(f"Failed to remove stale metrics file {filename}: {e}")
+
+
+def mark_process_dead(pid):
+    if PROMETHEUS_AVAILABLE and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
+
+
+def setup_celery_metrics():
+    """连接 Celery 信号，记录任务耗时并维护多进程指标目录"""
+    from celery.signals import task_postrun, task_prerun, worker_init, worker_process_shutdown
+
+    started = {}
+
+    @task_prerun.connect(weak=False)
+    def _task_started(task_id=None, **kwargs):
+        started[task_id] = time.perf_counter()
+
+    @task_postrun.connect(weak=False)
+    def _task_finished(task_id=None, task=None, state=None, **kwargs):
+        start = started.pop(task_id, None)
+        if start is None or task is None:
+            return
+        TASK_DURATION.labels(task=task.name, state=state or 'UNKNOWN').observe(
+            time.perf_counter() - start
+        )
+
+    @worker_init.connect(weak=False)
+    def _worker_init(**kwargs):
+        clear_multiproc_dir()
+
+    @worker_process_shutdown.connect(weak=False)
+    def _worker_process_shutdown(pid=None, **kwargs):
+        mark_process_dead(pid or os.getpid())
@@ -1,58 +1,279 @@
 import time
 import logging
+from contextlib import ExitStack
 from typing import Callable
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+
+from utils import db_router, metrics as prometheus_metrics
+from utils.instrumentation import RequestMetrics
 
 logger = logging.getLogger(__name__)
 
-class MiddlewareTimingMiddleware:
+
+def install_execute_wrapper(stack, wrapper):
+    """在当前线程的所有数据库连接上安装 execute_wrapper，stack 关闭时移除"""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+
+
+class PerformanceMiddleware:
+    """
+    请求级性能统计
+
+    记录总耗时、视图耗时、数据库查询次数与耗时、缓存命中/未命中次数和响应大小，
+    按解析到的 URL 名称输出日志和 Prometheus 指标，PERFORMANCE_SERVER_TIMING 开启时添加 Server-Timing 响应头。
+    统计状态保存在每个请求独立的 RequestMetrics 中，中间件实例本身无状态，
+    可在多线程 worker 中安全使用。应放在 MIDDLEWARE 首位以覆盖完整请求。
+    同时支持同步与异步调用链，ASGI 部署下不会迫使异步视图退回线程执行。
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response: Callable):
         self.get_response = get_response
-        self._middleware_classes = None
-        self._start_times = {}
+        self.slow_threshold = getattr(settings, 'PERFORMANCE_SLOW_REQUEST_THRESHOLD', 1.0)
+        self.server_timing = getattr(settings, 'PERFORMANCE_SERVER_TIMING', False)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            # 异步调用链中使用协程版本的钩子，避免 Django 为同步钩子切换线程
+            self.process_view = self._aprocess_view
+            self.process_template_response = self._aprocess_template_response
 
     def __call__(self, request):
-        # 记录请求开始时间
-        request_start = time.time()
-        request._start_time = request_start
-        
-        # 获取所有中间件类（仅在第一次调用时执行）
-        if self._middleware_classes is None:
-            self._middleware_classes = [m.split('.')[-1] for m in settings.MIDDLEWARE]
-        
-        # 记录当前中间件开始时间
-        current_middleware = self.__class__.__name__
-        self._start_times[current_middleware] = time.time()
-        
-        # 执行请求
-        response = self.get_response(request)
-        
-        # 计算并记录时间
-        end_time = time.time()
-        total_time = end_time - request_start
-        middleware_time = end_time - self._start_times[current_middleware]
-        
-        # 只在DEBUG模式下或请求时间超过阈值时记录性能日志
-        if settings.DEBUG or total_time > 1.0:  # 超过1秒的请求记录日志
-            if hasattr(request, '_view_time'):
-                view_time = request._view_time
-                logger.info(f"Request: {request.method} {request.path} - Total: {total_time:.3f}s, View: {view_time:.3f}s")
-        
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics().activate()
+        request._metrics = metrics
+        try:
+            with ExitStack() as stack:
+                install_execute_wrapper(stack, metrics.db_wrapper)
+                response = self.get_response(request)
+        finally:
+            metrics.deactivate()
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics().activate()
+        request._metrics = metrics
+        stack = ExitStack()
+        try:
+            # 异步 ORM 在 sync_to_async 的线程中执行查询，钩子需安装在该线程的连接上
+            await sync_to_async(install_execute_wrapper)(stack, metrics.db_wrapper)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            metrics.deactivate()
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        metrics.finish()
+        if not response.streaming:
+            metrics.response_size = len(response.content)
+        if self.server_timing:
+            response['Server-Timing'] = metrics.server_timing()
+        self.record(request, response, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics.view_start = time.perf_counter()
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF Response 在渲染前经过此钩子，据此截止视图耗时；
+        # 普通 HttpResponse 不经过此钩子，视图耗时截止到请求结束
+        request._metrics.view_end = time.perf_counter()
         return response
 
-class ViewTimingMiddleware:
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return PerformanceMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
+
+    async def _aprocess_template_response(self, request, response):
+        return PerformanceMiddleware.process_template_response(self, request, response)
+
+    def record(self, request, response, metrics):
+        """输出单个请求的统计"""
+        prometheus_metrics.observe_request(
+            get_url_name(request), request.method, response.status_code, metrics
+        )
+        if not (settings.DEBUG or metrics.total_time > self.slow_threshold):
+            return
+        view_time = metrics.view_time
+        logger.info(
+            f"Request: {request.method} {request.path} ({get_url_name(request)}) "
+            f"{response.status_code} - Total: {metrics.total_time:.3f}s, "
+            f"View: {view_time if view_time is not None else 0:.3f}s, "
+            f"DB: {metrics.db_queries} queries {metrics.db_time:.3f}s, "
+            f"Cache: {metrics.cache_hits} hits {metrics.cache_misses} misses, "
+            f"Size: {metrics.response_size if metrics.response_size is not None else '-'}"
+        )
+
+
+def get_url_name(request):
+    """请求解析到的 URL 名称，未匹配路由时返回 'unresolved'"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return 'unresolved'
+    return match.url_name
+
+
+class QueryBudgetExceeded(Exception):
+    """请求的数据库查询次数超过预算"""
+
+
+class QueryBudgetMiddleware:
+    """
+    按 URL 名称限制单个请求的数据库查询次数
+
+    通过 QUERY_BUDGET_ENABLED 开启，预算由 QUERY_BUDGETS 按 URL 名称配置，
+    未配置的接口使用 QUERY_BUDGET_DEFAULT（为 None 时不限制）。
+    QUERY_BUDGET_ACTION 为 'log' 时只记录超出预算的请求；
+    为 'reject' 时在超出预算的那次查询前中止请求并返回 503。
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response: Callable):
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            raise MiddlewareNotUsed
         self.get_response = get_response
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+        self.default_budget = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+        self.reject = getattr(settings, 'QUERY_BUDGET_ACTION', 'log') == 'reject'
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def get_budget(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return None
+        return self.budgets.get(match.url_name, self.default_budget)
+
+    def query_counter(self, request):
+        """返回统计该请求查询次数的 execute_wrapper 钩子"""
+        # 计数状态保存在请求对象上，多线程 worker 之间互不影响
+        request._query_count = 0
+        request._query_budget_exceeded = False
+
+        def count_queries(execute, sql, params, many, context):
+            request._query_count += 1
+            budget = self.get_budget(request)
+            if budget is not None and request._query_count > budget:
+                request._query_budget_exceeded = True
+                if self.reject:
+                    raise QueryBudgetExceeded(
+                        f"{request._query_count} queries exceeds budget {budget}"
+                    )
+            return execute(sql, params, many, context)
+
+        return count_queries
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with ExitStack() as stack:
+            install_execute_wrapper(stack, self.query_counter(request))
+            response = self.get_response(request)
+        return self.check(request, response)
+
+    async def __acall__(self, request):
+        stack = ExitStack()
+        try:
+            await sync_to_async(install_execute_wrapper)(stack, self.query_counter(request))
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.check(request, response)
+
+    def check(self, request, response):
+        if request._query_budget_exceeded:
+            url_name = request.resolver_match.url_name if request.resolver_match else None
+            logger.warning(
+                f"Query budget exceeded: {request.method} {request.path} ({url_name}) - "
+                f"{request._query_count} queries, budget {self.get_budget(request)}"
+            )
+            if self.reject:
+                return self._reject_response()
+        return response
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, QueryBudgetExceeded):
+            return self._reject_response()
+        return None
+
+    def _reject_response(self):
+        return JsonResponse(
+            {'error': '请求数据库查询次数超过预算'},
+            status=503
+        )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    公开只读接口读副本
+
+    配置了 DATABASE_REPLICAS 时启用。DB_REPLICA_VIEWS 中的接口以安全方法请求时，
+    读查询由 ReplicaRouter 分配到副本；其余请求全部走主库。
+    写请求成功后下发粘滞 Cookie，DB_REPLICA_STICKY_SECONDS 秒内该客户端的请求
+    仍读主库，避免复制延迟导致刚写入的数据读不到。
+    """
+    sync_capable = True
+    async_capable = True
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response: Callable):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.views = set(getattr(settings, 'DB_REPLICA_VIEWS', ()))
+        self.sticky_seconds = getattr(settings, 'DB_REPLICA_STICKY_SECONDS', 5)
+        self.cookie_name = getattr(settings, 'DB_REPLICA_STICKY_COOKIE', 'db_primary_until')
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            self.process_view = self._aprocess_view
 
     def __call__(self, request):
-        # 记录视图开始时间
-        view_start = time.time()
-        
-        # 执行视图
-        response = self.get_response(request)
-        
-        # 计算视图执行时间
-        view_time = time.time() - view_start
-        request._view_time = view_time
-        
-        return response 
\ No newline at end of file
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with db_router.routing_scope():
+            response = self.get_response(request)
+        return self.stick(request, response)
+
+    async def __acall__(self, request):
+        with db_router.routing_scope():
+            response = await self.get_response(request)
+        return self.stick(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in self.safe_methods
+            and get_url_name(request) in self.views
+            and not self.is_sticky(request)
+        ):
+            db_router.allow_replica_reads()
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return ReplicaRoutingMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
+
+    def is_sticky(self, request):
+        try:
+            return float(request.COOKIES[self.cookie_name]) > time.time()
+        except (KeyError, ValueError):
+            return False
+
+    def stick(self, request, response):
+        if request.method in self.safe_methods or response.status_code >= 400 or self.sticky_seconds <= 0:
+            return response
+        response.set_cookie(
+            self.cookie_name,
+            str(int(time.time()) + self.sticky_seconds),
+            max_age=self.sticky_seconds,
+            httponly=True,
+            secure=settings.SESSION_COOKIE_SECURE,
+        )
+        return response
@@ -0,0 +1,194 @@
+"""
+按需性能剖析
+
+PROFILING_ENABLED 开启后（默认关闭）支持两种方式：
+- 超级用户在请求中携带 X-Profile: 1 请求头或 ?_profile=1 参数，剖析该次请求；
+- PROFILING_SAMPLE_RATES 按 URL 名称配置采样比例，随机剖析一部分请求。
+
+Celery 任务同样支持：PROFILING_TASK_SAMPLE_RATES 按任务名采样，
+或调用时传入 apply_async(headers={'profile': True}) 显式开启。
+
+结果保存在 PROFILING_DIR（默认 logs/profiles/）下，文件名包含视图/任务名与时间戳。
+默认使用 cProfile 输出 .prof（可用 snakeviz、flameprof 查看）；
+PROFILING_BACKEND 为 'pyinstrument' 且已安装时输出 .html 火焰图。
+"""
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_QUERY_PARAM = '_profile'
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def is_enabled():
+    return getattr(settings, 'PROFILING_ENABLED', False)
+
+
+def get_profile_dir():
+    return str(getattr(settings, 'PROFILING_DIR', os.path.join(settings.BASE_DIR, 'logs', 'profiles')))
+
+
+def sampled(rates, name):
+    """按配置的比例随机决定是否剖析"""
+    rate = rates.get(name, 0)
+    return rate > 0 and random.random() < rate
+
+
+class Profile:
+    """
+    一次剖析会话，封装 cProfile / pyinstrument
+
+    其他剖析工具已在运行等原因导致无法启动时 start() 返回 False，调用方按未剖析处理。
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or getattr(settings, 'PROFILING_BACKEND', 'cprofile')
+        self._profiler = None
+        if self.backend == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logger.warning("pyinstrument is not installed, falling back to cProfile")
+                self.backend = 'cprofile'
+            else:
+                self._profiler = Profiler()
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        try:
+            if self.backend == 'pyinstrument':
+                self._profiler.start()
+            else:
+                self._profiler.enable()
+        except (RuntimeError, ValueError) as e:
+            logger.warning(f"Failed to start profiler: {e}")
+            return False
+        return True
+
+    def stop(self):
+        if self.backend == 'pyinstrument':
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def save(self, name):
+        """写入剖析结果，返回文件路径"""
+        directory = get_profile_dir()
+        os.makedirs(directory, exist_ok=True)
+        safe_name = re.sub(r'[^\w.-]+', '_', name)
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        suffix = 'html' if self.backend == 'pyinstrument' else 'prof'
+        path = os.path.join(directory, f"{safe_name}-{stamp}-{uuid.uuid4().hex[:8]}.{suffix}")
+        if self.backend == 'pyinstrument':
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(path)
+        return path
+
+
+class ProfilingMiddleware:
+    """
+    剖析选定的请求
+
+    显式请求剖析时只对超级用户生效，身份通过会话或 DRF 默认认证类识别；
+    响应头 X-Profile-File 返回结果文件名。应放在 MIDDLEWARE 末尾。
+    """
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rates = getattr(settings, 'PROFILING_SAMPLE_RATES', {})
+
+    def __call__(self, request):
+        requested = self.is_requested(request)
+        url_name = self.get_url_name(request)
+        if requested:
+            if not self.is_superuser(request):
+                return self.get_response(request)
+        elif not sampled(self.sample_rates, url_name):
+            return self.get_response(request)
+
+        profile = Profile()
+        if not profile.start():
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop()
+
+        path = profile.save(f"view-{url_name}")
+        logger.info(f"Profiled {request.method} {request.path} -> {path}")
+        if requested:
+            response['X-Profile-File'] = os.path.basename(path)
+        return response
+
+    def is_requested(self, request):
+        value = request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_QUERY_PARAM, '')
+        return value.lower() in TRUE_VALUES
+
+    def get_url_name(self, request):
+        try:
+            return resolve(request.path_info).url_name or 'unnamed'
+        except Resolver404:
+            return 'unresolved'
+
+    def is_superuser(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.is_superuser
+
+        # API 请求使用 JWT，中间件阶段尚未认证，借用 DRF 默认认证类识别用户
+        from rest_framework.exceptions import APIException
+        from rest_framework.request import Request
+        from rest_framework.settings import api_settings
+
+        drf_request = Request(request)
+        for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+            try:
+                result = authentication_class().authenticate(drf_request)
+            except APIException:
+                return False
+            if result is not None:
+                return result[0].is_superuser
+        return False
+
+
+def setup_celery_profiling():
+    """连接 Celery 信号，对采样或显式要求的任务进行剖析"""
+    from celery.signals import task_postrun, task_prerun
+
+    active = {}
+
+    @task_prerun.connect(weak=False)
+    def _start_task_profile(task_id=None, task=None, **kwargs):
+        if task is None or not is_enabled():
+            return
+        rates = getattr(settings, 'PROFILING_TASK_SAMPLE_RATES', {})
+        if not (getattr(task.request, 'profile', False) or sampled(rates, task.name)):
+            return
+        profile = Profile()
+        if profile.start():
+            active[task_id] = profile
+
+    @task_postrun.connect(weak=False)
+    def _finish_task_profile(task_id=None, task=None, **kwargs):
+        profile = active.pop(task_id, None)
+        if profile is None:
+            return
+        profile.stop()
+        path = profile.save(f"task-{task.name}")
+        logger.info(f"Profiled task {task.name} -> {path}")
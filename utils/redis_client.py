@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import weakref
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+
+def get_redis_client(alias='default'):
+    """
+    获取缓存后端对应的原生 Redis 客户端
+
+    有序集合、列表等结构需要绕过 Django 缓存 API 直接操作 Redis。
+    缓存后端不是 Redis（如测试环境的 LocMemCache）时返回 None，由调用方降级处理。
+    """
+    backend = caches[alias]
+    if isinstance(backend, RedisCache):
+        return backend._cache.get_client(write=True)
+
+    try:
+        from django_redis.cache import RedisCache as DjangoRedisCache
+    except ImportError:
+        return None
+    if isinstance(backend, DjangoRedisCache):
+        return backend.client.get_client(write=True)
+    return None
+
+
+# 异步客户端按 (事件循环, 服务器地址) 缓存：redis.asyncio 的连接池绑定创建它的事件循环
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client_for(backend):
+    """
+    获取 Django RedisCache 后端对应的 redis.asyncio 客户端
+
+    读写都使用第一个（主）服务器；只能在事件循环中调用。
+    """
+    from redis import asyncio as aioredis
+
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    server = backend._servers[0]
+    client = clients.get(server)
+    if client is None:
+        # 同步解析器类不适用于异步客户端，其余连接池参数沿用缓存配置
+        options = {
+            key: value for key, value in backend._cache._pool_options.items()
+            if key != 'parser_class'
+        }
+        client = clients[server] = aioredis.Redis.from_url(server, **options)
+    return client
+
+
+def get_async_redis_client(alias='default'):
+    """get_redis_client 的异步版本，缓存后端不是 Redis 时返回 None"""
+    backend = caches[alias]
+    if isinstance(backend, RedisCache):
+        return get_async_client_for(backend)
+    return None
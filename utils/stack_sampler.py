@@ -0,0 +1,163 @@
+"""
+低开销采样剖析
+
+每个 gunicorn / Celery worker 进程内运行一个后台线程，定时通过 sys._current_frames()
+抓取所有线程的 Python 调用栈，按 folded 格式（"帧;帧;帧 次数"，可直接交给
+flamegraph.pl / speedscope 等工具）聚合，并定期写入 STACK_SAMPLER_DIR。
+
+采样间隔会根据实测的单次采样耗时自动放大，使采样开销不超过 STACK_SAMPLER_MAX_OVERHEAD
+（默认 1%）。各进程每次刷新写出一个独立文件，用 merge_stack_samples 命令合并。
+"""
+import atexit
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_sampler = None
+_lock = threading.Lock()
+
+
+def format_frame(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold_stack(frame, thread_name, max_depth=128):
+    """把调用栈转成从根到叶、以分号连接的一行"""
+    frames = []
+    while frame is not None and len(frames) < max_depth:
+        frames.append(format_frame(frame).replace(';', ':'))
+        frame = frame.f_back
+    frames.append(thread_name.replace(';', ':'))
+    return ';'.join(reversed(frames))
+
+
+class StackSampler(threading.Thread):
+
+    def __init__(self, role, directory, interval=0.01, max_interval=1.0,
+                 max_overhead=0.01, flush_interval=60):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.role = role
+        self.directory = directory
+        self.base_interval = interval
+        self.interval = interval
+        self.max_interval = max_interval
+        self.max_overhead = max_overhead
+        self.flush_interval = flush_interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampling_time = 0.0
+        self._stop_event = threading.Event()
+        self._stacks_lock = threading.Lock()
+
+    def sample_once(self):
+        """抓取一次除采样线程外所有线程的调用栈，返回本次耗时"""
+        start = time.perf_counter()
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        folded = [
+            fold_stack(frame, names.get(ident, f'thread-{ident}'))
+            for ident, frame in sys._current_frames().items()
+            if ident != own_ident
+        ]
+        with self._stacks_lock:
+            self.stacks.update(folded)
+            self.samples += 1
+        cost = time.perf_counter() - start
+        self.sampling_time += cost
+        self.adjust_interval(cost)
+        return cost
+
+    def adjust_interval(self, cost):
+        """按单次采样耗时调整间隔，使 cost / interval 不超过 max_overhead"""
+        required = cost / self.max_overhead
+        if required > self.interval:
+            self.interval = min(required, self.max_interval)
+        else:
+            # 开销下降后逐步回到基础间隔
+            self.interval = max(self.base_interval, self.interval * 0.9, required)
+
+    def flush(self):
+        """写出上次刷新以来的采样结果，返回文件路径；没有数据时返回 None"""
+        with self._stacks_lock:
+            stacks, self.stacks = self.stacks, Counter()
+        if not stacks:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f"{self.role}-{socket.gethostname()}-{os.getpid()}-{int(time.time())}.folded"
+        path = os.path.join(self.directory, filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.items():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def run(self):
+        last_flush = time.monotonic()
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample_once()
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    self.flush()
+                    last_flush = time.monotonic()
+            except Exception as e:
+                logger.warning(f"Stack sampler error: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=1)
+        try:
+            self.flush()
+        except OSError as e:
+            logger.warning(f"Failed to flush stack samples: {e}")
+
+
+def start_sampler(role):
+    """在当前进程启动采样线程，STACK_SAMPLER_ENABLED 未开启时不做任何事"""
+    global _sampler
+    if not getattr(settings, 'STACK_SAMPLER_ENABLED', False):
+        return None
+    with _lock:
+        # fork 出的子进程继承了父进程的全局变量，但采样线程不会被继承
+        if _sampler is not None and _sampler.is_alive():
+            return _sampler
+        _sampler = StackSampler(
+            role,
+            str(getattr(settings, 'STACK_SAMPLER_DIR', os.path.join(settings.BASE_DIR, 'logs', 'stacks'))),
+            interval=getattr(settings, 'STACK_SAMPLER_INTERVAL', 0.01),
+            max_overhead=getattr(settings, 'STACK_SAMPLER_MAX_OVERHEAD', 0.01),
+            flush_interval=getattr(settings, 'STACK_SAMPLER_FLUSH_INTERVAL', 60),
+        )
+        _sampler.start()
+    atexit.register(stop_sampler)
+    logger.info(f"Stack sampler started in {role} process {os.getpid()}")
+    return _sampler
+
+
+def stop_sampler():
+    global _sampler
+    with _lock:
+        sampler, _sampler = _sampler, None
+    if sampler is not None:
+        sampler.stop()
+
+
+def setup_celery_sampler():
+    """在 Celery 池子进程中启动采样线程"""
+    from celery.signals import worker_process_init, worker_process_shutdown
+
+    @worker_process_init.connect(weak=False)
+    def _start(**kwargs):
+        start_sampler('celery')
+
+    @worker_process_shutdown.connect(weak=False)
+    def _stop(**kwargs):
+        stop_sampler()